@@ -0,0 +1,25 @@
+import logging
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN_ENV = "ADMIN_TOKEN"
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Allow a request only if it carries the admin token in the X-Admin-Token header.
+
+    Admin endpoints are disabled altogether unless the ADMIN_TOKEN
+    environment variable is set.
+    """
+    expected = os.environ.get(ADMIN_TOKEN_ENV)
+    if not expected:
+        raise HTTPException(status_code=403, detail=f"Admin endpoints are disabled, set {ADMIN_TOKEN_ENV}")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, expected):
+        logger.warning("Rejected admin request with a missing or wrong token")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import re
+from collections import OrderedDict, defaultdict
+from typing import Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.analysis.sentences import split_sentences
+from app.rhetoric_fact_analyzer import FactCheck
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 31) - 1
+NORMALIZE_PATTERN = re.compile(r"[^\w%]+")
+CLAUSE_PATTERN = re.compile(r"[,;:\u2013\u2014]\s+|\s+(?:and|but|while|whereas)\s+")
+MIN_CLAUSE_WORDS = 4  # Shorter clauses are too generic to match on their own
+
+
+class ClaimIndexConfig(BaseModel):
+    enabled: bool = True
+    scope: Literal["session", "global"] = "session"  # "global" shares checks across sessions
+    similarity_threshold: float = 0.6  # Estimated Jaccard similarity to reuse a check
+    max_claims: int = 5000  # Least recently used claims are evicted beyond this
+    shingle_size: int = 5  # Characters per shingle
+    num_perm: int = 64  # MinHash permutations
+    bands: int = 16  # LSH bands, num_perm must be a multiple of it
+
+
+def normalize_claim(text: str) -> str:
+    return NORMALIZE_PATTERN.sub(" ", text.lower()).strip()
+
+
+class ClaimIndex:
+    """Incremental MinHash index of claims that were already fact-checked.
+
+    Each claim is reduced to character shingles and a MinHash signature.
+    Signatures are split into LSH bands so candidates are found with a few
+    dict lookups; candidates are then confirmed with the estimated Jaccard
+    similarity. The index keeps at most `max_claims` claims, evicting the
+    least recently used ones.
+    """
+
+    def __init__(self, config: Optional[ClaimIndexConfig] = None):
+        self.config = config or ClaimIndexConfig()
+        if self.config.num_perm % self.config.bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.rows_per_band = self.config.num_perm // self.config.bands
+
+        rng = np.random.default_rng(seed=1)
+        self._perm_a = rng.integers(1, MERSENNE_PRIME, size=self.config.num_perm, dtype=np.uint64)
+        self._perm_b = rng.integers(0, MERSENNE_PRIME, size=self.config.num_perm, dtype=np.uint64)
+
+        self._claims: OrderedDict[int, tuple[np.ndarray, list[FactCheck]]] = OrderedDict()
+        self._buckets: dict[tuple[int, bytes], set[int]] = defaultdict(set)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._claims)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Compute the MinHash signature of a claim."""
+        normalized = normalize_claim(text)
+        k = self.config.shingle_size
+        shingles = {normalized[i : i + k] for i in range(max(1, len(normalized) - k + 1))}
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little")
+                % MERSENNE_PRIME
+                for s in shingles
+            ),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (np.outer(hashes, self._perm_a) + self._perm_b) % MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> list[tuple[int, bytes]]:
+        r = self.rows_per_band
+        return [(band, signature[band * r : (band + 1) * r].tobytes()) for band in range(self.config.bands)]
+
+    def lookup(self, text: str) -> Optional[list[FactCheck]]:
+        """Return the fact checks of the most similar indexed claim, if similar enough."""
+        signature = self.signature(text)
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+
+        best_id, best_similarity = None, 0.0
+        for claim_id in candidates:
+            similarity = float(np.mean(self._claims[claim_id][0] == signature))
+            if similarity > best_similarity:
+                best_id, best_similarity = claim_id, similarity
+
+        if best_id is None or best_similarity < self.config.similarity_threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._claims.move_to_end(best_id)
+        return self._claims[best_id][1]
+
+    def add(self, text: str, fact_checks: list[FactCheck]) -> None:
+        """Index a checked claim together with its fact checks."""
+        signature = self.signature(text)
+        claim_id = self._next_id
+        self._next_id += 1
+        self._claims[claim_id] = (signature, fact_checks)
+        for key in self._band_keys(signature):
+            self._buckets[key].add(claim_id)
+
+        while len(self._claims) > self.config.max_claims:
+            evicted_id, (evicted_signature, _) = self._claims.popitem(last=False)
+            for key in self._band_keys(evicted_signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(evicted_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def partition(self, text: str) -> tuple[str, list[FactCheck]]:
+        """Split round text into unchecked text and reusable fact checks.
+
+        Claims are usually a clause of a longer sentence, so every sentence
+        is looked up as a whole and clause by clause. Matching clauses are
+        removed from the text sent to the fact checker.
+
+        Args:
+            text: Transcript text about to be fact-checked
+
+        Returns:
+            Tuple of the text without near-duplicates of indexed claims, and
+            the prior fact checks of the claims that were matched
+        """
+        remaining, reused = [], []
+        for sentence in split_sentences(text, include_tail=True):
+            fact_checks = self.lookup(sentence)
+            if fact_checks is not None:
+                reused.extend(fact_checks)
+                continue
+
+            clauses = [c for c in CLAUSE_PATTERN.split(sentence) if c and c.strip()]
+            kept = []
+            for clause in clauses:
+                fact_checks = None
+                if len(clause.split()) >= MIN_CLAUSE_WORDS:
+                    fact_checks = self.lookup(clause)
+                if fact_checks is None:
+                    kept.append(clause.strip())
+                else:
+                    reused.extend(fact_checks)
+            if len(kept) == len(clauses):
+                remaining.append(sentence)
+            elif kept:
+                remaining.append(", ".join(kept).rstrip(".!?") + ".")
+
+        if reused:
+            logger.info(f"Reusing {len(reused)} fact checks of near-duplicate claims")
+        return " ".join(remaining), reused
+
+    def add_results(self, text: str, fact_checks: list[FactCheck]) -> None:
+        """Index the claims of a fact-checked round.
+
+        Every fact check is indexed under its quoted claim. Sentences of the
+        round without any fact check are indexed with none, so repeating
+        them later does not trigger another check either.
+        """
+        by_claim: dict[str, list[FactCheck]] = defaultdict(list)
+        for fact_check in fact_checks:
+            by_claim[fact_check.quote].append(fact_check)
+
+        quotes = [normalize_claim(quote) for quote in by_claim]
+        for sentence in split_sentences(text, include_tail=True):
+            normalized = normalize_claim(sentence)
+            if not any(quote and (quote in normalized or normalized in quote) for quote in quotes):
+                by_claim.setdefault(sentence, [])
+
+        for claim, checks in by_claim.items():
+            self.add(claim, checks)
+
+
+# Index shared by all sessions configured with scope="global"
+shared_claim_index: Optional[ClaimIndex] = None
+
+
+def get_claim_index(config: ClaimIndexConfig) -> ClaimIndex:
+    """Return a new per-session index, or the process-wide shared one."""
+    global shared_claim_index
+    if config.scope == "session":
+        return ClaimIndex(config)
+    if shared_claim_index is None:
+        shared_claim_index = ClaimIndex(config)
+    return shared_claim_index
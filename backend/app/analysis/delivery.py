@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Literal, Optional
+
+from fastapi import WebSocket
+from pydantic import BaseModel
+
+from app.analysis.scheduler import AnalysisRound
+from app.observability.metrics import BYTES_OUT, MESSAGES_OUT
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AnalysisMessage(BaseModel):
+    type: Literal["analysis"] = "analysis"
+    scope: Literal["realtime", "postdebate"]
+    analysis: str  # Name of the sub-analysis, e.g. "rhetorical_analysis"
+    round: int
+    data: dict[str, Any]
+    utterance_ts: float  # Wall time the oldest analyzed text was received
+    round_started_ts: float
+    sent_ts: float
+    latency_from_utterance_ms: float
+    analysis_ms: float
+
+
+class AnalysisItemMessage(BaseModel):
+    type: Literal["analysis_item"] = "analysis_item"
+    scope: Literal["realtime", "postdebate"]
+    analysis: str  # Name of the sub-analysis, e.g. "rhetorical_analysis"
+    field: str  # Array the finding belongs to, e.g. "fallacies"
+    round: int
+    item: dict[str, Any]
+    utterance_ts: float
+    round_started_ts: float
+    sent_ts: float
+    latency_from_utterance_ms: float
+    analysis_ms: float
+
+
+class WebSocketSender:
+    """Serialize JSON sends on one websocket across concurrent tasks.
+
+    Transcripts are sent from the receive loop while analysis results are
+    sent from background rounds, so every send goes through one lock. While
+    the client is disconnected, messages are kept, up to `max_pending`, and
+    sent once it reconnects to the session.
+    """
+
+    def __init__(self, websocket: Optional[WebSocket], max_pending: int = 1000):
+        self.websocket = websocket
+        self.closed = False
+        self.pending: deque[str] = deque(maxlen=max_pending)
+        self._lock = asyncio.Lock()
+
+    async def send_json(self, payload: dict, keep: bool = True) -> bool:
+        """Send a JSON message, returning False if it could not be sent now.
+
+        Args:
+            payload: The message
+            keep: Whether to keep the message for the client if it is away.
+                Status updates superseded by the next one are not kept, so
+                they do not push out the messages a resuming client needs.
+        """
+        if self.closed:
+            return False
+
+        # Serialized like WebSocket.send_json, so the bytes sent can be counted
+        text = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        async with self._lock:
+            if self.websocket is not None and await self._send_text(text):
+                return True
+            if keep:
+                self.pending.append(text)
+            return False
+
+    async def attach(self, websocket: WebSocket, greeting: Optional[dict] = None) -> None:
+        """Send to a new connection of the client, starting with `greeting` and the messages it missed."""
+        async with self._lock:
+            self.websocket = websocket
+            if greeting is not None and not await self._send_text(
+                json.dumps(greeting, separators=(",", ":"), ensure_ascii=False)
+            ):
+                return
+            if self.pending:
+                logger.info(f"Sending {len(self.pending)} messages kept while the client was away")
+            while self.pending and await self._send_text(self.pending[0]):
+                self.pending.popleft()
+
+    def detach(self) -> None:
+        """Keep messages from now on, until a new connection is attached."""
+        self.websocket = None
+
+    def close(self) -> None:
+        self.closed = True
+        self.websocket = None
+        self.pending.clear()
+
+    async def _send_text(self, text: str) -> bool:
+        try:
+            await self.websocket.send_text(text)
+            BYTES_OUT.inc(len(text.encode("utf-8")))
+            MESSAGES_OUT.inc()
+            return True
+        except Exception as e:
+            logger.warning(f"Could not send message, keeping messages until the client reconnects: {e}")
+            self.websocket = None
+            return False
+
+
+class AnalysisPublisher:
+    """Push each completed sub-analysis of a round to the session's client."""
+
+    def __init__(self, sender: WebSocketSender):
+        self.sender = sender
+
+    async def publish(
+        self,
+        analysis_round: AnalysisRound,
+        name: str,
+        result: BaseModel,
+        scope: Literal["realtime", "postdebate"] = "realtime",
+    ) -> None:
+        """Send one sub-analysis result with its end-to-end timing.
+
+        Args:
+            analysis_round: The round the result belongs to
+            name: Name of the sub-analysis
+            result: Parsed analyzer output
+            scope: Whether this is a realtime or post-debate analysis
+        """
+        sent_ts = time.time()
+        message = AnalysisMessage(
+            scope=scope,
+            analysis=name,
+            round=analysis_round.number,
+            data=result.model_dump(),
+            utterance_ts=analysis_round.utterance_ts,
+            round_started_ts=analysis_round.started_ts,
+            sent_ts=sent_ts,
+            latency_from_utterance_ms=(sent_ts - analysis_round.utterance_ts) * 1000,
+            analysis_ms=(sent_ts - analysis_round.started_ts) * 1000,
+        )
+        logger.info(
+            f"Delivering {scope} {name} of round {message.round}, "
+            f"{message.latency_from_utterance_ms:.0f}ms after utterance"
+        )
+        await self.sender.send_json(message.model_dump())
+
+    async def publish_item(
+        self,
+        analysis_round: AnalysisRound,
+        name: str,
+        field: str,
+        item: BaseModel,
+        scope: Literal["realtime", "postdebate"] = "realtime",
+    ) -> None:
+        """Send a single streamed finding as soon as the LLM produced it.
+
+        Args:
+            analysis_round: The round the finding belongs to
+            name: Name of the sub-analysis
+            field: Array of the sub-analysis the finding belongs to
+            item: Parsed finding
+            scope: Whether this is a realtime or post-debate analysis
+        """
+        sent_ts = time.time()
+        message = AnalysisItemMessage(
+            scope=scope,
+            analysis=name,
+            field=field,
+            round=analysis_round.number,
+            item=item.model_dump(),
+            utterance_ts=analysis_round.utterance_ts,
+            round_started_ts=analysis_round.started_ts,
+            sent_ts=sent_ts,
+            latency_from_utterance_ms=(sent_ts - analysis_round.utterance_ts) * 1000,
+            analysis_ms=(sent_ts - analysis_round.started_ts) * 1000,
+        )
+        await self.sender.send_json(message.model_dump())
+
+    async def publish_detection(self, item: BaseModel, utterance_ts: float) -> None:
+        """Send a finding of the local rhetoric prefilter, which needs no LLM round.
+
+        Args:
+            item: Detected rhetorical strategy
+            utterance_ts: Wall time the audio behind the sentence was received
+        """
+        sent_ts = time.time()
+        message = AnalysisItemMessage(
+            scope="realtime",
+            analysis="local_rhetoric",
+            field="rhetorical_strategies",
+            round=0,
+            item=item.model_dump(),
+            utterance_ts=utterance_ts,
+            round_started_ts=utterance_ts,
+            sent_ts=sent_ts,
+            latency_from_utterance_ms=(sent_ts - utterance_ts) * 1000,
+            analysis_ms=(sent_ts - utterance_ts) * 1000,
+        )
+        await self.sender.send_json(message.model_dump())
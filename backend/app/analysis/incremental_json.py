@@ -0,0 +1,93 @@
+import json
+import logging
+from typing import Any, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class IncrementalArrayParser:
+    """Incrementally parse a streamed JSON object and emit array elements early.
+
+    Structured outputs of the analyzers look like
+    ``{"fallacies": [{...}, {...}], "rhetorical_strategies": [...]}``. The
+    parser is fed the response text as it is generated and returns each
+    element of a top-level array as soon as its closing bracket arrives,
+    together with the key of the array it belongs to. Only the characters of
+    the element being built are kept, so memory stays bounded by the largest
+    element rather than the whole response.
+    """
+
+    def __init__(self):
+        self._stack: list[str] = []  # Open containers, "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._string_chars: list[str] = []
+        self._last_string: Optional[str] = None
+        self._top_level_key: Optional[str] = None
+        self._element_chars: Optional[list[str]] = None
+        self._element_key: Optional[str] = None
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Consume the next piece of the response.
+
+        Args:
+            text: Next fragment of the streamed JSON document
+
+        Returns:
+            List of (array key, parsed element) pairs completed by this fragment
+        """
+        completed = []
+        for char in text:
+            if self._element_chars is not None:
+                self._element_chars.append(char)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = "".join(self._string_chars)
+                elif len(self._stack) == 1:
+                    self._string_chars.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_chars = []
+            elif char == ":" and len(self._stack) == 1:
+                self._top_level_key = self._last_string
+            elif char in "{[":
+                if (
+                    self._element_chars is None
+                    and len(self._stack) == 2
+                    and self._stack[-1] == "["
+                ):
+                    # Start of an element of a top-level array
+                    self._element_chars = [char]
+                    self._element_key = self._top_level_key
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._element_chars is not None and len(self._stack) == 2:
+                    element = self._finish_element()
+                    if element is not None:
+                        completed.append(element)
+
+        return completed
+
+    def _finish_element(self) -> Optional[tuple[str, Any]]:
+        raw = "".join(self._element_chars)
+        key = self._element_key
+        self._element_chars = None
+        self._element_key = None
+        try:
+            return key, json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.info(f"Skipping malformed streamed element of {key}: {e}")
+            return None
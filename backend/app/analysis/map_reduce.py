@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import re
+import time
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.analysis.sentences import split_sentences
+from app.analysis.tokens import TokenBudgetConfig, count_tokens
+from app.rhetoric_fact_analyzer import (
+    ANALYSIS_MODEL,
+    AnalysisCallback,
+    ArgumentMap,
+    FactCheckAnalysis,
+    RhetoricAnalysis,
+    RhetoricFactAnalysis,
+    get_client,
+    run_analyzer,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+POSTDEBATE_ANALYZERS = ("rhetorical_analysis", "fact_checks", "argument_map")
+
+
+class MapReduceConfig(BaseModel):
+    section_tokens: int = 3000  # Budget of transcript tokens per section
+    overlap_tokens: int = 200  # Tokens repeated from the end of the previous section
+    max_concurrency: int = 4  # Analyzer calls in flight at the same time
+
+
+class PostDebateAnalysis(RhetoricFactAnalysis):
+    argument_maps: List[str] = Field(default_factory=list)  # One per section, in order
+    sections: int = 0
+
+
+def split_into_sections(text: str, section_tokens: int, overlap_tokens: int) -> list[str]:
+    """Split a transcript into overlapping, token-bounded sections.
+
+    Sections are cut at sentence boundaries. Each section starts with the last
+    sentences of the previous one, up to `overlap_tokens`, so claims spanning
+    a boundary are seen whole by at least one section. A single sentence
+    longer than the budget becomes its own section.
+
+    Args:
+        text: Full transcript
+        section_tokens: Token budget of each section
+        overlap_tokens: Tokens of context carried over from the previous section
+
+    Returns:
+        List of section texts, in transcript order
+    """
+    sentences = split_sentences(text, include_tail=True)
+    sections = []
+    current: list[tuple[str, int]] = []
+    current_tokens = 0
+    new_in_current = 0  # Sentences not already covered by the previous section
+
+    for sentence in sentences:
+        tokens = count_tokens(sentence, ANALYSIS_MODEL)
+        if current and current_tokens + tokens > section_tokens and new_in_current:
+            sections.append(" ".join(s for s, _ in current))
+
+            # Carry the tail of the section over as overlap
+            overlap: list[tuple[str, int]] = []
+            overlap_total = 0
+            for carried in reversed(current):
+                if overlap_total + carried[1] > overlap_tokens:
+                    break
+                overlap.insert(0, carried)
+                overlap_total += carried[1]
+            current, current_tokens, new_in_current = overlap, overlap_total, 0
+
+        current.append((sentence, tokens))
+        current_tokens += tokens
+        new_in_current += 1
+
+    if new_in_current:
+        sections.append(" ".join(s for s, _ in current))
+    return sections
+
+
+def _normalize_quote(quote: str) -> str:
+    return " ".join(re.sub(r"[^\w\s%]", " ", quote.lower()).split())
+
+
+def _deduplicate(items: list, label_of) -> list:
+    """Drop findings whose quote repeats, or is contained in, a kept finding with the same label.
+
+    Overlapping sections report the same quote twice, sometimes truncated at
+    the section boundary, so the longest quote of each group is kept.
+    """
+    kept: list = []
+    keys: list[tuple[str, str]] = []
+    for item in sorted(items, key=lambda item: len(item.quote), reverse=True):
+        quote = _normalize_quote(item.quote)
+        label = label_of(item).strip().lower()
+        if any(label == kept_label and quote in kept_quote for kept_quote, kept_label in keys):
+            continue
+        kept.append(item)
+        keys.append((quote, label))
+    # Restore the order in which the findings were reported
+    order = {id(item): index for index, item in enumerate(items)}
+    return sorted(kept, key=lambda item: order[id(item)])
+
+
+def reduce_section_results(results: list[dict[str, Optional[BaseModel]]]) -> PostDebateAnalysis:
+    """Merge the per-section analyzer results into one deduplicated analysis."""
+    strategies, fallacies, fact_checks, argument_maps = [], [], [], []
+    for section in results:
+        rhetoric = section.get("rhetorical_analysis")
+        if isinstance(rhetoric, RhetoricAnalysis):
+            strategies.extend(rhetoric.rhetorical_strategies)
+            fallacies.extend(rhetoric.fallacies)
+        fact_check = section.get("fact_checks")
+        if isinstance(fact_check, FactCheckAnalysis):
+            fact_checks.extend(fact_check.fact_checks)
+        argument_map = section.get("argument_map")
+        if isinstance(argument_map, ArgumentMap):
+            argument_maps.append(argument_map.argument_map)
+
+    return PostDebateAnalysis(
+        rhetorical_analysis=RhetoricAnalysis(
+            rhetorical_strategies=_deduplicate(strategies, lambda item: item.strategy),
+            fallacies=_deduplicate(fallacies, lambda item: item.fallacy),
+        ),
+        fact_checks=_deduplicate(fact_checks, lambda item: item.url),
+        argument_maps=argument_maps,
+        sections=len(results),
+    )
+
+
+async def map_reduce_analysis(
+    debate_text: str,
+    config: Optional[MapReduceConfig] = None,
+    on_result: Optional[AnalysisCallback] = None,
+    budget: Optional[TokenBudgetConfig] = None,
+) -> PostDebateAnalysis:
+    """Analyze a transcript of any length by mapping the analyzers over sections.
+
+    The rhetoric, fact-check and argument-map analyzers run on every section
+    with at most `max_concurrency` calls in flight, so wall time grows with
+    the number of sections divided by the concurrency instead of with the
+    length of a single huge prompt. The section results are then merged and
+    deduplicated.
+
+    Args:
+        debate_text: Full transcript
+        config: Section size, overlap and concurrency settings
+        on_result: Optional coroutine called with the analyzer name and its
+            parsed result as soon as an analyzer finishes a section
+        budget: Prompt token budget of each call, TokenBudgetConfig defaults if None
+
+    Returns:
+        PostDebateAnalysis with the merged findings and per-section argument maps
+    """
+    config = config or MapReduceConfig()
+    sections = split_into_sections(debate_text, config.section_tokens, config.overlap_tokens)
+    client = get_client()
+    semaphore = asyncio.Semaphore(config.max_concurrency)
+
+    async def map_call(name: str, section: str) -> Optional[BaseModel]:
+        async with semaphore:
+            return await run_analyzer(client, name, section, on_result, budget=budget)
+
+    start_time = time.time()
+    logger.info(
+        f"Map-reduce analysis of {len(sections)} sections with concurrency {config.max_concurrency}"
+    )
+    results = await asyncio.gather(
+        *(map_call(name, section) for section in sections for name in POSTDEBATE_ANALYZERS)
+    )
+    section_results = [
+        dict(zip(POSTDEBATE_ANALYZERS, results[i : i + len(POSTDEBATE_ANALYZERS)]))
+        for i in range(0, len(results), len(POSTDEBATE_ANALYZERS))
+    ]
+
+    analysis = reduce_section_results(section_results)
+    logger.info("--- Map-reduce analysis in %s seconds ---" % (time.time() - start_time))
+    return analysis
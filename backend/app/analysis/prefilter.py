@@ -0,0 +1,236 @@
+import logging
+import re
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.analysis.sentences import SENTENCE_PATTERN, split_sentences
+from app.rhetoric_fact_analyzer import RhetoricalStrategy
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"[a-z0-9%']+")
+
+REPETITION = "repetition"
+RHETORICAL_QUESTION = "rhetorical questions"
+HYPERBOLE = "hyperbole"
+INSULT = "insults and accusations"
+
+# Only question forms that imply their own answer are rhetorical, not every question:
+# tag questions ("..., isn't it?") and leading ones ("Don't we owe them more?",
+# "Who would believe that?", "How many more must die?")
+AUXILIARIES = r"(?:is|are|was|were|do|does|did|have|has|will|would|can|could|should)"
+NEGATED_AUXILIARIES = rf"(?:{AUXILIARIES}n't|won't)"
+TAG_QUESTION_PATTERN = re.compile(
+    rf",\s*(?:(?:{AUXILIARIES}(?: not)?|{NEGATED_AUXILIARIES})\s+(?:it|we|you|they|he|she|there|that|i)|right)"
+    r"\s*[?.!]*$"
+)
+LEADING_QUESTION_PATTERN = re.compile(
+    rf"^(?:{NEGATED_AUXILIARIES}\s+(?:it|we|you|they|he|she|there|that|this)|"
+    r"(?:is it|are we|do we|did we|should we|can we) (?:not|really)|"
+    r"who (?:would|could|can|wants|among us|in their right mind)|"
+    r"how (?:can|could|dare) (?:anyone|anybody|we|you|they)|"
+    r"why (?:should|would) (?:anyone|anybody|we)|"
+    r"how (?:long|many more)|what (?:kind|sort) of|since when)\b.*\?$"
+)
+HYPERBOLE_MARKERS = {
+    "unprecedented", "catastrophe", "catastrophic", "disaster", "disastrous", "apocalypse",
+    "worst", "greatest", "biggest", "never", "always", "everyone", "everybody", "nobody",
+    "nothing", "everything", "forever", "totally", "completely", "absolutely", "utterly",
+    "incredible", "unbelievable", "massive", "enormous", "huge", "horrendous", "horrific",
+    "infinitely", "countless", "unimaginable", "outrageous",
+}
+HYPERBOLE_PHRASES = re.compile(
+    r"\b(of all time|in history|ever seen|the whole world|one of the (worst|best|biggest)|"
+    r"like never before|to the core|a million times)\b"
+)
+INSULT_MARKERS = {
+    "liar", "liars", "lying", "lies", "hypocrite", "hypocrites", "hypocrisy", "incompetent",
+    "incompetence", "disgrace", "disgraceful", "shameful", "shame", "pathetic",
+    "ridiculous", "absurd", "stupid", "idiot", "idiots", "fool", "fools", "foolish",
+    "coward", "cowards", "cowardly", "dishonest", "traitor", "traitors", "betrayed",
+    "betrayal", "clueless", "reckless", "irresponsible", "naive", "extremist", "extremists",
+}
+ACCUSATION_PATTERN = re.compile(
+    r"\b(you|they|your government|the government|the commission) "
+    r"(have |has |had )?(failed|lied|ignored|betrayed|abandoned|neglected|refused|"
+    r"are watching|did nothing)\b"
+)
+# Cues that a sentence holds something only the LLM can assess: a checkable
+# claim, an appeal to authority, a causal argument or a likely fallacy
+STATISTIC_PATTERN = re.compile(r"\d|\b(percent|per cent|million|billion|thousand|half|double|tripled?)\b")
+AUTHORITY_PATTERN = re.compile(
+    r"\b(according to|study|studies|report|research|survey|data|statistics|figures|"
+    r"experts?|scientists?|evidence|europol|eurojust|frontex|commission|un)\b"
+)
+LOGOS_PATTERN = re.compile(
+    r"\b(because|therefore|thus|hence|so that|which means|as a result|consequently|"
+    r"leads? to|if .* then|either .* or|the only|must)\b"
+)
+PATHOS_MARKERS = {
+    "children", "child", "families", "victims", "fear", "afraid", "tragedy", "tragic",
+    "heartfelt", "condolences", "shocked", "innocent", "brutal", "pain", "painful",
+    "suffering", "killed", "murder", "lives", "bomb", "bombings", "threat", "danger",
+}
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was",
+    "were", "be", "it", "that", "this", "we", "i", "you", "they", "he", "she", "our",
+    "their", "with", "as", "at", "by", "from", "not", "have", "has", "will", "can",
+}
+
+
+class PrefilterConfig(BaseModel):
+    enabled: bool = True
+    min_llm_score: int = 2  # Sentences scoring below this are not sent to the LLM
+    repetition_ngram: int = 3  # Words per n-gram compared for repetition
+    repetition_min_count: int = 2  # Earlier sentences an n-gram must appear in
+    repetition_window: int = 50  # Sentences remembered for repetition
+
+
+@dataclass
+class SentenceAnalysis:
+    text: str
+    detections: list[RhetoricalStrategy] = field(default_factory=list)
+    llm_score: int = 0
+
+
+def llm_score(sentence: str) -> int:
+    """Score how promising a sentence is for the LLM analyzers.
+
+    Statistics and other checkable claims weigh most since only the fact
+    checker can handle them; appeals to authority, causal reasoning and
+    emotional appeals each add one point.
+    """
+    lowered = sentence.lower()
+    words = set(WORD_PATTERN.findall(lowered))
+    score = 0
+    if STATISTIC_PATTERN.search(lowered):
+        score += 2
+    if AUTHORITY_PATTERN.search(lowered):
+        score += 1
+    if LOGOS_PATTERN.search(lowered):
+        score += 1
+    if words & PATHOS_MARKERS:
+        score += 1
+    if words & (HYPERBOLE_MARKERS | INSULT_MARKERS):
+        score += 1
+    return score
+
+
+class RhetoricPrefilter:
+    """Cheap sentence-level rhetoric detector run on the streaming transcript.
+
+    Repetition, rhetorical questions, hyperbole and insults or accusations
+    are detected in-process with n-gram counts, question patterns and small
+    lexicons, in microseconds per sentence, so they can be reported to the
+    moderator immediately. Each sentence is also scored for what the LLM
+    adds (fact checks, fallacies, ethos/pathos/logos) so analysis rounds only
+    send the promising sentences, or skip the LLM altogether.
+    """
+
+    def __init__(self, config: Optional[PrefilterConfig] = None):
+        self.config = config or PrefilterConfig()
+        self.processed_upto = 0
+        self.sentences_seen = 0
+        self.sentences_sent = 0
+        self._recent_ngrams: deque[set[tuple[str, ...]]] = deque()
+        self._ngram_counts: Counter = Counter()
+        self._previous_opening: Optional[tuple[str, ...]] = None
+
+    def feed(self, text: str) -> list[SentenceAnalysis]:
+        """Analyze the sentences completed since the previous call.
+
+        Args:
+            text: The full transcript of the session so far
+
+        Returns:
+            Analysis of every newly completed sentence
+        """
+        self.processed_upto = min(self.processed_upto, len(text))
+        pending = text[self.processed_upto :]
+
+        analyses = []
+        consumed = 0
+        for match in SENTENCE_PATTERN.finditer(pending):
+            consumed = match.end()
+            sentence = match.group().strip()
+            if sentence:
+                analyses.append(self.analyze_sentence(sentence))
+        self.processed_upto += consumed
+        return analyses
+
+    def analyze_sentence(self, sentence: str) -> SentenceAnalysis:
+        """Detect cheap rhetoric categories in one sentence and score it for the LLM."""
+        self.sentences_seen += 1
+        lowered = sentence.lower()
+        words = WORD_PATTERN.findall(lowered)
+        labels = []
+
+        if self._is_repetition(words):
+            labels.append(REPETITION)
+
+        question = lowered.replace("\u2019", "'").strip()
+        if TAG_QUESTION_PATTERN.search(question) or LEADING_QUESTION_PATTERN.search(question):
+            labels.append(RHETORICAL_QUESTION)
+
+        hyperbole_hits = len(set(words) & HYPERBOLE_MARKERS)
+        if HYPERBOLE_PHRASES.search(lowered) or hyperbole_hits >= 2:
+            labels.append(HYPERBOLE)
+
+        if set(words) & INSULT_MARKERS or ACCUSATION_PATTERN.search(lowered):
+            labels.append(INSULT)
+
+        return SentenceAnalysis(
+            text=sentence,
+            detections=[RhetoricalStrategy(quote=sentence, strategy=label) for label in labels],
+            llm_score=llm_score(sentence),
+        )
+
+    def _is_repetition(self, words: list[str]) -> bool:
+        n = self.config.repetition_ngram
+        ngrams = {
+            tuple(words[i : i + n])
+            for i in range(len(words) - n + 1)
+            if not all(word in STOPWORDS for word in words[i : i + n])
+        }
+        repeated = any(
+            self._ngram_counts[ngram] >= self.config.repetition_min_count for ngram in ngrams
+        )
+
+        # Anaphora: consecutive sentences opening with the same words
+        opening = tuple(words[:2]) if len(words) >= 4 else None
+        if opening and opening == self._previous_opening and not all(w in STOPWORDS for w in opening):
+            repeated = True
+        self._previous_opening = opening
+
+        self._recent_ngrams.append(ngrams)
+        self._ngram_counts.update(ngrams)
+        if len(self._recent_ngrams) > self.config.repetition_window:
+            for ngram in self._recent_ngrams.popleft():
+                self._ngram_counts[ngram] -= 1
+                if not self._ngram_counts[ngram]:
+                    del self._ngram_counts[ngram]
+        return repeated
+
+    def select_for_llm(self, text: str) -> str:
+        """Keep only the sentences of a round that are worth an LLM call.
+
+        Args:
+            text: Transcript text of an analysis round
+
+        Returns:
+            The promising sentences joined together, or "" if none qualify
+        """
+        # The unterminated tail is still analyzed rather than silently dropped
+        sentences = split_sentences(text, include_tail=True)
+
+        selected = [s for s in sentences if llm_score(s) >= self.config.min_llm_score]
+        self.sentences_sent += len(selected)
+        logger.info(
+            f"Prefilter kept {len(selected)} of {len(sentences)} sentences for the LLM "
+            f"({self.sentences_sent}/{self.sentences_seen} in session)"
+        )
+        return " ".join(selected)
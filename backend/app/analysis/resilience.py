@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import random
+import time
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy(BaseModel):
+    max_attempts: int = 3  # Attempts per call, including the first one
+    base_delay_sec: float = 0.5  # Backoff before the first retry
+    max_delay_sec: float = 8.0  # Cap of the exponential backoff
+    timeout_sec: float = 30.0  # Deadline of a single attempt
+
+    def backoff_sec(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)."""
+        ceiling = min(self.max_delay_sec, self.base_delay_sec * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Track provider health and shed load while it is degraded.
+
+    The breaker opens after `failure_threshold` consecutive failed calls.
+    While open, callers that can be shed (realtime analysis) are rejected
+    until `reset_timeout_sec` has passed; then a single probe call is let
+    through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout_sec: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Return whether a sheddable call may go to the provider now."""
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout_sec:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self.state != CircuitState.CLOSED:
+            logger.info("Analysis provider recovered, closing circuit breaker")
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let another call probe the provider, the one in flight ended without an outcome."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                logger.warning(
+                    f"Opening circuit breaker after {self.consecutive_failures} failed analysis calls"
+                )
+            self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
+
+
+class ResilienceMetrics:
+    """Per-analyzer counters of calls, retries, timeouts and shed requests."""
+
+    COUNTERS = ("calls", "attempts", "retries", "timeouts", "errors", "refusals", "failures", "shed")
+
+    def __init__(self):
+        self.counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: dict.fromkeys(self.COUNTERS, 0)
+        )
+
+    def increment(self, name: str, counter: str, amount: int = 1) -> None:
+        self.counters[name][counter] += amount
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {name: dict(counters) for name, counters in self.counters.items()}
+
+
+class CallFailed(Exception):
+    """Raised by an attempt whose response is unusable but may succeed on retry."""
+
+
+async def call_with_retries(
+    name: str,
+    attempt_fn: Callable[[int], Awaitable[Any]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    metrics: ResilienceMetrics,
+) -> Optional[Any]:
+    """Run one LLM call with per-attempt deadlines and jittered retries.
+
+    Args:
+        name: Analyzer name used for metrics and logs
+        attempt_fn: Coroutine function doing one attempt, given the attempt number.
+            It raises CallFailed (or any exception) for retryable failures and
+            returns None for a refusal, which is not retried.
+        policy: Retry and timeout settings
+        breaker: Circuit breaker updated with the outcome of each attempt
+        metrics: Counters updated with attempts, retries and timeouts
+
+    Returns:
+        The result of the first successful attempt, or None
+    """
+    metrics.increment(name, "calls")
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if attempt > 1:
+            delay = policy.backoff_sec(attempt - 1)
+            metrics.increment(name, "retries")
+            logger.info(f"Retrying {name} in {delay:.2f}s (attempt {attempt}/{policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+        metrics.increment(name, "attempts")
+        try:
+            result = await asyncio.wait_for(attempt_fn(attempt), timeout=policy.timeout_sec)
+        except asyncio.TimeoutError:
+            metrics.increment(name, "timeouts")
+            breaker.record_failure()
+            logger.info(f"{name} timed out after {policy.timeout_sec}s")
+            continue
+        except asyncio.CancelledError:
+            # A cancelled probe says nothing about the provider, e.g. when a
+            # session closes mid-round, so the next call probes instead
+            breaker.release_probe()
+            raise
+        except Exception as e:
+            metrics.increment(name, "errors")
+            breaker.record_failure()
+            logger.info(f"error occurred while fetching {name} from LLM: {e}")
+            continue
+
+        breaker.record_success()
+        if result is None:
+            metrics.increment(name, "refusals")
+        return result
+
+    metrics.increment(name, "failures")
+    logger.info(f"{name} failed after {policy.max_attempts} attempts. Giving up!")
+    return None
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from pydantic import BaseModel
+
+from app.analysis.sentences import count_sentence_ends
+from app.observability.metrics import ANALYSIS_ROUNDS_DEPTH
+from app.observability.tracing import span
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class AnalysisSchedulerConfig(BaseModel):
+    min_new_sentences: int = 2  # Trigger once this many new sentences arrived
+    min_new_tokens: int = 60  # ...or once this many new words arrived
+    min_interval_sec: float = 10.0  # Never start rounds closer than this
+    max_interval_sec: float = 60.0  # Upper bound for the adaptive interval
+    latency_factor: float = 1.5  # Interval >= latency_factor * observed LLM latency
+    latency_smoothing: float = 0.3  # EWMA weight of the newest latency sample
+    stream_findings: bool = True  # Stream LLM responses and push each finding early
+
+
+@dataclass
+class AnalysisRound:
+    number: int
+    text: str
+    utterance_ts: float  # Wall time the oldest text of the round was received
+    latest_utterance_ts: float  # Wall time the newest text of the round was received
+    started_ts: float  # Wall time the round was started
+
+
+class AnalysisScheduler:
+    """Per-session scheduler for realtime rhetoric and fact-check analysis.
+
+    The transcriber reports the cumulative transcript of the session. The
+    scheduler keeps track of how much of it has already been analyzed and
+    starts a new analysis round once enough new content has arrived and the
+    minimum interval has passed. At most one round is in flight at a time;
+    triggers that arrive while a round is running are coalesced into the next
+    round, which covers all text received in the meantime. The interval grows
+    with the observed LLM latency so slow providers are not flooded.
+    """
+
+    def __init__(
+        self,
+        analyze: Callable[[AnalysisRound], Awaitable[Any]],
+        config: Optional[AnalysisSchedulerConfig] = None,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            analyze: Coroutine function run once per round with the new text
+            config: Thresholds and interval settings
+        """
+        self.analyze = analyze
+        self.config = config or AnalysisSchedulerConfig()
+
+        self.text = ""
+        self.analyzed_upto = 0
+        self.rounds_started = 0
+        self.triggers_coalesced = 0
+        self.latency_ewma_sec: Optional[float] = None
+
+        self._window_first_ts: Optional[float] = None
+        self._window_latest_ts: Optional[float] = None
+
+        self._last_round_started = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._pending = False
+        self._closed = False
+
+    @property
+    def interval_sec(self) -> float:
+        """Current minimum interval between rounds, adapted to LLM latency."""
+        interval = self.config.min_interval_sec
+        if self.latency_ewma_sec is not None:
+            interval = max(interval, self.config.latency_factor * self.latency_ewma_sec)
+        return min(interval, max(self.config.max_interval_sec, self.config.min_interval_sec))
+
+    @property
+    def in_flight(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def new_text(self) -> str:
+        """Return the transcript text that has not been analyzed yet."""
+        return self.text[self.analyzed_upto :]
+
+    def on_text(self, text: str, utterance_ts: Optional[float] = None) -> None:
+        """Record the latest cumulative transcript and trigger a round if due.
+
+        Args:
+            text: The full transcript of the session so far
+            utterance_ts: Wall time the audio behind the text was received
+        """
+        if self._closed:
+            return
+
+        utterance_ts = utterance_ts if utterance_ts is not None else time.time()
+        self.text = text
+        # Streaming backends may revise interim text, which can shrink it
+        self.analyzed_upto = min(self.analyzed_upto, len(text))
+        if len(text) > self.analyzed_upto:
+            if self._window_first_ts is None:
+                self._window_first_ts = utterance_ts
+            self._window_latest_ts = utterance_ts
+        self._maybe_start_round()
+
+    def _has_enough_new_content(self) -> bool:
+        window = self.new_text()
+        if not window.strip():
+            return False
+        if count_sentence_ends(window) >= self.config.min_new_sentences:
+            return True
+        return len(window.split()) >= self.config.min_new_tokens
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._maybe_start_round()
+
+    def _maybe_start_round(self) -> None:
+        if self._closed:
+            return
+
+        if self.in_flight:
+            if not self._pending:
+                self.triggers_coalesced += 1
+            self._pending = True
+            return
+
+        if not self._has_enough_new_content():
+            return
+
+        wait_sec = self.interval_sec - (time.monotonic() - self._last_round_started)
+        if wait_sec > 0:
+            # Re-check once the interval has elapsed; later text joins the round
+            if self._timer is None:
+                loop = asyncio.get_running_loop()
+                self._timer = loop.call_later(wait_sec, self._on_timer)
+            return
+
+        now = time.time()
+        self.rounds_started += 1
+        analysis_round = AnalysisRound(
+            number=self.rounds_started,
+            text=self.new_text(),
+            utterance_ts=self._window_first_ts or now,
+            latest_utterance_ts=self._window_latest_ts or now,
+            started_ts=now,
+        )
+        self.analyzed_upto = len(self.text)
+        self._window_first_ts = None
+        self._window_latest_ts = None
+        self._last_round_started = time.monotonic()
+        logger.info(
+            f"Starting analysis round {analysis_round.number} on "
+            f"{len(analysis_round.text.split())} new words (interval {self.interval_sec:.1f}s)"
+        )
+        self._task = asyncio.create_task(self._run_round(analysis_round))
+
+    async def _run_round(self, analysis_round: AnalysisRound) -> None:
+        start_time = time.monotonic()
+        ANALYSIS_ROUNDS_DEPTH.inc()
+        try:
+            with span(
+                "analysis_round",
+                root=True,
+                round=analysis_round.number,
+                text_chars=len(analysis_round.text),
+                wait_sec=analysis_round.started_ts - analysis_round.utterance_ts,
+            ):
+                await self.analyze(analysis_round)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in analysis round: {e}")
+        finally:
+            ANALYSIS_ROUNDS_DEPTH.dec()
+            latency = time.monotonic() - start_time
+            if self.latency_ewma_sec is None:
+                self.latency_ewma_sec = latency
+            else:
+                alpha = self.config.latency_smoothing
+                self.latency_ewma_sec = alpha * latency + (1 - alpha) * self.latency_ewma_sec
+            logger.info(f"Analysis round finished in {latency:.2f} seconds")
+
+        self._task = None
+        if self._pending:
+            self._pending = False
+            self._maybe_start_round()
+
+    async def close(self) -> None:
+        """Stop scheduling and cancel any pending or in-flight round."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.in_flight:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
@@ -0,0 +1,31 @@
+import re
+
+# A sentence ends with terminal punctuation followed by whitespace, so periods
+# inside numbers or abbreviations ("3.5", "e.g.x") do not end one. Possessive
+# quantifiers keep runs of punctuation such as "....x" from backtracking.
+SENTENCE_PATTERN = re.compile(r"(?:[^.!?]++|[.!?]++(?=\S))*+[.!?]+(?=\s|$)")
+
+
+def split_sentences(text: str, include_tail: bool = False) -> list[str]:
+    """Split a text into sentences.
+
+    Args:
+        text: Transcript text
+        include_tail: Whether to keep the unterminated text after the last sentence
+
+    Returns:
+        List of stripped, non-empty sentences
+    """
+    sentences = []
+    consumed = 0
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentences.append(match.group().strip())
+        consumed = match.end()
+    if include_tail:
+        sentences.append(text[consumed:].strip())
+    return [s for s in sentences if s]
+
+
+def count_sentence_ends(text: str) -> int:
+    """Count the sentences completed in a text, including one begun before it."""
+    return sum(1 for _ in SENTENCE_PATTERN.finditer(text))
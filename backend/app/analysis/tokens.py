@@ -0,0 +1,160 @@
+import logging
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+from app.analysis.sentences import split_sentences
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tokens added by the chat format around each message and the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+# Fallback ratio for English text when no tokenizer is installed
+TOKENS_PER_WORD = 4 / 3
+
+
+class TokenBudgetConfig(BaseModel):
+    max_prompt_tokens: int = 6000  # Budget of each analyzer prompt, instructions included
+    strategy: Literal["recent", "relevant"] = "recent"  # Sentences kept when over budget
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken is not installed, estimating token counts from word counts")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count the tokens of a text with the model's tokenizer.
+
+    Args:
+        text: Text to measure
+        model: Model whose tokenizer is used
+
+    Returns:
+        Number of tokens, estimated from the word count without tiktoken
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return int(len(text.split()) * TOKENS_PER_WORD) + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, budget_tokens: int, model: str = "gpt-4o-mini", keep_end: bool = False) -> str:
+    """Cut a text to at most `budget_tokens` tokens, keeping its start or, with `keep_end`, its end."""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        words = text.split()
+        kept = max(0, int((budget_tokens - 1) / TOKENS_PER_WORD))
+        return " ".join(words[len(words) - kept :] if keep_end else words[:kept])
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[len(tokens) - budget_tokens :] if keep_end else tokens[:budget_tokens]).strip()
+
+
+def count_message_tokens(messages: list[dict], model: str = "gpt-4o-mini") -> int:
+    """Count the prompt tokens of chat messages, including the chat format overhead."""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message["content"], model) for message in messages
+    )
+
+
+def pack_transcript(
+    text: str,
+    budget_tokens: int,
+    strategy: Literal["recent", "relevant"] = "recent",
+    model: str = "gpt-4o-mini",
+) -> str:
+    """Fit transcript text into a token budget, sentence by sentence.
+
+    With the "recent" strategy the newest sentences are kept. With
+    "relevant" the sentences the rhetoric prefilter scores highest are kept,
+    newer ones first on ties. Kept sentences stay in transcript order. A
+    first choice longer than the whole budget is truncated instead, to its
+    end with "recent" and its start with "relevant".
+
+    Args:
+        text: Transcript text
+        budget_tokens: Maximum number of tokens of the packed text
+        strategy: Which sentences to keep when the text is over budget
+        model: Model whose tokenizer is used
+
+    Returns:
+        The packed text, or the text unchanged if it fits
+    """
+    if count_tokens(text, model) <= budget_tokens:
+        return text
+    if budget_tokens <= 0:
+        return ""
+
+    sentences = split_sentences(text, include_tail=True)
+    order = list(reversed(range(len(sentences))))
+    if strategy == "relevant":
+        from app.analysis.prefilter import llm_score
+
+        order.sort(key=lambda i: (llm_score(sentences[i]), i), reverse=True)
+
+    kept, used = set(), 0
+    for i in order:
+        tokens = count_tokens(sentences[i], model) + 1
+        if used + tokens > budget_tokens:
+            if strategy == "recent":
+                break
+            continue
+        kept.add(i)
+        used += tokens
+
+    if not kept:
+        first = sentences[order[0]]
+        packed = truncate_tokens(first, budget_tokens, model, keep_end=strategy == "recent")
+        logger.info(f"Truncated a sentence of {count_tokens(first, model)} tokens into the {budget_tokens} token budget")
+        return packed
+
+    packed = " ".join(sentences[i] for i in sorted(kept))
+    logger.info(f"Packed transcript into {used} of {budget_tokens} tokens, {len(kept)}/{len(sentences)} sentences")
+    return packed
+
+
+@dataclass
+class UsageRecord:
+    analyzer: str
+    estimated_prompt_tokens: int
+    prompt_tokens: Optional[int]
+    completion_tokens: Optional[int]
+    latency_sec: float
+
+
+class UsageLedger:
+    """Token counts of every analyzer call, for cost and latency accounting."""
+
+    def __init__(self, max_records: int = 1000):
+        self.records: deque[UsageRecord] = deque(maxlen=max_records)
+        self.totals: dict[str, dict[str, float]] = defaultdict(
+            lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_sec": 0.0}
+        )
+
+    def record(self, record: UsageRecord) -> None:
+        self.records.append(record)
+        totals = self.totals[record.analyzer]
+        totals["calls"] += 1
+        totals["prompt_tokens"] += record.prompt_tokens or record.estimated_prompt_tokens
+        totals["completion_tokens"] += record.completion_tokens or 0
+        totals["latency_sec"] += record.latency_sec
+
+    def snapshot(self, recent: int = 20) -> dict:
+        return {
+            "totals": {name: dict(totals) for name, totals in self.totals.items()},
+            "recent": [asdict(record) for record in list(self.records)[-recent:]],
+        }
@@ -1,38 +1,81 @@
+import contextlib
 import json
 import logging
 import tempfile
 import asyncio
-from datetime import datetime
-from pathlib import Path
+import dataclasses
+import functools
 import time
+import uuid
+from pathlib import Path
+from typing import Literal, Optional
 
 import numpy as np
+from app.transcription.batching import BatchingConfig
 from app.transcription.common import (
     BaseTranscriber,
+    StreamingTranscriptionResult,
     TranscriptionMethod,
     TranscriptionResult,
 )
-from app.transcription.google_speech import GoogleSpeechTranscriber
-from app.transcription.local_whisper import LocalWhisperTranscriber
-from app.transcription.openai_whisper import OpenAIWhisperTranscriber
+from app.transcription.local_whisper import RefinementConfig
 from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ, AudioBuffer
-from app.rhetoric_fact_analyzer import RhetoricFactAnalysis, llm_calls
+from app.rhetoric_fact_analyzer import (
+    analysis_metrics,
+    circuit_breaker,
+    get_client,
+    llm_calls,
+    token_usage,
+)
+from app.analysis.claim_index import ClaimIndexConfig, get_claim_index
+from app.analysis.delivery import AnalysisPublisher, WebSocketSender
+from app.analysis.map_reduce import MapReduceConfig, PostDebateAnalysis, map_reduce_analysis
+from app.analysis.prefilter import PrefilterConfig, RhetoricPrefilter
+from app.analysis.scheduler import AnalysisRound, AnalysisScheduler, AnalysisSchedulerConfig
+from app.analysis.tokens import TokenBudgetConfig
+from app.observability import metrics, tracing
+from app.observability.log_pipeline import bind_session, release_session, setup_logging
+from app.observability.metrics import timed_transcribe_chunk
+from app.observability.tracing import SessionTracer, TracingConfig, span
+from app.observability.profiling import MAX_PROFILE_SEC, profile_cpu, profile_lock, profile_memory
+from app.admin import require_admin
+from app.storage.search import (
+    FindingHit,
+    SegmentHit,
+    SessionHit,
+    search_findings,
+    search_segments,
+    search_sessions,
+    to_match_query,
+)
+from app.storage.cache import CacheConfig, get_cache, lookup
+from app.storage.state import SessionDirectory, SharedConfig, StateConfig, open_state
+from app.storage.store import SessionRecorder, StoreConfig, get_store
+from app.streaming.pipeline import AudioChunk, PipelineConfig, StreamPipeline
+from app.streaming.session import (
+    SEQ_HEADER_BYTES,
+    ResumeConfig,
+    SessionRegistry,
+    StreamSession,
+    resolve_session_config,
+)
 from dotenv import load_dotenv
 from fastapi import (
+    Depends,
     FastAPI,
     File,
+    HTTPException,
+    Query,
+    Response,
     UploadFile,
     WebSocket,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, model_validator
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler(), logging.FileHandler("app.log")],
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 load_dotenv()
@@ -40,13 +83,65 @@ load_dotenv()
 class TranscriptionConfig(BaseModel):
     model_checkpoint: str = "whisper-1"
     method: TranscriptionMethod = TranscriptionMethod.OPENAI_WHISPER
+    language: Optional[str] = None  # e.g. "en" or "en-US", None for the transcriber's default
     save_transcript: bool = True
-    chunk_size_ms: int = 2000
-    overlap_ms: int = 200
+    chunk_size_ms: int = Field(default=2000, gt=0)
+    overlap_ms: int = Field(default=200, ge=0)  # Shorter than chunk_size_ms
     direct_streaming: bool = False  # Option to stream directly without buffering
+    analysis: AnalysisSchedulerConfig = AnalysisSchedulerConfig()
+    map_reduce: MapReduceConfig = MapReduceConfig()
+    prefilter: PrefilterConfig = PrefilterConfig()
+    claim_index: ClaimIndexConfig = ClaimIndexConfig()
+    context_budget: TokenBudgetConfig = TokenBudgetConfig()  # Prompt budget of every analyzer call
+    tracing: TracingConfig = TracingConfig()
+    store: StoreConfig = StoreConfig()
+    resume: ResumeConfig = ResumeConfig()
+    pipeline: PipelineConfig = PipelineConfig()
+    local_batching: BatchingConfig = BatchingConfig()
+    refinement: RefinementConfig = RefinementConfig()
+    file_cache: CacheConfig = CacheConfig()
+
+    @model_validator(mode="after")
+    def check_overlap(self) -> "TranscriptionConfig":
+        # The audio buffer advances by chunk_size_ms - overlap_ms per chunk
+        if self.overlap_ms >= self.chunk_size_ms:
+            raise ValueError("overlap_ms must be shorter than chunk_size_ms")
+        return self
+
 
+# Audio transcribed once at start-up, so the first session does not pay for loading the model
+WARMUP_CHUNK_SEC = 1.0
 
-app = FastAPI()
+
+@dataclasses.dataclass
+class Readiness:
+    """Progress of the start-up warm-up, reported by /ready."""
+
+    ready: bool = False
+    error: Optional[str] = None
+    warmup_sec: Optional[float] = None
+
+
+readiness = Readiness()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Connect to the state backend, then warm up in the background.
+
+    The server accepts connections during the warm-up and /ready reports
+    when it is done.
+    """
+    state_backend = await asyncio.to_thread(open_state, state_config)
+    await asyncio.to_thread(shared_config.start, state_backend)
+    stream_sessions.directory = SessionDirectory(state_backend)
+    task = asyncio.create_task(run_warm_up())
+    yield
+    task.cancel()
+    await asyncio.to_thread(shared_config.close)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -59,13 +154,18 @@ app.add_middleware(
 
 
 def create_transcriber(
-    method: TranscriptionMethod, model_checkpoint: str
+    method: TranscriptionMethod,
+    model_checkpoint: str,
+    language: Optional[str] = None,
+    refinement: Optional[RefinementConfig] = None,
 ) -> BaseTranscriber:
     """Factory function to create the appropriate transcriber based on the method.
 
     Args:
         method: The transcription method to use
         model_checkpoint: Name/identifier of the model to use
+        language: Language of the audio, None for the transcriber's default
+        refinement: Two-tier drafting and refinement, local whisper only
 
     Returns:
         An instance of the appropriate transcriber
@@ -73,34 +173,61 @@ def create_transcriber(
     Raises:
         ValueError: If the method is not supported
     """
+    # Transcribers are imported on first use, as their SDKs are slow to import
     if method == TranscriptionMethod.LOCAL_WHISPER:
-        return LocalWhisperTranscriber(model_checkpoint)
+        from app.transcription.local_whisper import LocalWhisperTranscriber
+
+        # Batching is the worker's, it applies to all sessions sharing a model
+        return LocalWhisperTranscriber(model_checkpoint, language, shared_config.current.local_batching, refinement)
     elif method == TranscriptionMethod.OPENAI_WHISPER:
-        return OpenAIWhisperTranscriber(model_checkpoint)
+        from app.transcription.openai_whisper import OpenAIWhisperTranscriber
+
+        return OpenAIWhisperTranscriber(model_checkpoint, language)
     elif method == TranscriptionMethod.GOOGLE_SPEECH:
-        return GoogleSpeechTranscriber(model_checkpoint)
+        from app.transcription.google_speech import GoogleSpeechTranscriber
+
+        return GoogleSpeechTranscriber(model_checkpoint, language)
     else:
         raise ValueError(f"Unsupported transcription method: {method}")
 
 
-# Global state
-active_config = TranscriptionConfig()
-transcriber = create_transcriber(
-    method=active_config.method,
-    model_checkpoint=active_config.model_checkpoint,
-)
-transcriber_lock = asyncio.Semaphore(1)  # Allow only one transcription at a time
-last_sent_time = time.time() #placeholder for last sent time
-buffered_text = []
+def warm_up(config: TranscriptionConfig) -> None:
+    """Create the default transcriber and run one inference, loading its SDK, client and model.
+
+    Remote methods are not called, only their client is created.
+    """
+    transcriber = create_transcriber(config.method, config.model_checkpoint, config.language, config.refinement)
+    if transcriber.method == TranscriptionMethod.LOCAL_WHISPER:
+        # Faint noise rather than silence, so the decoder runs as it does on speech
+        samples = int(WARMUP_CHUNK_SEC * WHISPER_SAMPLE_RATE_HZ)
+        chunk = np.random.default_rng(0).normal(0, 1e-3, samples).astype(np.float32)
+        transcriber.start_stream()
+        transcriber.transcribe_chunk(chunk)
+        transcriber.stop_stream()
+    try:
+        get_client()
+    except Exception as e:
+        # Transcription works without the analyzers
+        logger.warning(f"Could not create the analysis client: {e}")
+
+
+async def run_warm_up() -> None:
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up, shared_config.current)
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        readiness.error = str(e)
+        return
+    readiness.warmup_sec = round(time.perf_counter() - start, 3)
+    readiness.ready = True
+    logger.info(f"Warmed up in {readiness.warmup_sec:.2f}s")
 
-def save_transcript(result: TranscriptionResult):
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_dir = Path("transcripts")
-    output_dir.mkdir(exist_ok=True)
 
-    output_file = output_dir / f"transcript_{timestamp}.json"
-    with open(output_file, "w") as f:
-        json.dump(result.model_dump(), f, indent=2)
+# The config and the directory of live sessions are shared by all workers
+# through the state backend, selected with STATE_BACKEND and opened at start-up
+state_config = StateConfig.from_env()
+shared_config = SharedConfig(TranscriptionConfig, state_config.poll_interval_sec)
 
 
 # Helper function to determine if direct streaming should be used
@@ -159,17 +286,29 @@ async def get_config():
         TranscriptionConfig: The current configuration including:
         - model_checkpoint: The model to use for transcription
         - method: The transcription method (LOCAL_WHISPER, OPENAI_WHISPER, GOOGLE_SPEECH)
-        - save_transcript: Whether to save transcripts to disk
+        - language: Language of the audio, None for the transcriber's default
+        - save_transcript: Whether to persist transcripts and findings in the store
         - chunk_size_ms: Size of audio chunks in milliseconds
         - overlap_ms: Overlap between consecutive chunks in milliseconds
         - direct_streaming: Whether to stream audio directly to the transcriber without buffering
+        - analysis: Thresholds and intervals of the realtime analysis scheduler
+        - map_reduce: Section size, overlap and concurrency of post-debate analysis
+        - prefilter: Local rhetoric detection and LLM gating of realtime analysis
+        - claim_index: Reuse of fact checks for near-duplicate claims
+        - tracing: Sampling and export of per-session span traces
+        - store: Location and commit batching of the transcript store
+        - resume: How long disconnected /stream sessions are kept for their clients to resume them
+        - pipeline: Queue sizes, overload policy and lag reports of /stream sessions
+        - local_batching: How local whisper decodes the chunks of concurrent sessions together
+        - refinement: Local whisper draft model whose interim text model_checkpoint refines
+        - file_cache: Location and size of the cache of /transcribe/file results
     """
-    return active_config
+    return shared_config.current
 
 
 @app.post("/config")
 async def update_config(config: TranscriptionConfig):
-    """Update the configuration and reinitialize the transcriber.
+    """Update the configuration of all workers, the default of new sessions.
 
     Args:
         config: The new configuration to apply
@@ -186,88 +325,438 @@ async def update_config(config: TranscriptionConfig):
         default even if direct_streaming=False, unless you explicitly set it to False
         and are aware of the potential issues.
     """
-    global active_config, transcriber
+    # Load the models, or fail on an unusable one, before any session uses them
+    await asyncio.to_thread(
+        create_transcriber, config.method, config.model_checkpoint, config.language, config.refinement
+    )
+    # Other workers apply it within state.poll_interval_sec
+    await asyncio.to_thread(shared_config.update, config)
+    return config
 
-    async with transcriber_lock:
-        # Update the active configuration
-        active_config = config
 
-        transcriber = create_transcriber(
-            method=active_config.method,
-            model_checkpoint=active_config.model_checkpoint,
-        )
+@app.post("/transcribe/file")
+async def transcribe_file(response: Response, file: UploadFile = File(...)):
+    """Transcribe a file using the current active configuration.
 
-        return active_config
+    A file whose audio was already transcribed with the same method,
+    checkpoint and language is answered from the cache, which the
+    X-Transcription-Cache header reports as a hit.
+    """
+    config = shared_config.current
 
+    if not file.filename:
+        raise ValueError("Filename is required")
+    file_extension = Path(file.filename).suffix
 
-@app.post("/transcribe/file")
-async def transcribe_file(file: UploadFile = File(...)):
-    """Transcribe a file using the current active configuration."""
-    global transcriber
-
-    async with transcriber_lock:
-        if not file.filename:
-            raise ValueError("Filename is required")
-        file_extension = Path(file.filename).suffix
-
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=file_extension
-        ) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+    with tempfile.NamedTemporaryFile(
+        delete=False, suffix=file_extension
+    ) as temp_file:
+        content = await file.read()
+        temp_file.write(content)
+        temp_path = temp_file.name
 
-        try:
-            # Use the existing transcriber instance
-            result = transcriber.transcribe_file(temp_path)
+    try:
+        result, cache_keys = None, []
+        if config.file_cache.enabled:
+            cache = await asyncio.to_thread(get_cache, config.file_cache)
+            options = {
+                "method": config.method.value,
+                "model_checkpoint": config.model_checkpoint,
+                "language": config.language,
+            }
+            result, cache_keys = await asyncio.to_thread(
+                lookup, cache, options, content, temp_path, config.file_cache.hash_pcm
+            )
+        response.headers["X-Transcription-Cache"] = "hit" if result is not None else "miss"
 
-            if active_config.save_transcript:
-                save_transcript(result)
+        if result is None:
+            # Only created on a miss, so a hit does not load the model. Transcribers share
+            # their model or client, files do not wait on each other or on sessions.
+            transcriber = await asyncio.to_thread(
+                create_transcriber, config.method, config.model_checkpoint, config.language
+            )
+            with metrics.TRANSCRIBER_CALL_SECONDS.labels(
+                transcriber.method.value, transcriber.model_checkpoint
+            ).time():
+                result = await asyncio.to_thread(transcriber.transcribe_file, temp_path)
+            if cache_keys:
+                await asyncio.to_thread(cache.put, cache_keys, result)
+
+        if config.save_transcript:
+            store = await asyncio.to_thread(get_store, config.store, acquire=True)
+            recorder = SessionRecorder(store, uuid.uuid4().hex[:12])
+            recorder.open(
+                "file",
+                config.method.value,
+                config.model_checkpoint,
+                config.model_dump_json(),
+                filename=file.filename,
+            )
+            recorder.record_segment(0, 0, None, result.text, True, recorder.started_ts)
+            recorder.close()
 
-            return result
-        finally:
-            # Clean up temp file
-            Path(temp_path).unlink()
+        return result
+    finally:
+        # Clean up temp file
+        Path(temp_path).unlink()
+
+
+async def open_stream_session(session_id: str, config: TranscriptionConfig) -> StreamSession:
+    """Create the state of a new /stream session and start the transcriber's stream."""
+    # The first session of a model loads it, off the event loop
+    transcriber = await asyncio.to_thread(
+        create_transcriber, config.method, config.model_checkpoint, config.language, config.refinement
+    )
+    # Transcript segments and findings are persisted as the session goes
+    store = await asyncio.to_thread(get_store, config.store, acquire=True) if config.save_transcript else None
+    recorder = SessionRecorder(store, session_id)
+    recorder.open("stream", transcriber.method.value, transcriber.model_checkpoint, config.model_dump_json())
+
+    sender = WebSocketSender(None, config.resume.max_pending_messages)
+    session = StreamSession(
+        id=session_id,
+        config=config,
+        transcriber=transcriber,
+        sender=sender,
+        publisher=AnalysisPublisher(sender),
+        tracer=SessionTracer(session_id, config.tracing),
+        recorder=recorder,
+        prefilter=RhetoricPrefilter(config.prefilter),
+        claim_index=get_claim_index(config.claim_index),
+        # Determine if we should use direct streaming based on the transcription method
+        use_direct_streaming=should_use_direct_streaming(config),
+    )
+    # Realtime analysis is scheduled per session from the growing transcript
+    session.analysis_scheduler = AnalysisScheduler(functools.partial(analyze_round, session), config.analysis)
+
+    # Create audio buffer for accumulating samples if not using direct streaming
+    audio_buffer = None
+    if not session.use_direct_streaming:
+        audio_buffer = AudioBuffer(
+            chunk_size_ms=config.chunk_size_ms,
+            overlap_ms=config.overlap_ms,
+            sample_rate=WHISPER_SAMPLE_RATE_HZ,
+        )
+        logger.info(
+            f"Audio buffer created with chunk size {config.chunk_size_ms}ms and overlap {config.overlap_ms}ms"
+        )
+    else:
+        logger.info(
+            f"Direct streaming mode enabled for {config.method} - bypassing audio buffer"
+        )
+    session.pipeline = StreamPipeline(
+        config.pipeline,
+        audio_buffer,
+        transcribe=functools.partial(transcribe_audio_chunk, session),
+        deliver=functools.partial(deliver_transcript, session),
+        # Lag reports are only of use live, a resuming client gets a new one
+        report=functools.partial(sender.send_json, keep=False),
+    )
+
+    if config.pipeline.overload_policy == "degrade" and config.pipeline.degraded_model_checkpoint:
+        session.degraded_transcriber = await asyncio.to_thread(
+            create_transcriber, config.method, config.pipeline.degraded_model_checkpoint, config.language
+        )
+        session.degraded_transcriber.start_stream()
+
+    # Initialize streaming mode
+    session.transcriber.start_stream()
+    session.active_transcriber = session.transcriber
+    loop = asyncio.get_running_loop()
+    session.transcriber.on_revision = lambda: asyncio.run_coroutine_threadsafe(send_revision(session), loop)
+    logger.info("Transcriber streaming mode initialized")
+    metrics.ACTIVE_SESSIONS.inc()
+    return session
+
+
+async def close_stream_session(session: StreamSession) -> None:
+    """Release a session that ended or was not resumed in time."""
+    logger.info(f"Closing session {session.id}")
+    metrics.ACTIVE_SESSIONS.dec()
+    # A finished session first sends what it still had queued
+    await session.pipeline.close()
+    await session.analysis_scheduler.close()
+    if session.postdebate_task is not None and not session.postdebate_task.done():
+        session.postdebate_task.cancel()
+        # Its spans must be finished before the trace is exported
+        await asyncio.wait([session.postdebate_task])
+    session.transcriber.on_revision = None
+    session.transcriber.stop_stream()
+    if session.degraded_transcriber is not None:
+        session.degraded_transcriber.stop_stream()
+    session.sender.close()
+    try:
+        await asyncio.to_thread(session.tracer.export)
+    except Exception as e:
+        logger.error(f"Error exporting trace of session {session.id}: {e}")
+    session.recorder.close()
+    release_session(session.id)
+
+
+stream_sessions = SessionRegistry(close_stream_session)  # Given the session directory at start-up
+
+
+async def analyze_round(session: StreamSession, analysis_round: AnalysisRound):
+    config, recorder, publisher = session.config, session.recorder, session.publisher
+    if config.prefilter.enabled:
+        # Only send the sentences the local detector scores as promising
+        llm_text = session.prefilter.select_for_llm(analysis_round.text)
+        if not llm_text:
+            logger.info(f"Skipping LLM for analysis round {analysis_round.number}")
+            return None
+        analysis_round = dataclasses.replace(analysis_round, text=llm_text)
+
+    fact_check_text = analysis_round.text
+    if config.claim_index.enabled:
+        # Near-duplicates of claims checked earlier reuse their fact checks
+        fact_check_text, reused = session.claim_index.partition(analysis_round.text)
+        for fact_check in reused:
+            recorder.record_item(
+                analysis_round.number, analysis_round.utterance_ts, "claim_index", "fact_checks", fact_check
+            )
+            await publisher.publish_item(analysis_round, "claim_index", "fact_checks", fact_check)
+
+    async def on_result(name, result):
+        if name == "fact_checks" and config.claim_index.enabled:
+            session.claim_index.add_results(fact_check_text, result.fact_checks)
+        recorder.record_result(analysis_round.number, analysis_round.utterance_ts, name, result)
+        await publisher.publish(analysis_round, name, result)
+
+    async def on_item(name, field, item):
+        recorder.record_item(analysis_round.number, analysis_round.utterance_ts, name, field, item)
+        await publisher.publish_item(analysis_round, name, field, item)
+
+    return await llm_calls(
+        analysis_round.text,
+        on_result=on_result,
+        on_item=on_item if config.analysis.stream_findings else None,
+        sheddable=True,
+        analyzer_texts={"fact_checks": fact_check_text},
+        budget=config.context_budget,
+    )
+
+
+async def analyze_postdebate(session: StreamSession, analysis_round: AnalysisRound):
+    async def on_result(name, result):
+        await session.publisher.publish(analysis_round, name, result, scope="postdebate")
+
+    with span("postdebate", root=True, text_chars=len(analysis_round.text)):
+        analysis = await map_reduce_analysis(
+            analysis_round.text,
+            session.config.map_reduce,
+            on_result=on_result,
+            budget=session.config.context_budget,
+        )
+        # Only the merged findings are stored, not those of each section
+        session.recorder.record_result(
+            analysis_round.number, analysis_round.utterance_ts, "postdebate_analysis", analysis, scope="postdebate"
+        )
+        await session.publisher.publish(
+            analysis_round, "postdebate_analysis", analysis, scope="postdebate"
+        )
+    return analysis
 
 
-@app.websocket("/stream")
-async def websocket_endpoint(websocket: WebSocket):
-    """Handle WebSocket connections for real-time audio streaming."""
-    logger.info("New WebSocket connection attempt")
-    await websocket.accept()
-    logger.info("WebSocket connection accepted")
+async def on_transcript(session: StreamSession, text: str, utterance_ts: float):
+    if session.config.prefilter.enabled:
+        for sentence in session.prefilter.feed(text):
+            for detection in sentence.detections:
+                session.recorder.record_item(0, utterance_ts, "local_rhetoric", "rhetorical_strategies", detection)
+                await session.publisher.publish_detection(detection, utterance_ts)
+    session.analysis_scheduler.on_text(text, utterance_ts)
 
-    try:
-        # Initialize streaming mode
-        transcriber.start_stream()
-        logger.info("Transcriber streaming mode initialized")
-        global last_sent_time
 
-        # Determine if we should use direct streaming based on the transcription method
-        use_direct_streaming = should_use_direct_streaming(active_config)
-
-        # Create audio buffer for accumulating samples if not using direct streaming
-        if not use_direct_streaming:
-            audio_buffer = AudioBuffer(
-                chunk_size_ms=active_config.chunk_size_ms,
-                overlap_ms=active_config.overlap_ms,
-                sample_rate=WHISPER_SAMPLE_RATE_HZ,
-            )
-            logger.info(
-                f"Audio buffer created with chunk size {active_config.chunk_size_ms}ms and overlap {active_config.overlap_ms}ms"
+async def transcribe_audio_chunk(
+    session: StreamSession, chunk: AudioChunk, degraded: bool
+) -> StreamingTranscriptionResult:
+    """Transcribe a chunk, the transcribe stage of the session's pipeline.
+
+    While the pipeline is behind, the degraded transcriber takes over the
+    transcript so far, and hands it back once it caught up.
+    """
+    transcriber = session.transcriber
+    if degraded and session.degraded_transcriber is not None:
+        transcriber = session.degraded_transcriber
+    if transcriber is not session.active_transcriber:
+        transcriber.current_text = session.active_transcriber.current_text
+        transcriber.last_chunk_text = session.active_transcriber.last_chunk_text
+        session.active_transcriber = transcriber
+
+    with span(
+        "chunk", root=True, seq=chunk.seq, samples=len(chunk.samples), is_final=chunk.is_final, degraded=degraded
+    ):
+        stage_start = time.perf_counter()
+        with span("transcribe", method=transcriber.method.value) as transcribe_span:
+            # Adapt audio format for the specific transcription method
+            adapted_samples = adapt_audio_format(chunk.samples, session.config.method)
+            # Off the event loop, so sessions do not wait on each other's transcriptions
+            result = await asyncio.to_thread(
+                timed_transcribe_chunk, transcriber, adapted_samples, is_final=chunk.is_final
             )
-        else:
-            logger.info(
-                f"Direct streaming mode enabled for {active_config.method} - bypassing audio buffer"
+            transcribe_span.set_attribute("text_chars", len(result.text))
+        metrics.STAGE["transcribe"].observe(time.perf_counter() - stage_start)
+    return result
+
+
+async def deliver_transcript(session: StreamSession, chunk: AudioChunk, result: StreamingTranscriptionResult):
+    """Store and send the transcript of a chunk, the send stage of the session's pipeline."""
+    session.recorder.record_segment(
+        chunk.seq, chunk.start_sample, len(chunk.samples), result.text, chunk.is_final, chunk.received_ts
+    )
+
+    # Only send a non-final response if there's text to send
+    if result.text or chunk.is_final:
+        stage_start = time.perf_counter()
+        with span("send", root=True, seq=chunk.seq):
+            await session.sender.send_json({
+                "type": "transcript",
+                "text": result.text,
+                "is_final": chunk.is_final,
+                "seq": chunk.seq,
+            })
+        metrics.STAGE["send"].observe(time.perf_counter() - stage_start)
+        latency = time.time() - chunk.received_ts
+        metrics.STAGE["end_to_end"].observe(latency)
+        session.tracer.observe_latency(latency)
+        if not chunk.is_final:
+            await on_transcript(session, result.text, chunk.received_ts)
+
+    if chunk.is_final:
+        # Rhetorical analysis of full debate before closing connection
+        await session.analysis_scheduler.close()
+        if result.text and session.postdebate_task is None:
+            now = time.time()
+            session.postdebate_task = asyncio.create_task(
+                analyze_postdebate(
+                    session,
+                    AnalysisRound(
+                        number=session.analysis_scheduler.rounds_started + 1,
+                        text=result.text,
+                        utterance_ts=now,
+                        latest_utterance_ts=now,
+                        started_ts=now,
+                    ),
+                )
             )
+        logger.info(f"Processed final chunk of {len(result.text)} chars")
+
+
+async def send_revision(session: StreamSession):
+    """Send the transcript again after the transcriber revised earlier text, e.g. refined a draft."""
+    # While the degraded transcriber holds the transcript it sends the next one,
+    # and the final transcript already includes every refinement
+    if session.active_transcriber is not session.transcriber or session.finished:
+        return
+    await session.sender.send_json({
+        "type": "transcript",
+        "text": session.transcriber.current_text,
+        "is_final": False,
+        "revision": True,
+    })
+
+
+def parse_handshake(message: dict) -> Optional[dict]:
+    """Return the settings of a {"type": "config", "config": {...}} message, None for any other message."""
+    if message["type"] != "websocket.receive" or not message.get("text"):
+        return None
+    try:
+        data = json.loads(message["text"])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or data.get("type") != "config":
+        return None
+    return data.get("config") or {}
 
-        #Starting timer for rhetoric analysis
-        last_sent_time = time.time()
 
+@app.websocket("/stream")
+async def websocket_endpoint(websocket: WebSocket, session_id: Optional[str] = None):
+    """Handle WebSocket connections for real-time audio streaming.
+
+    Messages from the client, audio and control alike, are numbered from 1:
+    audio frames start with their number as a little-endian uint32 before
+    the float32 samples, and control messages carry it as "seq". Messages
+    numbered at or below the last one received are duplicates and dropped.
+    The server first sends {"type": "session", "session_id", "resumed",
+    "last_seq"} and acknowledges received messages with {"type": "ack",
+    "seq"} every `resume.ack_every_messages`. A client that lost its
+    connection reconnects with ?session_id=<id> within
+    `resume.grace_period_sec` and, once greeted, resends the messages after
+    `last_seq` before any new one; the session's buffered audio, transcript
+    and analysis state are kept, and the messages sent while it was away are
+    delivered first.
+    Sessions live in the worker that created them: a reconnection reaching
+    another worker is closed with code 1013, for the client to try again.
+
+    A new session may be configured by a first, unnumbered message
+    {"type": "config", "config": {...}} with the settings of
+    `SESSION_CONFIG_FIELDS` it changes from the shared config, e.g. its
+    method, checkpoint, language, chunking or analysis. Invalid settings
+    are answered with {"type": "error"} and code 1008.
+    """
+    logger.info("New WebSocket connection attempt")
+    await websocket.accept()
+    session = await stream_sessions.resume(session_id) if session_id else None
+    if session is None and session_id:
+        owner = await stream_sessions.served_elsewhere(session_id)
+        if owner is not None:
+            logger.warning(f"Session {session_id} is served by worker {owner}, closing the reconnection")
+            await websocket.close(code=1013, reason="Session is served by another worker")
+            return
+    # A first message that is not a handshake is handled as part of the stream
+    pending_message = None
+    if session is None:
+        session_id = uuid.uuid4().hex[:12]
+        bind_session(session_id)
+        # Greeted before the handshake, so clients may wait for the session id
+        await websocket.send_json({"type": "session", "session_id": session_id, "resumed": False, "last_seq": 0})
+        pending_message = await websocket.receive()
+        if pending_message["type"] == "websocket.disconnect":
+            release_session(session_id)
+            return
+        overrides = parse_handshake(pending_message)
+        config = shared_config.current
+        if overrides is not None:
+            pending_message = None
+            try:
+                config = resolve_session_config(config, overrides)
+            except ValueError as e:
+                logger.warning(f"Rejected the config of session {session_id}: {e}")
+                await websocket.send_json({"type": "error", "error": f"Invalid session config: {e}"})
+                await websocket.close(code=1008)
+                release_session(session_id)
+                return
+
+        session = await open_stream_session(session_id, config)
+        await stream_sessions.add(session)
+        logger.info(f"WebSocket connection accepted, session {session_id} using {config.method.value}")
+        greeting = None
+    else:
+        bind_session(session_id)
+        session.transcriber.resume_stream()
+        logger.info(f"WebSocket connection accepted, resuming session {session_id} after message {session.seq}")
+        greeting = {"type": "session", "session_id": session.id, "resumed": True, "last_seq": session.seq}
+
+    # Spans opened by this session and the tasks it creates go to its tracer
+    tracing.activate(session.tracer)
+    session.connection = asyncio.current_task()
+    await session.sender.attach(websocket, greeting)
+    # The stages run in tasks of their own, for the whole session
+    session.pipeline.start()
+
+    acked_seq = session.seq
+    try:
         while True:
+            if session.seq - acked_seq >= session.config.resume.ack_every_messages:
+                await session.sender.send_json({"type": "ack", "seq": session.seq})
+                acked_seq = session.seq
+                await stream_sessions.renew(session)
+
             # Receive message
             try:
-                message = await websocket.receive()
+                if pending_message is not None:
+                    message, pending_message = pending_message, None
+                else:
+                    message = await websocket.receive()
             except Exception as e:
                 logger.error(f"Error receiving message: {e}")
                 break
@@ -275,55 +764,29 @@ async def websocket_endpoint(websocket: WebSocket):
             try:
                 if (message["type"] == "websocket.receive") and ("bytes" in message):
                     # Handle binary audio data
+                    received_ts = time.time()
+                    stage_start = time.perf_counter()
                     audio_data = message["bytes"]
                     data_len = len(audio_data) if audio_data else 0
 
-                    if not audio_data or data_len == 0:
+                    if not audio_data or data_len <= SEQ_HEADER_BYTES:
                         logger.debug("Skipping empty audio data")
                         continue
+                    metrics.BYTES_IN.inc(data_len)
+                    metrics.MESSAGES_IN.inc()
+                    seq = int.from_bytes(audio_data[:SEQ_HEADER_BYTES], "little")
+                    if seq <= session.seq:
+                        logger.debug(f"Skipping audio message {seq}, already received")
+                        continue
+                    session.seq = seq
 
                     try:
-                        # Convert to numpy array
-                        samples = np.frombuffer(audio_data, dtype=np.float32)
-
-                        if use_direct_streaming:
-                            # Adapt audio format for the specific transcription method
-                            adapted_samples = adapt_audio_format(
-                                samples, active_config.method
-                            )
-
-                            # Stream directly to transcriber without buffering
-                            result = transcriber.transcribe_chunk(adapted_samples)
-
-                            # Only send response if there's text to send
-                            if result.text:
-                                await websocket.send_json({
-                                    "text": result.text,
-                                    "is_final": False,
-                                })
-
-                        else:
-                            # Add samples to buffer and get complete chunks
-                            complete_chunks = audio_buffer.add_samples(samples)
-
-                            # Process each complete chunk
-                            for chunk in complete_chunks:
-                                # Adapt audio format for the specific transcription method
-                                adapted_chunk = adapt_audio_format(
-                                    chunk, active_config.method
-                                )
-
-                                result = transcriber.transcribe_chunk(adapted_chunk)
-
-                                # Only send response if there's text to send
-                                if result.text:
-                                    await websocket.send_json({
-                                        "text": result.text,
-                                        "is_final": False,
-                                    })
-
-                        if result.text:
-                            realtime_moderation_helper(result.text) #TODO: Does this need to be awaited?
+                        with span("audio_message", seq=seq, bytes=data_len):
+                            # Convert to numpy array
+                            samples = np.frombuffer(audio_data, dtype=np.float32, offset=SEQ_HEADER_BYTES)
+                            metrics.STAGE["receive"].observe(time.perf_counter() - stage_start)
+                            # Chunked and transcribed by the pipeline, while this loop receives on
+                            await session.pipeline.put_audio(seq, samples, received_ts)
 
                     except Exception as e:
                         logger.error(f"Error processing audio data: {e}")
@@ -331,66 +794,22 @@ async def websocket_endpoint(websocket: WebSocket):
 
                 elif (message["type"] == "websocket.receive") and ("text" in message):
                     # Handle control message
+                    metrics.BYTES_IN.inc(len(message["text"]))
+                    metrics.MESSAGES_IN.inc()
                     try:
                         data = json.loads(message["text"])
                         logger.debug(f"Received control message: {data}")
-                        if data.get("isLastChunk"):
+                        seq = data.get("seq")
+                        if not isinstance(seq, int) or seq <= session.seq:
+                            logger.debug(f"Skipping control message {seq}, already received or not numbered")
+                            continue
+                        session.seq = seq
+                        if data.get("isLastChunk") and not session.finished:
                             logger.info("Processing final chunk")
-                            # Process any remaining samples if not using direct streaming
-                            if not use_direct_streaming:
-                                remaining_samples = audio_buffer.get_remaining_samples()
-                                if len(remaining_samples) > 0:
-                                    # Adapt audio format for the specific transcription method
-                                    adapted_remaining = adapt_audio_format(
-                                        remaining_samples, active_config.method
-                                    )
-
-                                    result = transcriber.transcribe_chunk(
-                                        adapted_remaining, is_final=True
-                                    )
-                                    await websocket.send_json({
-                                        "text": result.text,
-                                        "is_final": True,
-                                    })
-                                else:
-                                    # No remaining samples, just send a final empty chunk
-                                    empty_array = (
-                                        np.array([], dtype=np.int16)
-                                        if active_config.method
-                                        == TranscriptionMethod.GOOGLE_SPEECH
-                                        else np.array([], dtype=np.float32)
-                                    )
-
-                                    result = transcriber.transcribe_chunk(
-                                        empty_array, is_final=True
-                                    )
-                                    await websocket.send_json({
-                                        "text": result.text,
-                                        "is_final": True,
-                                    })
-                            else:
-                                # For direct streaming, send a final empty chunk
-                                # Use the appropriate data type based on the transcription method
-                                empty_array = (
-                                    np.array([], dtype=np.int16)
-                                    if active_config.method
-                                    == TranscriptionMethod.GOOGLE_SPEECH
-                                    else np.array([], dtype=np.float32)
-                                )
-
-                                result = transcriber.transcribe_chunk(
-                                    empty_array, is_final=True
-                                )
-                                await websocket.send_json({
-                                    "text": result.text,
-                                    "is_final": True,
-                                })
-
-                            # Rhetorical analysis of full debate before closing connection
-                            if result.text:
-                                postdebate_moderation_helper(result.text)
-
-                            logger.info(f"Processed final chunk: {result.text}")
+                            session.finished = True
+                            # The rest of the buffered audio is transcribed as the final chunk,
+                            # after which the send stage starts the post-debate analysis
+                            await session.pipeline.finish(session.seq)
 
                             continue
 
@@ -406,11 +825,15 @@ async def websocket_endpoint(websocket: WebSocket):
                 logger.error(f"Error handling message: {e}")
                 continue
 
+    except asyncio.CancelledError:
+        if session.connection is not None:
+            raise
+        logger.info("Connection taken over by a new connection of the client")
     except Exception as e:
         logger.error(f"Error in WebSocket connection: {e}")
     finally:
         logger.info("Cleaning up connection")
-        transcriber.stop_stream()
+        session.connection = None
         try:
             # Check if the connection is already closed before trying to close it
             if not websocket.client_state.DISCONNECTED:
@@ -420,24 +843,178 @@ async def websocket_endpoint(websocket: WebSocket):
         except Exception as e:
             logger.error(f"Error closing websocket: {e}")
 
+        grace_period_sec = session.config.resume.grace_period_sec
+        if session.finished or grace_period_sec <= 0:
+            await stream_sessions.close(session)
+        else:
+            # Keep the session for the client to resume it
+            await stream_sessions.detach(session, grace_period_sec)
 
 
-def realtime_moderation_helper(debate_text : str) -> None:
-    '''This function is used to get the rhetoric analysis and fact checking of the debate in real time'''
-    global last_sent_time
+@app.post("/rhetoric_analysis")
+async def postdebate_moderation_helper(debate_text : str) -> PostDebateAnalysis:
+    '''This function is used to get post rhetoric analysis, fact checking and argument maps of the debate.
 
-    # Check if 10 seconds have passed since last analysis
-    if time.time() - last_sent_time >= 10:
-        logger.info(f"Sending to LLM for analysis {debate_text}")
+    Long transcripts are split into overlapping sections that are analyzed
+    concurrently and merged, so they never overflow the model context.'''
+    config = shared_config.current
+    return await map_reduce_analysis(debate_text, config.map_reduce, budget=config.context_budget)
 
-        asyncio.create_task(llm_calls(debate_text))
-        
-        # reset timer
-        last_sent_time = time.time()
 
-    return None
+@app.get("/ready")
+async def get_ready(response: Response):
+    """Report whether the start-up warm-up finished, for readiness probes.
 
-@app.post("/rhetoric_analysis")
-def postdebate_moderation_helper(debate_text : str) -> RhetoricFactAnalysis:
-    '''This function is used to get post rhetoric analysis and fact checking of the debate'''
-    return asyncio.create_task(llm_calls(debate_text))
+    Returns:
+        dict with whether the server is ready, the warm-up error if it
+        failed and how long it took. The status is 503 until ready.
+    """
+    if not readiness.ready:
+        response.status_code = 503
+    return dataclasses.asdict(readiness)
+
+
+@app.get("/analysis/health")
+async def get_analysis_health():
+    """Report the state of the analysis provider and per-analyzer call metrics.
+
+    Returns:
+        dict with the circuit breaker state, per analyzer the number of
+        calls, attempts, retries, timeouts, errors, refusals, failures and
+        shed realtime requests, and the prompt/completion token counts of
+        the most recent calls
+    """
+    return {
+        "circuit_breaker": circuit_breaker.state,
+        "consecutive_failures": circuit_breaker.consecutive_failures,
+        "analyzers": analysis_metrics.snapshot(),
+        "tokens": token_usage.snapshot(),
+    }
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Return a stored session with its transcript segments and findings.
+
+    Segment and finding offsets are in milliseconds from the start of the
+    session. Writes are committed in batches, so the last
+    `store.commit_interval_ms` of a live session may be missing.
+    """
+    store = await asyncio.to_thread(get_store, shared_config.current.store)
+    session = await asyncio.to_thread(store.load_session, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+async def run_search(search, q: str, **kwargs):
+    """Run a full-text search of the store in a thread, with its own connection."""
+    try:
+        match_query = to_match_query(q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    store = await asyncio.to_thread(get_store, shared_config.current.store)
+
+    def run():
+        with contextlib.closing(store.connect()) as conn:
+            return search(conn, match_query, **kwargs)
+
+    return await asyncio.to_thread(run)
+
+
+@app.get("/search/segments")
+async def search_segments_endpoint(
+    q: str, session_id: Optional[str] = None, limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)
+) -> list[SegmentHit]:
+    """Find transcript segments containing all words and "quoted phrases" of `q`.
+
+    Hits are ranked by BM25 and carry the offset of their audio in the
+    session, in milliseconds.
+    """
+    return await run_search(search_segments, q, session_id=session_id, limit=limit, offset=offset)
+
+
+@app.get("/search/findings")
+async def search_findings_endpoint(
+    q: str,
+    field: Optional[str] = None,
+    session_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+) -> list[FindingHit]:
+    """Find findings whose quote or label contains all words and "quoted phrases" of `q`.
+
+    `field` narrows the search to one kind of finding, e.g. "fallacies",
+    "rhetorical_strategies" or "fact_checks".
+    """
+    return await run_search(search_findings, q, field=field, session_id=session_id, limit=limit, offset=offset)
+
+
+@app.get("/search/sessions")
+async def search_sessions_endpoint(
+    q: str, limit: int = Query(20, ge=1, le=200), offset: int = Query(0, ge=0)
+) -> list[SessionHit]:
+    """Find the sessions whose transcript mentions `q`, ranked by their best matching segment."""
+    return await run_search(search_sessions, q, limit=limit, offset=offset)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Export stage latencies, transcriber and LLM call latencies, queue depths,
+    active sessions and websocket traffic in the Prometheus text format."""
+    content, content_type = metrics.render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@app.post("/admin/profile/cpu", dependencies=[Depends(require_admin)])
+async def profile_cpu_endpoint(
+    duration_sec: float = 10,
+    mode: Literal["wall", "cpu"] = "cpu",
+    interval_ms: float = 10,
+):
+    """Sample the stacks of the live process for a while.
+
+    Args:
+        duration_sec: How long to sample, at most MAX_PROFILE_SEC
+        mode: "cpu" counts only threads running on a CPU, including native
+            whisper.cpp threads; "wall" counts every thread, waiting or not
+        interval_ms: Time between samples
+
+    Returns:
+        Collapsed stacks, one "frame;frame;frame count" per line, ready for
+        flamegraph.pl or speedscope
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        collapsed, samples = await profile_cpu(
+            min(duration_sec, MAX_PROFILE_SEC), interval_ms / 1000, mode
+        )
+    return PlainTextResponse(collapsed, headers={"X-Profile-Samples": str(samples)})
+
+
+@app.post("/admin/profile/memory", dependencies=[Depends(require_admin)])
+async def profile_memory_endpoint(
+    duration_sec: float = 10,
+    format: Literal["collapsed", "json"] = "collapsed",
+    top: int = 30,
+):
+    """Trace the allocations made during a window and still alive at its end.
+
+    Args:
+        duration_sec: Length of the window, at most MAX_PROFILE_SEC
+        format: "collapsed" for allocation stacks weighted by bytes, ready
+            for flamegraph.pl or speedscope; "json" for the top source lines
+        top: Number of source lines in the JSON summary
+
+    Returns:
+        Collapsed stacks as text, or the top source lines as JSON
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with profile_lock:
+        collapsed, summary = await profile_memory(min(duration_sec, MAX_PROFILE_SEC), top=top)
+    if format == "json":
+        return {"top": summary}
+    return PlainTextResponse(collapsed)
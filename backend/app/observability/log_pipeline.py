@@ -0,0 +1,220 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.observability.metrics import LOG_RECORDS_DROPPED
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CONSOLE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+SWEEP_INTERVAL_SEC = 60
+
+_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_session_id", default=None)
+_listener: Optional[QueueListener] = None
+
+
+class LoggingConfig(BaseModel):
+    level: str = "INFO"
+    path: Optional[str] = "app.log"  # None logs to the console only
+    max_bytes: int = 10 * 1024 * 1024  # The file is rotated past this size
+    backup_count: int = 5
+    json_file: bool = True  # One JSON object per line in the file, plain text on the console
+    max_message_chars: int = 2000  # Longer messages are truncated before they are queued
+    session_rate_per_sec: float = 20.0  # Sustained records per second per session, below WARNING
+    session_burst: int = 100
+    queue_size: int = 10000  # Records are dropped, not waited on, when the writer falls behind
+
+    @classmethod
+    def from_env(cls) -> "LoggingConfig":
+        """Read overrides from LOG_LEVEL, LOG_PATH, LOG_MAX_BYTES and the like."""
+        overrides = {}
+        for field in cls.model_fields:
+            value = os.environ.get(f"LOG_{field.upper()}")
+            if value is not None:
+                overrides[field] = None if field == "path" and value == "" else value
+        return cls.model_validate(overrides)
+
+
+def bind_session(session_id: str) -> contextvars.Token:
+    """Tag the records logged by the current task, and the tasks it creates, with a session."""
+    return _session_id.set(session_id)
+
+
+def release_session(session_id: str) -> None:
+    """Forget the rate limit state of a session that ended."""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, SessionQueueHandler):
+            suppressed = handler.limiter.forget(session_id)
+            if suppressed:
+                logger.warning(f"Suppressed the last {suppressed} log records of session {session_id}")
+
+
+class SessionRateLimiter:
+    """Token bucket per session, so one chatty session cannot flood the log."""
+
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self._buckets: dict[str, list[float]] = {}  # session -> [tokens, last refill, suppressed]
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL_SEC
+
+    def allow(self, session_id: str) -> tuple[bool, int]:
+        """Take a token for a record of the session.
+
+        Returns:
+            Tuple of whether the record may be logged and, if it may, how many
+            records of the session were suppressed since the last one logged
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(session_id)
+            if bucket is None:
+                bucket = self._buckets[session_id] = [float(self.burst), now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_sec)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False, 0
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+            if now >= self._next_sweep:
+                self._sweep(now)
+            return True, suppressed
+
+    def _sweep(self, now: float) -> None:
+        # Background tasks can keep logging after their session was released,
+        # so buckets idle long enough to refill completely are dropped
+        refill_sec = self.burst / self.rate_per_sec
+        self._buckets = {
+            session_id: bucket for session_id, bucket in self._buckets.items() if now - bucket[1] < refill_sec
+        }
+        self._next_sweep = now + SWEEP_INTERVAL_SEC
+
+    def forget(self, session_id: str) -> int:
+        """Drop the session's bucket and return how many records were suppressed since its last one."""
+        with self._lock:
+            bucket = self._buckets.pop(session_id, None)
+        return bucket[2] if bucket else 0
+
+
+class SessionQueueHandler(QueueHandler):
+    """Hand records to the background writer without blocking the caller.
+
+    Runs in the logging thread, so it only does the cheap work: tagging the
+    record with its session, rate limiting, and rendering and truncating the
+    message so the queued record no longer references the caller's objects.
+    """
+
+    def __init__(self, log_queue: queue.Queue, config: LoggingConfig):
+        super().__init__(log_queue)
+        self.max_message_chars = config.max_message_chars
+        self.limiter = SessionRateLimiter(config.session_rate_per_sec, config.session_burst)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        record.session_id = _session_id.get()
+        record.suppressed = 0
+        if record.session_id is not None and record.levelno < logging.WARNING:
+            allowed, record.suppressed = self.limiter.allow(record.session_id)
+            if not allowed:
+                LOG_RECORDS_DROPPED.labels("rate_limited").inc()
+                return
+        super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_message_chars:
+            message = f"{message[:self.max_message_chars]}... [{len(message) - self.max_message_chars} chars truncated]"
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+
+        prepared = logging.makeLogRecord(record.__dict__)
+        prepared.msg, prepared.args, prepared.message = message, None, message
+        prepared.exc_info, prepared.exc_text = None, exc_text
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the session the record belongs to."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        session_id = getattr(record, "session_id", None)
+        if session_id is not None:
+            entry["session_id"] = session_id
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed_before"] = suppressed
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(config: Optional[LoggingConfig] = None) -> None:
+    """Route all logging through a bounded queue to a background writer thread.
+
+    The console and the rotating log file are written by the writer thread,
+    so a slow disk never stalls the event loop. Safe to call more than once;
+    later calls replace the previous pipeline.
+
+    Args:
+        config: Logging settings, read from the LOG_* environment variables by default
+    """
+    global _listener
+    config = config or LoggingConfig.from_env()
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    handlers: list[logging.Handler] = [console]
+    if config.path is not None:
+        log_file = RotatingFileHandler(
+            config.path, maxBytes=config.max_bytes, backupCount=config.backup_count, encoding="utf-8"
+        )
+        log_file.setFormatter(JsonFormatter() if config.json_file else logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(log_file)
+
+    if _listener is not None:
+        _listener.stop()
+    log_queue: queue.Queue = queue.Queue(config.queue_size)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(SessionQueueHandler(log_queue, config))
+    root.setLevel(config.level.upper())
+
+
+@atexit.register
+def shutdown_logging() -> None:
+    """Flush the records still queued. Runs at exit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
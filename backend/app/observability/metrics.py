@@ -0,0 +1,171 @@
+import logging
+import time
+
+import numpy as np
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+from app.transcription.common import BaseTranscriber, StreamingTranscriptionResult
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "truthseeker"
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 4)
+
+STREAM_STAGE_SECONDS = Histogram(
+    "stream_stage_seconds",
+    "Time spent per websocket message in each stage of the /stream loop",
+    ["stage"],  # receive, buffer, transcribe, send, end_to_end
+    namespace=NAMESPACE,
+    buckets=STAGE_BUCKETS,
+)
+TRANSCRIBER_CALL_SECONDS = Histogram(
+    "transcriber_call_seconds",
+    "Latency of transcriber calls",
+    ["method", "model"],
+    namespace=NAMESPACE,
+    buckets=CALL_BUCKETS,
+)
+TRANSCRIBER_REAL_TIME_FACTOR = Histogram(
+    "transcriber_real_time_factor",
+    "Transcriber processing time divided by the duration of the audio",
+    ["method", "model"],
+    namespace=NAMESPACE,
+    buckets=RTF_BUCKETS,
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_seconds",
+    "Latency of analyzer LLM calls",
+    ["analyzer", "outcome"],  # outcome: ok, refusal, invalid_json
+    namespace=NAMESPACE,
+    buckets=CALL_BUCKETS,
+)
+QUEUE_DEPTH = Gauge(
+    "queue_depth",
+    "Items waiting in the queues of the streaming path",
+    ["queue"],  # audio_buffer_samples, google_audio_chunks, analysis_rounds, store_writes, stream_*
+    namespace=NAMESPACE,
+)
+ACTIVE_SESSIONS = Gauge("active_sessions", "Open /stream websocket sessions", namespace=NAMESPACE)
+DETACHED_SESSIONS = Gauge(
+    "detached_sessions", "Sessions whose client disconnected and may still resume them", namespace=NAMESPACE
+)
+WEBSOCKET_BYTES = Counter(
+    "websocket_bytes",
+    "Bytes received from and sent to /stream clients",
+    ["direction"],  # in, out
+    namespace=NAMESPACE,
+)
+WEBSOCKET_MESSAGES = Counter(
+    "websocket_messages",
+    "Messages received from and sent to /stream clients",
+    ["direction"],
+    namespace=NAMESPACE,
+)
+STREAM_CHUNKS_SHED = Counter(
+    "stream_chunks_shed",
+    "Chunks not transcribed on their own because the transcriber fell behind",
+    ["outcome"],  # dropped, merged
+    namespace=NAMESPACE,
+)
+STREAM_LAG_SECONDS = Histogram(
+    "stream_lag_seconds",
+    "Time from a chunk's audio arriving to its transcript being sent, including queueing",
+    namespace=NAMESPACE,
+    buckets=CALL_BUCKETS,
+)
+LOCAL_WHISPER_BATCH_SIZE = Histogram(
+    "local_whisper_batch_size",
+    "Chunks of concurrent sessions decoded in one local whisper call",
+    namespace=NAMESPACE,
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16),
+)
+LOCAL_WHISPER_REFINEMENTS = Counter(
+    "local_whisper_refinements",
+    "Draft chunks decoded again by the refining model in two-tier mode",
+    ["outcome"],  # changed, unchanged, skipped
+    namespace=NAMESPACE,
+)
+TRANSCRIPTION_CACHE_LOOKUPS = Counter(
+    "transcription_cache_lookups",
+    "Uploaded files looked up in the transcription cache",
+    ["outcome"],  # file_hit, audio_hit, miss
+    namespace=NAMESPACE,
+)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped",
+    "Log records dropped before reaching the log writer",
+    ["reason"],  # rate_limited, queue_full
+    namespace=NAMESPACE,
+)
+STORE_WRITES_DROPPED = Counter(
+    "store_writes_dropped",
+    "Transcript store writes dropped because the writer fell behind",
+    namespace=NAMESPACE,
+)
+STORE_WRITE_BATCH_SECONDS = Histogram(
+    "store_write_batch_seconds",
+    "Time to commit one batch of transcript store writes",
+    namespace=NAMESPACE,
+    buckets=STAGE_BUCKETS,
+)
+
+# Label-bound children are cached so the hot path skips the label lookup
+STAGE = {
+    stage: STREAM_STAGE_SECONDS.labels(stage)
+    for stage in ("receive", "buffer", "transcribe", "send", "end_to_end")
+}
+BYTES_IN, BYTES_OUT = WEBSOCKET_BYTES.labels("in"), WEBSOCKET_BYTES.labels("out")
+MESSAGES_IN, MESSAGES_OUT = WEBSOCKET_MESSAGES.labels("in"), WEBSOCKET_MESSAGES.labels("out")
+AUDIO_BUFFER_DEPTH = QUEUE_DEPTH.labels("audio_buffer_samples")
+GOOGLE_AUDIO_DEPTH = QUEUE_DEPTH.labels("google_audio_chunks")
+ANALYSIS_ROUNDS_DEPTH = QUEUE_DEPTH.labels("analysis_rounds")
+STORE_WRITES_DEPTH = QUEUE_DEPTH.labels("store_writes")
+STREAM_FRAMES_DEPTH = QUEUE_DEPTH.labels("stream_frames")
+STREAM_CHUNKS_DEPTH = QUEUE_DEPTH.labels("stream_chunks")
+STREAM_RESULTS_DEPTH = QUEUE_DEPTH.labels("stream_results")
+
+
+def timed_transcribe_chunk(
+    transcriber: BaseTranscriber, samples: np.ndarray, is_final: bool = False
+) -> StreamingTranscriptionResult:
+    """Call `transcribe_chunk` and record its latency and real-time factor.
+
+    Args:
+        transcriber: Transcriber of the session
+        samples: Audio samples at 16 kHz, already adapted to the transcriber
+        is_final: Whether this is the last chunk of the stream
+
+    Returns:
+        The transcriber's result
+    """
+    start = time.perf_counter()
+    result = transcriber.transcribe_chunk(samples, is_final=is_final)
+    elapsed = time.perf_counter() - start
+
+    labels = (transcriber.method.value, transcriber.model_checkpoint)
+    TRANSCRIBER_CALL_SECONDS.labels(*labels).observe(elapsed)
+    audio_sec = len(samples) / WHISPER_SAMPLE_RATE_HZ
+    if audio_sec > 0:
+        TRANSCRIBER_REAL_TIME_FACTOR.labels(*labels).observe(elapsed / audio_sec)
+
+    audio_queue = getattr(transcriber, "audio_queue", None)
+    if audio_queue is not None:
+        GOOGLE_AUDIO_DEPTH.set(audio_queue.qsize())
+    return result
+
+
+def observe_llm_call(analyzer: str, outcome: str, elapsed_sec: float) -> None:
+    LLM_CALL_SECONDS.labels(analyzer, outcome).observe(elapsed_sec)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format.
+
+    Returns:
+        Tuple of the encoded metrics and their content type
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Literal, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROC_TASKS = Path("/proc/self/task")
+MAX_PROFILE_SEC = 300
+
+# Only one profile runs at a time, since profiles would skew each other
+profile_lock = asyncio.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)})".replace(";", ":")
+
+
+def collapse_stack(thread_name: str, frame) -> str:
+    """Render a Python stack root first, in the folded format of flamegraph.pl."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":"))
+    return ";".join(reversed(labels))
+
+
+def running_threads() -> Optional[dict[int, str]]:
+    """Return the native id and name of every thread of this process on a CPU.
+
+    Reads the scheduler state of each task from /proc, so it also sees native
+    threads Python does not know about, like the whisper.cpp worker pool.
+
+    Returns:
+        Mapping of native thread id to thread name, or None without /proc
+    """
+    if not PROC_TASKS.exists():
+        return None
+    running = {}
+    for task in PROC_TASKS.iterdir():
+        try:
+            stat = (task / "stat").read_text()
+        except OSError:
+            continue  # The thread exited
+        # The name is in parentheses and may itself contain spaces or parentheses
+        name_end = stat.rindex(")")
+        if stat[name_end + 2] == "R":
+            running[int(task.name)] = stat[stat.index("(") + 1 : name_end]
+    return running
+
+
+def sample_stacks(
+    duration_sec: float, interval_sec: float = 0.01, mode: Literal["wall", "cpu"] = "wall"
+) -> tuple[Counter, int]:
+    """Sample the stacks of all threads for a while. Blocks, so run it in a thread.
+
+    In "wall" mode every thread is sampled whatever it is doing, which shows
+    where time is spent waiting. In "cpu" mode only threads running on a CPU
+    are counted. Time in native code, like a whisper.cpp call, is attributed
+    to the Python frame that called it, and busy threads without Python
+    frames are counted as "[native] <thread name>".
+
+    Args:
+        duration_sec: How long to sample
+        interval_sec: Time between samples
+        mode: "wall" or "cpu"
+
+    Returns:
+        Tuple of the sample count per collapsed stack and the number of samples taken
+    """
+    own_ident, own_native_id = threading.get_ident(), threading.get_native_id()
+    if mode == "cpu" and running_threads() is None:
+        logger.warning("CPU mode needs /proc, falling back to wall-clock sampling")
+        mode = "wall"
+
+    counts: Counter = Counter()
+    samples = 0
+    deadline = time.monotonic() + duration_sec
+    while time.monotonic() < deadline:
+        threads = {thread.ident: thread for thread in threading.enumerate()}
+        running = running_threads() if mode == "cpu" else None
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread = threads.get(ident)
+            if running is not None and (thread is None or thread.native_id not in running):
+                continue
+            counts[collapse_stack(thread.name if thread else str(ident), frame)] += 1
+
+        if running is not None:
+            python_ids = {thread.native_id for thread in threads.values()}
+            for native_id, name in running.items():
+                if native_id not in python_ids and native_id != own_native_id:
+                    counts[f"[native] {name}".replace(";", ":")] += 1
+
+        samples += 1
+        time.sleep(interval_sec)
+    return counts, samples
+
+
+async def profile_cpu(
+    duration_sec: float, interval_sec: float = 0.01, mode: Literal["wall", "cpu"] = "wall"
+) -> tuple[str, int]:
+    """Sample the live process and return collapsed stacks for a flamegraph.
+
+    Returns:
+        Tuple of the collapsed stacks, one "frame;frame;frame count" per line,
+        and the number of samples taken
+    """
+    logger.info(f"Starting {mode} profile for {duration_sec}s at {interval_sec * 1000:.0f}ms intervals")
+    counts, samples = await asyncio.to_thread(sample_stacks, duration_sec, interval_sec, mode)
+    return format_collapsed(counts), samples
+
+
+async def profile_memory(duration_sec: float, nframes: int = 25, top: int = 30) -> tuple[str, list[dict]]:
+    """Trace the allocations made during a window and still alive at its end.
+
+    Tracing slows down allocations while it runs, so it is only enabled for
+    the window unless tracemalloc was already running.
+
+    Args:
+        duration_sec: Length of the window
+        nframes: Frames kept per allocation traceback
+        top: Number of source lines in the summary
+
+    Returns:
+        Tuple of collapsed stacks weighted by bytes allocated, and the top
+        source lines by bytes allocated during the window
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(nframes)
+    try:
+        start = await asyncio.to_thread(tracemalloc.take_snapshot)
+        await asyncio.sleep(duration_sec)
+        end = await asyncio.to_thread(tracemalloc.take_snapshot)
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    # Snapshots include the profiler's own bookkeeping
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    start, end = start.filter_traces(filters), end.filter_traces(filters)
+
+    by_traceback = await asyncio.to_thread(end.compare_to, start, "traceback")
+    by_line = await asyncio.to_thread(end.compare_to, start, "lineno")
+
+    counts: Counter = Counter()
+    for stat in by_traceback:
+        if stat.size_diff > 0:
+            stack = ";".join(
+                f"{Path(frame.filename).name}:{frame.lineno}".replace(";", ":") for frame in stat.traceback
+            )
+            counts[stack] += stat.size_diff
+
+    summary = [
+        {
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in by_line[:top]
+        if stat.size_diff > 0
+    ]
+    return format_collapsed(counts), summary
+
+
+def format_collapsed(counts: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common()) + "\n"
@@ -0,0 +1,245 @@
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "truthseeker-backend"
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class TracingConfig(BaseModel):
+    enabled: bool = True
+    sample_rate: float = 0.1  # Share of sessions traced from the start
+    slow_transcript_sec: Optional[float] = 5.0  # Also keep any session with a transcript this late
+    max_spans_per_session: int = 20000  # Oldest spans are dropped beyond this
+    export_dir: str = "traces"
+
+
+class Span:
+    """A timed operation of a session, in the OpenTelemetry span model."""
+
+    __slots__ = (
+        "tracer", "name", "root", "span_id", "parent", "lane", "attributes", "start_ns", "end_ns", "error", "_token",
+    )
+
+    def __init__(self, tracer: "SessionTracer", name: str, attributes: dict[str, Any], root: bool = False):
+        self.tracer = tracer
+        self.name = name
+        self.root = root
+        self.span_id = os.urandom(8).hex()
+        self.parent: Optional[Span] = None
+        self.lane = name
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        if self.root:
+            # Background work outlives the span that triggered it, so it gets its own lane
+            if parent is not None:
+                self.attributes["trigger.span_id"] = parent.span_id
+        elif parent is not None:
+            # Children share the timeline lane of their root span
+            self.parent = parent
+            self.lane = parent.lane
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.spans.append(self)
+
+
+class NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+_NOOP_CONTEXT = contextlib.nullcontext(NOOP_SPAN)
+_current_tracer: contextvars.ContextVar[Optional["SessionTracer"]] = contextvars.ContextVar(
+    "current_tracer", default=None
+)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class SessionTracer:
+    """Collect the spans of one websocket session and export them when it ends.
+
+    Sessions are head-sampled with `sample_rate`. With `slow_transcript_sec`
+    set, every session is recorded in a bounded buffer and exported as well
+    if one of its transcripts arrived later than the threshold, so the
+    sessions a moderator complains about are kept even when not sampled.
+    """
+
+    def __init__(self, session_id: str, config: Optional[TracingConfig] = None):
+        self.session_id = session_id
+        self.config = config or TracingConfig()
+        self.trace_id = os.urandom(16).hex()
+        self.sampled = self.config.enabled and random.random() < self.config.sample_rate
+        self.recording = self.config.enabled and (
+            self.sampled or self.config.slow_transcript_sec is not None
+        )
+        self.slow = False
+        self.spans: deque[Span] = deque(maxlen=self.config.max_spans_per_session)
+
+    def span(self, name: str, root: bool = False, **attributes: Any):
+        if not self.recording:
+            return _NOOP_CONTEXT
+        return Span(self, name, attributes, root)
+
+    def observe_latency(self, latency_sec: float) -> None:
+        """Keep the session's trace if a transcript arrived too late."""
+        threshold = self.config.slow_transcript_sec
+        if threshold is not None and latency_sec > threshold and not self.slow:
+            logger.info(f"Session {self.session_id} had a {latency_sec:.1f}s transcript, keeping its trace")
+            self.slow = True
+
+    def export(self) -> Optional[Path]:
+        """Write the session's spans as OTLP/JSON and as a Chrome trace.
+
+        The OTLP file can be posted to any OpenTelemetry collector's
+        /v1/traces endpoint; the Chrome trace opens in Perfetto or
+        chrome://tracing with one track per stream, analysis and
+        post-debate timeline.
+
+        Returns:
+            Path of the OTLP file, or None if the session was not kept
+        """
+        if not (self.sampled or self.slow) or not self.spans:
+            return None
+
+        export_dir = Path(self.config.export_dir)
+        export_dir.mkdir(parents=True, exist_ok=True)
+        otlp_path = export_dir / f"{self.session_id}.otlp.json"
+        otlp_path.write_text(json.dumps(self.to_otlp()))
+        (export_dir / f"{self.session_id}.chrome.json").write_text(json.dumps(self.to_chrome_trace()))
+        logger.info(f"Exported {len(self.spans)} spans of session {self.session_id} to {otlp_path}")
+        return otlp_path
+
+    def to_otlp(self) -> dict:
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": STATUS_ERROR, "message": span.error} if span.error else {"code": STATUS_OK},
+            }
+            if span.parent is not None:
+                otlp_span["parentSpanId"] = span.parent.span_id
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", SERVICE_NAME),
+                    _otlp_attribute("session.id", self.session_id),
+                    _otlp_attribute("session.slow", self.slow),
+                ]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+            }]
+        }
+
+    def to_chrome_trace(self) -> dict:
+        # Viewers need the spans of a track to nest, so spans overlapping
+        # without nesting, like concurrent LLM calls, go to extra tracks
+        tracks: dict[tuple[str, int], int] = {}
+        lane_stacks: dict[str, list[list[Span]]] = {}
+        events = []
+        for span in sorted(self.spans, key=lambda span: (span.start_ns, -span.end_ns)):
+            stacks = lane_stacks.setdefault(span.lane, [])
+            for index, stack in enumerate(stacks):
+                while stack and stack[-1].end_ns <= span.start_ns:
+                    stack.pop()
+                if not stack or span.end_ns <= stack[-1].end_ns:
+                    break
+            else:
+                stacks.append([])
+                index = len(stacks) - 1
+            stacks[index].append(span)
+            tid = tracks.setdefault((span.lane, index), len(tracks) + 1)
+
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.lane,
+                "ph": "X",
+                "ts": span.start_ns / 1000,
+                "dur": (span.end_ns - span.start_ns) / 1000,
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            })
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": f"{lane} {index + 1}"}}
+            for (lane, index), tid in tracks.items()
+        )
+        events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"session {self.session_id}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _otlp_attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def activate(tracer: SessionTracer) -> contextvars.Token:
+    """Make `tracer` the tracer of the current task and the tasks it creates."""
+    return _current_tracer.set(tracer)
+
+
+def current_tracer() -> Optional[SessionTracer]:
+    return _current_tracer.get()
+
+
+def span(name: str, root: bool = False, **attributes: Any):
+    """Open a span in the current session's trace, or do nothing outside of one.
+
+    Spans nest under the span open in the current task. Pass `root=True`
+    for background work, such as an analysis round, that should start its
+    own timeline instead.
+
+    Usage:
+        with span("transcribe", method="openai_whisper") as s:
+            ...
+            s.set_attribute("text_length", len(text))
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        return _NOOP_CONTEXT
+    return tracer.span(name, root, **attributes)
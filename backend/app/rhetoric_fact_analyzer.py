@@ -1,10 +1,31 @@
 import time
 import json
-from openai import OpenAI
 import asyncio
 import logging
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Dict, Any, Optional
+from pydantic import BaseModel, Field, ValidationError
+
+from app.analysis.incremental_json import IncrementalArrayParser
+from app.analysis.resilience import (
+    CallFailed,
+    CircuitBreaker,
+    ResilienceMetrics,
+    RetryPolicy,
+    call_with_retries,
+)
+from app.analysis.tokens import (
+    TOKENS_PER_MESSAGE,
+    TokenBudgetConfig,
+    UsageLedger,
+    UsageRecord,
+    count_message_tokens,
+    pack_transcript,
+)
+from app.observability.metrics import observe_llm_call
+from app.observability.tracing import span
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -27,14 +48,180 @@ class RhetoricAnalysis(BaseModel):
     rhetorical_strategies: List[RhetoricalStrategy]
     fallacies: List[Fallacy]
 
-class RhetoricFactAnalysis(BaseModel):
-    rhetorical_analysis: RhetoricAnalysis
+class FactCheckAnalysis(BaseModel):
     fact_checks: List[FactCheck]
 
-async def get_rhetorical_analysis(client, topic_of_debate, debate_text):
+class ArgumentMap(BaseModel):
+    argument_map: str
+
+class RhetoricFactAnalysis(BaseModel):
+    rhetorical_analysis: RhetoricAnalysis = Field(
+        default_factory=lambda: RhetoricAnalysis(rhetorical_strategies=[], fallacies=[])
+    )
+    fact_checks: List[FactCheck] = Field(default_factory=list)
+
+ANALYSIS_MODEL = "gpt-4o-mini"
+
+# Models of the array elements that streamed responses emit one by one
+ITEM_MODELS = {
+    "rhetorical_strategies": RhetoricalStrategy,
+    "fallacies": Fallacy,
+    "fact_checks": FactCheck,
+}
+
+ItemCallback = Callable[[str, BaseModel], Awaitable[None]]
+
+# Provider-wide resilience state shared by all sessions
+RETRY_POLICY = RetryPolicy()
+circuit_breaker = CircuitBreaker()
+analysis_metrics = ResilienceMetrics()
+
+# Token counts of past analyzer calls
+token_usage = UsageLedger()
+
+_client: Optional["AsyncOpenAI"] = None
+
+
+def get_client() -> "AsyncOpenAI":
+    """Get or initialize the shared async OpenAI client."""
+    global _client
+    if _client is None:
+        # Imported on first use, the openai package is slow to import
+        from openai import AsyncOpenAI
+
+        # Retries and deadlines are handled per call by call_with_retries
+        _client = AsyncOpenAI(max_retries=0)
+    return _client
+
+
+async def _stream_structured_output(client, label, messages, response_format, on_item, start_time):
+    """Stream a completion, passing each finished array element to on_item.
+
+    Returns:
+        Tuple of the refusal (if any), the full response content and the usage
+    """
+    stream = await client.chat.completions.create(
+        model=ANALYSIS_MODEL,
+        messages=messages,
+        response_format=response_format,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    parser = IncrementalArrayParser()
+    content_parts = []
+    refusal_parts = []
+    first_item_seen = False
+    usage = None
+
+    async for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.refusal:
+            refusal_parts.append(delta.refusal)
+        if not delta.content:
+            continue
+
+        content_parts.append(delta.content)
+        for key, element in parser.feed(delta.content):
+            item_model = ITEM_MODELS.get(key)
+            if item_model is None:
+                continue
+            try:
+                item = item_model.model_validate(element)
+            except ValidationError as e:
+                logger.info(f"Skipping invalid streamed {key} element: {e}")
+                continue
+
+            if not first_item_seen:
+                first_item_seen = True
+                logger.info("--- %s first finding in  %s seconds ---" % (label, time.time() - start_time))
+            await on_item(key, item)
+
+    return "".join(refusal_parts) or None, "".join(content_parts), usage
+
+
+async def request_structured_output(client, label, messages, response_format, on_item=None, budget=None):
+    """Request a structured-output completion and parse its JSON.
+
+    When on_item is given, the response is streamed and every completed
+    element of a top-level array (a strategy, fallacy or fact check) is
+    validated and passed to on_item as soon as it closes, instead of waiting
+    for the whole response.
+
+    Args:
+        client: AsyncOpenAI client
+        label: Analyzer name used in log messages
+        messages: Chat messages of the request
+        response_format: Structured output JSON schema
+        on_item: Optional coroutine called with the array key and parsed element
+        budget: Prompt token budget, TokenBudgetConfig defaults if None
+
+    Returns:
+        Parsed JSON response, None on refusal, or an error dict
+    """
     start_time = time.time()
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
+    budget = budget or TokenBudgetConfig()
+
+    # Fit the debate text, which is the last message, into the prompt budget
+    instructions_tokens = count_message_tokens(messages[:-1], ANALYSIS_MODEL) + TOKENS_PER_MESSAGE
+    messages = messages[:-1] + [{
+        **messages[-1],
+        "content": pack_transcript(
+            messages[-1]["content"],
+            budget.max_prompt_tokens - instructions_tokens,
+            budget.strategy,
+            ANALYSIS_MODEL,
+        ),
+    }]
+    estimated_prompt_tokens = count_message_tokens(messages, ANALYSIS_MODEL)
+
+    with span("llm_call", analyzer=label, prompt_tokens=estimated_prompt_tokens, streamed=on_item is not None):
+        if on_item is None:
+            completion = await client.chat.completions.create(
+                model=ANALYSIS_MODEL,
+                messages=messages,
+                response_format=response_format,
+            )
+            llm_response = completion.choices[0].message
+            refusal, content, usage = llm_response.refusal, llm_response.content, completion.usage
+        else:
+            refusal, content, usage = await _stream_structured_output(
+                client, label, messages, response_format, on_item, start_time
+            )
+
+    token_usage.record(UsageRecord(
+        analyzer=label,
+        estimated_prompt_tokens=estimated_prompt_tokens,
+        prompt_tokens=getattr(usage, "prompt_tokens", None),
+        completion_tokens=getattr(usage, "completion_tokens", None),
+        latency_sec=time.time() - start_time,
+    ))
+
+    if refusal:
+        logger.info(f"LLM refused to provide response : {refusal}")
+        observe_llm_call(label, "refusal", time.time() - start_time)
+        return None
+    else:
+        try: 
+            logger.info("--- %s reponse in  %s seconds ---" % (label, time.time() - start_time))
+            parsed = json.loads(content)
+            observe_llm_call(label, "ok", time.time() - start_time)
+            return parsed
+
+        except Exception as e:
+            logger.info(f"Json parsing error: {e}")
+            observe_llm_call(label, "invalid_json", time.time() - start_time)
+            return {"error": "json_parsing_error"}
+
+
+async def get_rhetorical_analysis(client, topic_of_debate, debate_text, on_item=None, budget=None):
+    return await request_structured_output(
+        client,
+        "Rhetoric analysis",
         messages=[
             {"role": "developer", 
             "content": f"You are a helpful assistant to a debate moderator and extremely knowledable in debate analysis. Help the moderator by finding rhetorical strategies and fallacies in the arguments provided. \n\
@@ -104,28 +291,16 @@ async def get_rhetorical_analysis(client, topic_of_debate, debate_text):
                     "additionalProperties": False
                 } 
             }
-        }
+        },
+        on_item=on_item,
+        budget=budget,
     )
 
-    llm_response = completion.choices[0].message
 
-    if llm_response.refusal:
-        logger.info(f"LLM refused to provide response : {llm_response.refusal}")
-        return None
-    else:
-        try: 
-            logger.info("--- Rhetoric analysis reponse in  %s seconds ---" % (time.time() - start_time))
-            return json.loads(llm_response.content)
-
-        except Exception as e:
-            logger.info(f"Json parsing error: {e}")
-            return {"error": "json_parsing_error"}
-
-
-async def get_fact_check(client, topic_of_debate, debate_text):
-    start_time = time.time()
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
+async def get_fact_check(client, topic_of_debate, debate_text, on_item=None, budget=None):
+    return await request_structured_output(
+        client,
+        "Fact-checker",
         messages=[
             {"role": "developer", 
              "content": f"You are a helpful assistant to a debate moderator and extremely knowledable in debate analysis. Help the moderator by checking for facts in the arguments provided. \n\
@@ -178,27 +353,16 @@ async def get_fact_check(client, topic_of_debate, debate_text):
                     "additionalProperties": False
                 } 
             }
-        }
+        },
+        on_item=on_item,
+        budget=budget,
     )
 
-    llm_response = completion.choices[0].message
 
-    if llm_response.refusal:
-        logger.info(f"LLM refused to provide response : {llm_response.refusal}")
-        return None
-    else:
-        try: 
-            logger.info("--- Fact-checker reponse in  %s seconds ---" % (time.time() - start_time))
-            return json.loads(llm_response.content)
-
-        except Exception as e:
-            logger.info(f"Json parsing error: {e}")
-            return {"error": "json_parsing_error"}
-
-async def get_argument_map(client, topic_of_debate, debate_text):
-    start_time = time.time()
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
+async def get_argument_map(client, topic_of_debate, debate_text, on_item=None, budget=None):
+    return await request_structured_output(
+        client,
+        "Argument map",
         messages=[
             {"role": "developer", 
             "content": f"You are a helpful assistant to a debate moderator and extremely knowledable in debate analysis. Help the moderator by providing an argument map in mermaid format, with conculsion, premises, co-premises, objections, counterarguments, rebuttals, inferences and lemmas if only if available in the arument. \n\
@@ -228,66 +392,142 @@ async def get_argument_map(client, topic_of_debate, debate_text):
                     "additionalProperties": False
                 } 
             }
-        }
+        },
+        on_item=on_item,
+        budget=budget,
     )
 
-    llm_response = completion.choices[0].message
-
-    if llm_response.refusal:
-        logger.info(f"LLM refused to provide response : {llm_response.refusal}")
-        return None
-    else:
-        try: 
-            logger.info("--- Argument map reponse in  %s seconds ---" % (time.time() - start_time))
-            return json.loads(llm_response.content)
-
-        except Exception as e:
-            logger.info(f"Json parsing error: {e}")
-            return {"error": "json_parsing_error"}
 
 topic_of_debate = "Escalation of gang violence in Sweden and strengthening the fight against organised crime"
 gang_violence_debate = f"President. – The next item on the agenda is the debate on the Commission statement on the escalation of gang violence in Sweden and strengthening the fight against organised crime\n\n Maria Luís Albuquerque, Member of the Commission. – Madam President, honourable Members, the horrendous attack in Örebro – one of the worst attacks in Swedish history – has shocked as all to the core. And I would like to express my heartfelt condolences to the families and friends who lost their loved ones. Such attacks have no place in Europe.\nThe first thing European citizens expect from us is protection. That is also true when it comes to the topic of today's debate: gang violence. Gang violence is not only a big threat to life and security; it is a huge threat to democracy and society too, and it is part of the bigger structures of organised crime infiltrating our legal economies and processes.\nAs outlined by President von der Leyen at the beginning of this mandate, there can be no hiding place for organised crime in Europe, either offline or online. The threat to our internal security by organised crime networks is unprecedented and increasingly visible. And it is not only an impression that we get following the news – the figures speak for themselves. Last year, Europol identified 821 high-risk criminal networks active in the EU. Nearly 90 % of them have infiltrated the legal economy, running businesses, investing in real estate. They are strong and operate freely across borders, including online. They are active in drug trafficking, fraud, property crime, migrant smuggling, and trafficking in human beings. To avoid prosecution, these groups are increasingly recruiting young people to perpetrate even violent crimes.\nMost of this violence is directly linked to organised crime and drug trafficking. Drug-related violence has spread from secluded port areas to the streets of Swedish cities, as criminal organisations fight for control over distribution networks. Innocent bystanders are often caught in this violence, underscoring the urgency of action.\nWe see similar patterns across Europe: drug markets in Brussel's streets, gang wars in Germany and France, threats to port workers in the Netherlands, drug-related killings in Spain and the Western Balkans. This is a global phenomenon that needs to be tackled through stronger cross-border cooperation within the EU and with third countries. Drugs are now Europe's most lucrative criminal market, worth EUR 31 billion annually, and 70 % of organised crime groups use corruption to enable their crimes.\nThe Commission will put forward an EU strategy against corruption. Money is the lifeblood that drives and sustains all these criminal activities. Our response to organised crime must be clear: disrupt their finances, take down their bankers and brokers, tackle the infiltration in the legal economy and disrupt their corrupt networks.\nSince last spring, we have new confiscation rules to eliminate the profits of criminal groups. We need to follow the money to get to those who are behind the crimes. Any investigation should pursue arrests and asset recovery as two sides of the same coin. With Eurojust we need to enhance judicial cooperation within the Union and beyond its borders. The rapid transposition of the new Asset Recovery Directive will provide stronger tools to confiscate illicit profits. It will also strengthen the asset recovery offices to identify, trace and freeze criminal assets.\nThe Commission will step up the fight against serious and organised crime with the forthcoming European internal security strategy. The strategy will cover all forms of organised crime online and offline. We plan to involve all stakeholders in a 'whole of society' approach to be more effective in dismantling high-risk criminal networks and their ringleaders. We will propose to revise the rules to fight organised crime, starting with an updated definition of 'organised crime' and strong investigative tools. The strategy will build on the serious and organised crime threat assessment that Europol will present in the spring. We will enhance Europol support to Member State investigations, especially in areas where the authorities need it the most. We will strengthen Frontex to ensure it can protect our borders in all circumstances.\nAs regards the online dimension, online service providers have a duty to protect their users online. We will continue to strongly enforce the Digital Services Act, which establishes effective measures for tackling illegal content and mitigating societal risks online. And we will continue to step up our efforts in disrupting the recruitment of young people online by organised criminal gangs. Next year we will also set out the framework for an EU critical communication system to strengthen internal security and preparedness.\nWe know that many of the threats to our internal security originate from outside the EU. Security within the Union cannot be achieved without targeted and comprehensive external action through third country partnerships that also benefit our security. The strategy will also address cross-cutting security challenges and hybrid threats such as border management, the weaponisation of migration, and countering sabotage and espionage.\nHonourable Members, as one of the first deliverables of the new internal security strategy, the Commission will launch a new EU action plan against firearms trafficking with more pressure on criminal markets and safeguarding the illicit market. Illicit firearms feed organised crime within the EU, and are regularly used by lone actors. The EU already has rules on the illegal possession and acquisition of firearms and rules on the legal import, export and transit of firearms. However, there are no EU rules on the definition of criminal offences and penalties on firearms-related crimes. This has to change.\nThe fight against drug trafficking must also remain a top priority. For this, it is paramount to tackle the constant inflow of drugs to our continent, mainly through our ports. Over 90 million containers are processed yearly in EU ports. Only a small percentage are inspected, leaving room for criminal exploitation. Sweden, as a major maritime destination and transit country is not immune to this threat. We will build on the work set out in the EU roadmap and the EU Ports Alliance to dismantle criminal business models and to shut down supply routes. Currently, 33 ports, including Helsingborg, Gothenburg and Stockholm are members, and the list is growing.\nThe challenges facing the Union are increasingly complex, interconnected and transnational. This means that we need to approach security in an integrated way, taking all relevant threats, including hybrid ones, into consideration. Internal security is our shared responsibility, and we want the forthcoming strategy to be also the Parliament's strategy. We count on your cooperation to make rapid progress on our common agenda.\n\nTomas Tobé, för PPE gruppen. – Fru talman! Det brutala massmordet i Örebro den svarta dagen den 4 februari var utfört av en enskild gärningsman. Men Sverige är också utsatt för en våldsvåg av sällan skådat slag. Bombningar av hederliga människors bostadshus, närmast dag efter dag, regisserade av hänsynslösa gängkriminella som inte tycks sky några medel.\nDen svenska regeringen genomför nu en helt nödvändig omläggning av rättspolitiken för att krossa gängen. Men vi måste också göra mer på europeisk nivå. 70 % av de kriminella nätverken verkar över gränserna. Gängledare samordnar attacker från utlandet. Vapen och droger flödar. Det sprängs och det skjuts.\nDetta är gränsöverskridande problem som inget medlemsland ska behöva möta ensamt. Därför menar vi i EPP att det nu behövs en europeisk säkerhetspakt mot organiserad brottslighet. Dra in den fria rörligheten för kriminella. Se till att det inte lönar sig att begå brott. Stärk det europeiska polissamarbetet; gör Europol både starkare och operativt.\nVi kan och vi ska göra Sverige och Europa tryggt. Kommissionen har lovat en tuffare strategi mot brottslighet. EPP kommer se till att ni levererar.\n\n Evin Incir, on behalf of the S&D Group. – Madam President, politics must join forces across party lines to break the cycle of violence. This painful reality is the reason why I decided to engage in politics 25 years ago. Since then, the situation has unfortunately only worsened. More children have become both victims and perpetrators to violence.\nLast year alone, 44 people lost their lives to shootings, and, alarmingly, the number of children under 15 suspected of involvement in murder cases surged by 200 % in comparison to the year before in Sweden. Just in the first month of this year, we witnessed 33 bombings. The perpetrators are nowadays so young that the term 'child soldiers' has become a buzzword. Gang violence is creeping down in age, instilling fear in our neighbourhoods and robbing children of their childhood. No one should wake up to a sound of a bomb, instead of a gentle ring of a clock. And let's be clear – no one is born a child soldier.\nOur actions as lawmakers matter. The current Swedish right‑wing and far‑right Government looks to Denmark's hard gang laws – like visitation zones and harsh penalties – but neglects the essential ingredient of Denmark's success: social investments in schools and communities. A school that provides every child with the opportunity to succeed is our most powerful weapon against gang recruitment. It is also absurd that criminals in 2025 can start businesses and exploit the Swedish welfare system, while the parties in government and their supporters in Sweden Democrats are watching.\nWhere is the crisis commission that we have asked for? Also, the EU has an important role in putting an end to the cross‑border gang crime, which poses a serious threat to all our Member States. According to Europol, 70 % of gangs in the EU operate in at least three countries simultaneously. I'm glad that the conservative EPP Group has woken up and realised the importance of acting, but yet they have only presented what they call 'European security pact against organised crime', which is more or less a copy paste of former Commissioner Ylva Johansson's 'EU roadmap to fight organised crime and drug trafficking'.\nInstead of creating new titles on existing measures, we social democrats demand a specific strategy against recruitment, with a coordinator working alongside European authorities such as Europol and Eurojust to prevent children and young people from falling into the claws of the gangs. Politics must unite across party lines, and so must other parts of the society, such as the social media platforms.\nWe therefore need an EU anti‑organised crime law, including addressing the social media platforms responsibilities. It is unacceptable that these platforms are exploited for recruiting child soldiers. Tech giants must be held accountable. Their platforms are today's modern streets and squares. It is about time for the society to get as organised as organised crime. The society must always be stronger than organised crime."
 
 
-async def llm_calls(debate_text: str) -> RhetoricFactAnalysis: 
-    
-    client = OpenAI()
+ANALYZERS = {
+    "rhetorical_analysis": get_rhetorical_analysis,
+    "fact_checks": get_fact_check,
+    "argument_map": get_argument_map,
+}
 
-    # Make two parallel calls to OpenAI
-    task1 = get_rhetorical_analysis(client, topic_of_debate, debate_text)
-    task2 = get_fact_check(client, topic_of_debate, debate_text)
+ANALYSIS_MODELS = {
+    "rhetorical_analysis": RhetoricAnalysis,
+    "fact_checks": FactCheckAnalysis,
+    "argument_map": ArgumentMap,
+}
 
-    # Task3 is for post analysis of debate
-    # task3 = get_argument_map(client, topic_of_debate, debate_text)
-    # results = await asyncio.gather(task1, task2, task3)
+# Analyzers run on every realtime round; the argument map is post-debate only
+REALTIME_ANALYZERS = ("rhetorical_analysis", "fact_checks")
 
-    start_time = time.time()
-    task_results = await asyncio.gather(task1, task2)
-    print("--- Gather response in %s seconds ---" % (time.time() - start_time))
+AnalysisCallback = Callable[[str, BaseModel], Awaitable[None]]
+AnalysisItemCallback = Callable[[str, str, BaseModel], Awaitable[None]]
 
-    successful_results = []
 
-    for result in task_results:
-        if result and not result.get("error"):
-            logger.info(f"JSON response from LLM : {result}")
-            successful_results.append(result)
+async def run_analyzer(
+    client,
+    name: str,
+    debate_text: str,
+    on_result: Optional[AnalysisCallback] = None,
+    on_item: Optional[AnalysisItemCallback] = None,
+    budget: Optional[TokenBudgetConfig] = None,
+) -> Optional[BaseModel]:
+    """Run one analyzer with retries and deadlines, and report its parsed result.
 
-        elif result.get("error"):
-            
-            logger.info("error occurred while fetching response from LLM, retring...")
-            task1 = get_rhetorical_analysis(client, topic_of_debate, debate_text)
-            task2 = get_fact_check(client, topic_of_debate, debate_text)
-            results = await asyncio.gather(task1, task2)
-            for result in results:
-                if result and not result.get("error"):
-                    logger.info(f"JSON response from LLM : {result}")
-                    successful_results.append(result)
-                elif result.get("error"):
-                    logger.info("error occurred again while fetching reponse from LLM. Giving up!")
-                else:
-                    logger.info("No response or error occurred.")
+    A retry after an attempt that streamed some findings streams again, and
+    only the findings not delivered yet are passed to on_item. The complete
+    result of the successful attempt is then passed to on_result as usual.
+    """
+    analyzer = ANALYZERS[name]
+    # Findings already passed to on_item, by array key and content
+    delivered: set[tuple[str, str]] = set()
 
-        else:
-            logger.info("No response or error occurred.")
+    async def on_analyzer_item(key, item):
+        item_key = (key, item.model_dump_json())
+        if item_key in delivered:
+            return
+        delivered.add(item_key)
+        await on_item(name, key, item)
+
+    async def attempt(attempt_number):
+        result = await analyzer(
+            client,
+            topic_of_debate,
+            debate_text,
+            on_item=on_analyzer_item if on_item is not None else None,
+            budget=budget,
+        )
+        if result is None:
+            return None
+        if result.get("error"):
+            raise CallFailed(result["error"])
+        try:
+            return ANALYSIS_MODELS[name].model_validate(result)
+        except ValidationError as e:
+            raise CallFailed(f"unexpected response: {e}")
+
+    parsed = await call_with_retries(name, attempt, RETRY_POLICY, circuit_breaker, analysis_metrics)
+    if parsed is None:
+        logger.info(f"No response or error occurred for {name}.")
+        return None
+
+    # Rendering the whole response is costly, so only do it when it will be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"JSON response from LLM : {parsed}")
+    if on_result is not None:
+        await on_result(name, parsed)
+    return parsed
+
+
+async def llm_calls(
+    debate_text: str,
+    on_result: Optional[AnalysisCallback] = None,
+    on_item: Optional[AnalysisItemCallback] = None,
+    sheddable: bool = False,
+    analyzer_texts: Optional[Dict[str, str]] = None,
+    budget: Optional[TokenBudgetConfig] = None,
+) -> RhetoricFactAnalysis:
+    """Run the realtime analyzers on the debate text concurrently.
+
+    Args:
+        debate_text: Transcript text to analyze
+        on_result: Optional coroutine called with the analyzer name and its
+            parsed result as soon as that analyzer completes
+        on_item: Optional coroutine called with the analyzer name, array key and
+            parsed element for every finding as soon as it is streamed. Setting
+            it switches the analyzers to streamed responses.
+        sheddable: Skip the calls while the circuit breaker reports the
+            provider as degraded, as done for realtime analysis
+        analyzer_texts: Optional per-analyzer text replacing debate_text;
+            analyzers given an empty text are skipped
+        budget: Prompt token budget of each call, TokenBudgetConfig defaults if None
+
+    Returns:
+        RhetoricFactAnalysis combining every analyzer that succeeded
+    """
+    texts = {name: debate_text for name in REALTIME_ANALYZERS}
+    texts.update(analyzer_texts or {})
+    if not any(text.strip() for text in texts.values()):
+        return RhetoricFactAnalysis()
+    client = get_client()
+
+    # Checked last, as a half-open breaker gives its probe to the caller
+    if sheddable and not circuit_breaker.allow_request():
+        logger.info("Analysis provider degraded, shedding realtime analysis")
+        for name in REALTIME_ANALYZERS:
+            analysis_metrics.increment(name, "shed")
+        return RhetoricFactAnalysis()
+
+    async def run(name):
+        if not texts[name].strip():
+            return None
+        return await run_analyzer(client, name, texts[name], on_result, on_item, budget)
+
+    start_time = time.time()
+    rhetoric, fact_check = await asyncio.gather(*(run(name) for name in REALTIME_ANALYZERS))
+    logger.info("--- Gather response in %s seconds ---" % (time.time() - start_time))
+    logger.info(f"Analysis call metrics: {analysis_metrics.snapshot()}")
 
-    return successful_results
\ No newline at end of file
+    analysis = RhetoricFactAnalysis()
+    if rhetoric is not None:
+        analysis.rhetorical_analysis = rhetoric
+    if fact_check is not None:
+        analysis.fact_checks = fact_check.fact_checks
+    return analysis
@@ -0,0 +1,174 @@
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.observability.metrics import TRANSCRIPTION_CACHE_LOOKUPS
+from app.transcription.common import TranscriptionResult
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,  -- Hash of the audio and of the options it was transcribed with
+    result TEXT NOT NULL,  -- TranscriptionResult as JSON
+    size INTEGER NOT NULL,
+    last_used_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_use ON results(last_used_ts);
+"""
+
+
+class CacheConfig(BaseModel):
+    enabled: bool = True  # Return the stored transcription of audio already uploaded
+    path: str = "data/transcription_cache.db"
+    max_mb: float = 64.0  # The least recently used results are evicted beyond this
+    hash_pcm: bool = True  # Also match the decoded audio, so another container of the same audio hits
+
+
+def hash_file(content: bytes) -> str:
+    return "file:" + hashlib.sha256(content).hexdigest()
+
+
+def hash_pcm(path: str) -> Optional[str]:
+    """Hash the audio of a file decoded to 16 kHz mono 16-bit PCM, None if it cannot be decoded."""
+    from pydub import AudioSegment
+
+    try:
+        audio = AudioSegment.from_file(path)
+    except Exception as e:
+        logger.debug(f"Not hashing the audio of {path}, it could not be decoded: {e}")
+        return None
+    audio = audio.set_frame_rate(WHISPER_SAMPLE_RATE_HZ).set_channels(1).set_sample_width(2)
+    return "pcm:" + hashlib.sha256(audio.raw_data).hexdigest()
+
+
+class TranscriptionCache:
+    """On-disk LRU cache of file transcriptions, keyed by audio content and transcription options.
+
+    Results are looked up by the hash of the uploaded bytes first, then by
+    the hash of the decoded audio, and stored under both.
+    """
+
+    def __init__(self, config: CacheConfig):
+        self.path = Path(config.path)
+        self.max_bytes = int(config.max_mb * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content_hash: str, options: dict) -> str:
+        """Key of the audio with `content_hash` transcribed with `options`, e.g. method and checkpoint."""
+        return hashlib.sha256(f"{content_hash}|{json.dumps(options, sort_keys=True)}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[TranscriptionResult]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE results SET last_used_ts = ? WHERE key = ?", (time.time(), key))
+        return TranscriptionResult.model_validate_json(row[0])
+
+    def put(self, keys: list[str], result: TranscriptionResult) -> None:
+        """Store a result under each of `keys`, evicting the least recently used beyond the size cap."""
+        raw = result.model_dump_json()
+        now = time.time()
+        # Committed as one transaction, or rolled back if a statement fails
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, result, size, last_used_ts) VALUES (?, ?, ?, ?)",
+                [(key, raw, len(raw), now) for key in keys],
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for key, size in self._conn.execute(
+                    "SELECT key, size FROM results ORDER BY last_used_ts"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    total -= size
+                    evicted += 1
+                logger.info(f"Evicted {evicted} cached transcriptions")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def lookup(
+    cache: TranscriptionCache, options: dict, content: bytes, path: str, hash_audio: bool
+) -> tuple[Optional[TranscriptionResult], list[str]]:
+    """Find the transcription of an uploaded file.
+
+    Args:
+        cache: The cache to look in
+        options: Settings the transcription depends on, e.g. method and checkpoint
+        content: Bytes of the uploaded file
+        path: Where the file was saved, for decoding its audio
+        hash_audio: Whether to also match the decoded audio
+
+    Returns:
+        The cached result or None, and the keys to store a new result under.
+        A hit on the audio only is also stored under the file's key.
+    """
+    keys = [cache.key(hash_file(content), options)]
+    result = cache.get(keys[0])
+    if result is not None:
+        TRANSCRIPTION_CACHE_LOOKUPS.labels("file_hit").inc()
+        return result, keys
+
+    pcm_hash = hash_pcm(path) if hash_audio else None
+    if pcm_hash is not None:
+        keys.append(cache.key(pcm_hash, options))
+        result = cache.get(keys[1])
+        if result is not None:
+            TRANSCRIPTION_CACHE_LOOKUPS.labels("audio_hit").inc()
+            cache.put(keys[:1], result)
+            return result, keys
+
+    TRANSCRIPTION_CACHE_LOOKUPS.labels("miss").inc()
+    return None, keys
+
+
+# Cache shared by all requests, opened on first use
+shared_cache: Optional[TranscriptionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache(config: CacheConfig) -> TranscriptionCache:
+    """Return the process-wide cache, reopening it if the configured path or size changed.
+
+    A replaced cache is not closed, as requests in other threads may still be
+    using it. Its connection is closed once the last of them drops it.
+    """
+    global shared_cache
+    with _cache_lock:
+        if shared_cache is not None and (
+            shared_cache.path != Path(config.path) or shared_cache.max_bytes != int(config.max_mb * 1024 * 1024)
+        ):
+            shared_cache = None
+        if shared_cache is None:
+            shared_cache = TranscriptionCache(config)
+        return shared_cache
+
+
+@atexit.register
+def close_cache() -> None:
+    if shared_cache is not None:
+        shared_cache.close()
@@ -0,0 +1,212 @@
+import json
+import logging
+import re
+import sqlite3
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# External-content indexes over the store's tables, filled by triggers in the
+# writer's transactions, so rows are searchable as soon as they are committed
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS segments_fts_insert AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5(
+    quote, label, content='findings', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS findings_fts_insert AFTER INSERT ON findings BEGIN
+    INSERT INTO findings_fts(rowid, quote, label) VALUES (new.id, new.quote, new.label);
+END;
+"""
+
+QUERY_TERM_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+SNIPPET_TOKENS = 16
+
+
+class SegmentHit(BaseModel):
+    session_id: str
+    seq: int
+    start_ms: int
+    end_ms: Optional[int]
+    text: str
+    snippet: str  # Matching terms wrapped in [ ]
+    score: float  # Higher is more relevant
+
+
+class FindingHit(BaseModel):
+    session_id: str
+    scope: str
+    round: int
+    analysis: str
+    field: str
+    label: Optional[str]
+    quote: Optional[str]
+    item: dict[str, Any]
+    offset_ms: Optional[int]
+    snippet: str
+    score: float
+
+
+class SessionHit(BaseModel):
+    session_id: str
+    source: str
+    started_ts: float
+    hits: int  # Matching segments
+    first_match_ms: int
+    best_snippet: str
+    score: float  # Score of the best matching segment
+
+
+def ensure_search_index(conn: sqlite3.Connection) -> None:
+    """Create the full-text indexes, building them from the rows stored before they existed."""
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.executescript(SEARCH_SCHEMA)
+    for index in ("segments_fts", "findings_fts"):
+        if index not in existing:
+            conn.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+            logger.info(f"Built full-text index {index}")
+    conn.commit()
+
+
+def to_match_query(query: str) -> str:
+    """Turn a plain query into an FTS5 one matching all its words and "quoted phrases".
+
+    Raises:
+        ValueError: If the query has no terms
+    """
+    terms = [phrase or word for phrase, word in QUERY_TERM_PATTERN.findall(query)]
+    terms = [term.replace('"', "") for term in terms if term.strip('"')]
+    if not terms:
+        raise ValueError("Query has no search terms")
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def search_segments(
+    conn: sqlite3.Connection,
+    query: str,
+    session_id: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list[SegmentHit]:
+    """Rank transcript segments by BM25 relevance to a query.
+
+    Args:
+        conn: Connection to the store
+        query: FTS5 match expression, see `to_match_query`
+        session_id: Only search this session
+        limit: Maximum number of hits
+        offset: Number of hits to skip, for paging
+
+    Returns:
+        The hits, most relevant first
+    """
+    rows = conn.execute(
+        f"""
+        SELECT s.session_id, s.seq, s.start_ms, s.end_ms, s.text,
+               snippet(segments_fts, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet, segments_fts.rank AS rank
+        FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid
+        WHERE segments_fts MATCH ? AND (? IS NULL OR s.session_id = ?)
+        ORDER BY segments_fts.rank LIMIT ? OFFSET ?
+        """,
+        (query, session_id, session_id, limit, offset),
+    ).fetchall()
+    return [SegmentHit(**_without_rank(row), score=-row["rank"]) for row in rows]
+
+
+def search_findings(
+    conn: sqlite3.Connection,
+    query: str,
+    field: Optional[str] = None,
+    session_id: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> list[FindingHit]:
+    """Rank findings by the BM25 relevance of their quote and label to a query.
+
+    Args:
+        conn: Connection to the store
+        query: FTS5 match expression, see `to_match_query`
+        field: Only search this kind of finding, e.g. "fallacies" or "fact_checks"
+        session_id: Only search this session
+        limit: Maximum number of hits
+        offset: Number of hits to skip, for paging
+
+    Returns:
+        The hits, most relevant first
+    """
+    rows = conn.execute(
+        f"""
+        SELECT f.session_id, f.scope, f.round, f.analysis, f.field, f.label, f.quote, f.item, f.offset_ms,
+               snippet(findings_fts, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet, findings_fts.rank AS rank
+        FROM findings_fts JOIN findings f ON f.id = findings_fts.rowid
+        WHERE findings_fts MATCH ? AND (? IS NULL OR f.field = ?) AND (? IS NULL OR f.session_id = ?)
+        ORDER BY findings_fts.rank LIMIT ? OFFSET ?
+        """,
+        (query, field, field, session_id, session_id, limit, offset),
+    ).fetchall()
+    return [
+        FindingHit(**_without_rank(row) | {"item": json.loads(row["item"])}, score=-row["rank"]) for row in rows
+    ]
+
+
+def search_sessions(conn: sqlite3.Connection, query: str, limit: int = 20, offset: int = 0) -> list[SessionHit]:
+    """Rank sessions by their best matching transcript segment.
+
+    Args:
+        conn: Connection to the store
+        query: FTS5 match expression, see `to_match_query`
+        limit: Maximum number of sessions
+        offset: Number of sessions to skip, for paging
+
+    Returns:
+        The sessions, most relevant first
+    """
+    # The best segment of each session is numbered 1 by the window, ties going to the earliest
+    rows = conn.execute(
+        """
+        WITH matches AS (
+            SELECT s.id, s.session_id, s.start_ms, segments_fts.rank AS rank,
+                   row_number() OVER (PARTITION BY s.session_id ORDER BY segments_fts.rank, s.id) AS position
+            FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid
+            WHERE segments_fts MATCH ?
+        )
+        SELECT m.session_id, sessions.source, sessions.started_ts, count(*) AS hits,
+               min(m.start_ms) AS first_match_ms, min(m.rank) AS rank,
+               max(CASE WHEN m.position = 1 THEN m.id END) AS best_segment_id
+        FROM matches m JOIN sessions ON sessions.id = m.session_id
+        GROUP BY m.session_id
+        ORDER BY rank LIMIT ? OFFSET ?
+        """,
+        (query, limit, offset),
+    ).fetchall()
+    if not rows:
+        return []
+
+    # Snippets are only built for the best segment of the sessions returned
+    best_ids = [row["best_segment_id"] for row in rows]
+    snippets = dict(conn.execute(
+        f"""
+        SELECT rowid, snippet(segments_fts, 0, '[', ']', '...', {SNIPPET_TOKENS})
+        FROM segments_fts WHERE segments_fts MATCH ? AND rowid IN ({", ".join("?" * len(best_ids))})
+        """,
+        (query, *best_ids),
+    ).fetchall())
+    return [
+        SessionHit(
+            **{key: row[key] for key in row.keys() if key not in ("rank", "best_segment_id")},
+            best_snippet=snippets.get(row["best_segment_id"], ""),
+            score=-row["rank"],
+        )
+        for row in rows
+    ]
+
+
+def _without_rank(row: sqlite3.Row) -> dict[str, Any]:
+    return {key: row[key] for key in row.keys() if key != "rank"}
@@ -0,0 +1,278 @@
+import abc
+import atexit
+import contextlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Generic, Literal, Optional, TypeVar
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Identifies this worker process among those sharing the state backend
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+CONFIG_KEY = "config"
+SESSION_KEY_PREFIX = "session:"
+
+ConfigT = TypeVar("ConfigT", bound=BaseModel)
+
+
+class StateConfig(BaseModel):
+    backend: Literal["memory", "sqlite", "redis"] = "memory"  # memory is only shared within one worker
+    sqlite_path: str = "data/state.db"
+    redis_url: str = "redis://localhost:6379/0"  # Any server speaking the Redis protocol
+    key_prefix: str = "truthseeker:"
+    poll_interval_sec: float = 1.0  # How often workers pick up config changes made by others
+
+    @classmethod
+    def from_env(cls) -> "StateConfig":
+        """Read overrides from STATE_BACKEND, STATE_SQLITE_PATH, STATE_REDIS_URL and the like.
+
+        The state backend holds the shared config, so it cannot be set through it.
+        """
+        overrides = {}
+        for field in cls.model_fields:
+            value = os.environ.get(f"STATE_{field.upper()}")
+            if value is not None:
+                overrides[field] = value
+        return cls.model_validate(overrides)
+
+
+class StateBackend(abc.ABC):
+    """String key-value state shared by the workers of the backend.
+
+    Calls may block on I/O, so the event loop makes them from a thread.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        pass
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str, ttl_sec: Optional[float] = None) -> None:
+        """Store a value, which expires after `ttl_sec` if given."""
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """State of a single worker process."""
+
+    def __init__(self):
+        self._values: dict[str, tuple[str, Optional[float]]] = {}  # key -> (value, expiry)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value, expires_ts = self._values.get(key, (None, None))
+            if expires_ts is not None and expires_ts <= time.time():
+                del self._values[key]
+                return None
+            return value
+
+    def set(self, key: str, value: str, ttl_sec: Optional[float] = None) -> None:
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl_sec if ttl_sec is not None else None)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class SQLiteStateBackend(StateBackend):
+    """State shared by the workers of one host through a SQLite file."""
+
+    def __init__(self, path: str, key_prefix: str):
+        self.key_prefix = key_prefix
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_ts REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_ts IS NULL OR expires_ts > ?)",
+                (self.key_prefix + key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl_sec: Optional[float] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_ts) VALUES (?, ?, ?)",
+                (self.key_prefix + key, value, now + ttl_sec if ttl_sec is not None else None),
+            )
+            # Expired keys are only cleaned up on writes, reads skip them
+            self._conn.execute("DELETE FROM state WHERE expires_ts <= ?", (now,))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM state WHERE key = ?", (self.key_prefix + key,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStateBackend(StateBackend):
+    """State shared by workers on any number of hosts through a Redis-protocol server."""
+
+    def __init__(self, url: str, key_prefix: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis state backend needs the redis package, install it with `uv sync --extra redis`") from e
+
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(self.key_prefix + key)
+
+    def set(self, key: str, value: str, ttl_sec: Optional[float] = None) -> None:
+        self._client.set(self.key_prefix + key, value, px=int(ttl_sec * 1000) if ttl_sec is not None else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.key_prefix + key)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_state_backend(config: StateConfig) -> StateBackend:
+    """Factory function to create the configured state backend.
+
+    Raises:
+        ValueError: If the backend is not supported
+    """
+    if config.backend == "memory":
+        return MemoryStateBackend()
+    elif config.backend == "sqlite":
+        return SQLiteStateBackend(config.sqlite_path, config.key_prefix)
+    elif config.backend == "redis":
+        return RedisStateBackend(config.redis_url, config.key_prefix)
+    else:
+        raise ValueError(f"Unsupported state backend: {config.backend}")
+
+
+class SharedConfig(Generic[ConfigT]):
+    """A config stored in the state backend, so every worker applies the same one.
+
+    `current` is read from a local copy, which a background thread refreshes
+    every `poll_interval_sec`. A worker updating the config applies it at
+    once, the others within the poll interval. Until `start` is given the
+    backend, `current` holds the defaults and updates only apply locally.
+    """
+
+    def __init__(self, model: type[ConfigT], poll_interval_sec: float):
+        self.backend: Optional[StateBackend] = None
+        self.model = model
+        self.poll_interval_sec = poll_interval_sec
+        self.current: ConfigT = model()
+        self._raw: Optional[str] = None  # The stored JSON of the current config
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, backend: StateBackend) -> None:
+        """Load the stored config and keep it refreshed. Blocks on the backend."""
+        self.backend = backend
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="shared-config", daemon=True)
+        self._thread.start()
+        # Registered after close_state, so it runs before the backend is closed
+        atexit.register(self.close)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def refresh(self) -> bool:
+        """Pick up the stored config. Returns whether it changed."""
+        raw = self.backend.get(CONFIG_KEY)
+        if raw is None or raw == self._raw:
+            return False
+        try:
+            self.current = self.model.model_validate_json(raw)
+        except ValueError as e:
+            logger.error(f"Ignoring invalid shared config: {e}")
+            return False
+        self._raw = raw
+        logger.info("Applied the shared config")
+        return True
+
+    def update(self, config: ConfigT) -> None:
+        """Store a new config for all workers and apply it to this one."""
+        raw = config.model_dump_json()
+        if self.backend is not None:
+            self.backend.set(CONFIG_KEY, raw)
+        self.current = config
+        self._raw = raw
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval_sec):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing the shared config: {e}")
+
+
+class SessionDirectory:
+    """Which worker serves each live /stream session.
+
+    Sessions hold audio, transcriber streams and analysis tasks, so they stay
+    in the worker that created them. The directory lets another worker
+    recognize a reconnection it cannot serve. Entries expire unless renewed,
+    so the sessions of a worker that died are forgotten.
+    """
+
+    def __init__(self, backend: StateBackend):
+        self.backend = backend
+
+    def claim(self, session_id: str, ttl_sec: float) -> None:
+        """Record or renew this worker as the one serving a session."""
+        self.backend.set(SESSION_KEY_PREFIX + session_id, WORKER_ID, ttl_sec)
+
+    def owner(self, session_id: str) -> Optional[str]:
+        return self.backend.get(SESSION_KEY_PREFIX + session_id)
+
+    def release(self, session_id: str) -> None:
+        self.backend.delete(SESSION_KEY_PREFIX + session_id)
+
+
+_backends: list[StateBackend] = []
+
+
+def open_state(config: StateConfig) -> StateBackend:
+    """Create a state backend closed at exit."""
+    backend = create_state_backend(config)
+    _backends.append(backend)
+    logger.info(f"Using the {config.backend} state backend")
+    return backend
+
+
+@atexit.register
+def close_state() -> None:
+    for backend in _backends:
+        with contextlib.suppress(Exception):
+            backend.close()
@@ -0,0 +1,417 @@
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from pydantic import BaseModel
+
+from app.observability.metrics import STORE_WRITE_BATCH_SECONDS, STORE_WRITES_DEPTH, STORE_WRITES_DROPPED
+from app.storage.search import ensure_search_index
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,  -- stream or file
+    filename TEXT,
+    method TEXT NOT NULL,
+    model_checkpoint TEXT NOT NULL,
+    config TEXT,  -- TranscriptionConfig as JSON
+    started_ts REAL NOT NULL,
+    ended_ts REAL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions(id),
+    seq INTEGER NOT NULL,
+    start_ms INTEGER NOT NULL,  -- Offset of the audio from the start of the session
+    end_ms INTEGER,
+    text TEXT NOT NULL,
+    is_final INTEGER NOT NULL,
+    received_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_by_session ON segments(session_id, start_ms);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL REFERENCES sessions(id),
+    scope TEXT NOT NULL,  -- realtime or postdebate
+    round INTEGER NOT NULL,
+    analysis TEXT NOT NULL,  -- e.g. rhetorical_analysis
+    field TEXT NOT NULL,  -- e.g. fallacies
+    label TEXT,  -- The strategy, fallacy or source of the finding
+    quote TEXT,
+    item TEXT NOT NULL,  -- The finding as JSON
+    offset_ms INTEGER,  -- Offset of the oldest analyzed text from the start of the session
+    created_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS findings_by_session ON findings(session_id, offset_ms);
+"""
+
+_STOP = object()
+
+
+class StoreConfig(BaseModel):
+    path: str = "data/truthseeker.db"
+    commit_interval_ms: int = 500  # Writes are committed at least this often, bounding what a crash loses
+    batch_size: int = 500  # ...or as soon as this many are pending
+    queue_size: int = 100000  # Writes are dropped, not waited on, beyond this
+
+
+class TranscriptStore:
+    """Append-only SQLite store of sessions, transcript segments and findings.
+
+    Writes are queued without blocking and applied by a background thread,
+    which commits them in batches. The database is in WAL mode, so readers
+    never wait for the writer.
+
+    Sessions recording into the store hold a reference to it. A retired
+    store, e.g. after the configured path changed, keeps its writer until
+    the last of them is released.
+    """
+
+    def __init__(self, config: StoreConfig):
+        self.config = config
+        self.path = Path(config.path)
+        self._queue: queue.Queue = queue.Queue(config.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._dropping = False  # Whether the last write was dropped
+        self._users = 0  # Recorders holding the store
+        self._retired = False
+        self._users_lock = threading.Lock()
+
+    def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.closing(self.connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            ensure_search_index(conn)
+        self._thread = threading.Thread(target=self._run, name="transcript-store", daemon=True)
+        self._thread.start()
+        logger.info(f"Transcript store opened at {self.path}")
+
+    def close(self) -> None:
+        """Commit the pending writes and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def acquire(self) -> None:
+        with self._users_lock:
+            self._users += 1
+
+    def release(self) -> None:
+        """Stop using the store, which is closed if it was retired and this was its last user."""
+        with self._users_lock:
+            self._users -= 1
+            unused = self._retired and self._users == 0
+        if unused:
+            self._stop_writer()
+
+    def retire(self) -> None:
+        """Close the store once its last user releases it."""
+        with self._users_lock:
+            self._retired = True
+            unused = self._users == 0
+        if unused:
+            self._stop_writer()
+
+    def _stop_writer(self) -> None:
+        # The writer commits what is queued before it and exits, without the caller,
+        # possibly the event loop, waiting for it or for room in a full queue
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            threading.Thread(target=self._queue.put, args=(_STOP,), name="transcript-store-stop", daemon=True).start()
+        logger.info(f"Closing the transcript store at {self.path}")
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new connection, for a single thread, to read from the store."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # Durable up to the last checkpoint in WAL mode, without an fsync per commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def submit(self, sql: str, params: tuple) -> None:
+        """Queue a write without waiting for it."""
+        try:
+            self._queue.put_nowait((sql, params))
+            self._dropping = False
+        except queue.Full:
+            STORE_WRITES_DROPPED.inc()
+            if not self._dropping:
+                logger.warning("Transcript store is falling behind, dropping writes")
+                self._dropping = True
+
+    def open_session(
+        self,
+        session_id: str,
+        source: str,
+        method: str,
+        model_checkpoint: str,
+        config: Optional[str] = None,
+        filename: Optional[str] = None,
+        started_ts: Optional[float] = None,
+    ) -> None:
+        self.submit(
+            "INSERT OR IGNORE INTO sessions (id, source, filename, method, model_checkpoint, config, started_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, source, filename, method, model_checkpoint, config, started_ts or time.time()),
+        )
+
+    def end_session(self, session_id: str, ended_ts: Optional[float] = None) -> None:
+        self.submit("UPDATE sessions SET ended_ts = ? WHERE id = ?", (ended_ts or time.time(), session_id))
+
+    def add_segment(
+        self,
+        session_id: str,
+        seq: int,
+        start_ms: int,
+        end_ms: Optional[int],
+        text: str,
+        is_final: bool,
+        received_ts: float,
+    ) -> None:
+        self.submit(
+            "INSERT INTO segments (session_id, seq, start_ms, end_ms, text, is_final, received_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, seq, start_ms, end_ms, text, int(is_final), received_ts),
+        )
+
+    def add_finding(
+        self,
+        session_id: str,
+        scope: str,
+        round_number: int,
+        analysis: str,
+        field: str,
+        item: dict[str, Any],
+        offset_ms: Optional[int],
+    ) -> None:
+        label = next(
+            (value for key, value in item.items() if key not in ("quote", "url") and isinstance(value, str)), None
+        )
+        self.submit(
+            "INSERT INTO findings (session_id, scope, round, analysis, field, label, quote, item, offset_ms, created_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id, scope, round_number, analysis, field, label, item.get("quote"),
+                json.dumps(item, ensure_ascii=False), offset_ms, time.time(),
+            ),
+        )
+
+    def load_session(self, session_id: str) -> Optional[dict]:
+        """Read a session with its segments and findings. Blocks, so run it in a thread."""
+        with contextlib.closing(self.connect()) as conn:
+            session = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if session is None:
+                return None
+            segments = conn.execute(
+                "SELECT seq, start_ms, end_ms, text, is_final, received_ts FROM segments "
+                "WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+            findings = conn.execute(
+                "SELECT scope, round, analysis, field, item, offset_ms, created_ts FROM findings "
+                "WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+
+        result = dict(session)
+        result["config"] = json.loads(result["config"]) if result["config"] else None
+        result["segments"] = [dict(segment, is_final=bool(segment["is_final"])) for segment in segments]
+        result["findings"] = [dict(finding, item=json.loads(finding["item"])) for finding in findings]
+        return result
+
+    def _run(self) -> None:
+        conn = self.connect()
+        interval_sec = self.config.commit_interval_ms / 1000
+        stopping = False
+        while not stopping:
+            write = self._queue.get()
+            if write is _STOP:
+                break
+            batch = [write]
+            deadline = time.monotonic() + interval_sec
+            while len(batch) < self.config.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    write = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if write is _STOP:
+                    stopping = True
+                    break
+                batch.append(write)
+            self._write(conn, batch)
+            STORE_WRITES_DEPTH.set(self._queue.qsize())
+        conn.close()
+        if self._retired:
+            _forget_retired_store(self)
+
+    def _write(self, conn: sqlite3.Connection, batch: list[tuple[str, tuple]]) -> None:
+        start = time.perf_counter()
+        try:
+            with conn:
+                for sql, params in batch:
+                    conn.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.error(f"Could not commit {len(batch)} writes to the transcript store: {e}")
+        STORE_WRITE_BATCH_SECONDS.observe(time.perf_counter() - start)
+
+
+class SessionRecorder:
+    """Record one session's transcript and findings as they are produced.
+
+    The recorder releases its store, acquired with `get_store(..., acquire=True)`,
+    when it is closed.
+    """
+
+    def __init__(self, store: Optional[TranscriptStore], session_id: str, started_ts: Optional[float] = None):
+        self.store = store
+        self.session_id = session_id
+        self.started_ts = started_ts or time.time()
+        self._transcript = ""  # Cumulative transcript recorded so far
+        # Findings already recorded one by one while their analysis streamed
+        self._streamed: set[tuple[str, int, str, str, str]] = set()
+
+    def open(self, source: str, method: str, model_checkpoint: str, config: Optional[str] = None, **kwargs) -> None:
+        if self.store is not None:
+            self.store.open_session(
+                self.session_id, source, method, model_checkpoint, config, started_ts=self.started_ts, **kwargs
+            )
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.end_session(self.session_id)
+            self.store.release()
+
+    def record_segment(
+        self, seq: int, start_sample: int, samples: Optional[int], text: str, is_final: bool, received_ts: float
+    ) -> None:
+        """Record the text a chunk added to the cumulative transcript, with the position of its audio.
+
+        Args:
+            seq: Sequence number of the websocket message behind the chunk
+            start_sample: Offset of the chunk's audio in the session, in samples at 16 kHz
+            samples: Length of the chunk's audio, if known
+            text: Cumulative transcript of the session after the chunk
+            is_final: Whether this is the last chunk of the session
+            received_ts: Wall time the chunk's audio was received
+        """
+        if self.store is None:
+            return
+        # Streaming backends may revise interim text, in which case the
+        # revised part is recorded again
+        common = len(os.path.commonprefix([self._transcript, text]))
+        new_text = text[common:].strip()
+        self._transcript = text
+        if not new_text:
+            return
+        start_ms = start_sample * 1000 // WHISPER_SAMPLE_RATE_HZ
+        end_ms = (start_sample + samples) * 1000 // WHISPER_SAMPLE_RATE_HZ if samples is not None else None
+        self.store.add_segment(self.session_id, seq, start_ms, end_ms, new_text, is_final, received_ts)
+
+    def record_item(
+        self, round_number: int, utterance_ts: float, analysis: str, field: str, item: BaseModel, scope: str = "realtime"
+    ) -> None:
+        """Record a single finding, e.g. one streamed before its analysis completed."""
+        if self.store is None:
+            return
+        self._streamed.add((scope, round_number, analysis, field, item.model_dump_json()))
+        self.store.add_finding(
+            self.session_id, scope, round_number, analysis, field, item.model_dump(), self._offset_ms(utterance_ts)
+        )
+
+    def record_result(
+        self, round_number: int, utterance_ts: float, analysis: str, result: BaseModel, scope: str = "realtime"
+    ) -> None:
+        """Record every finding of a completed analysis that was not recorded while it streamed."""
+        if self.store is None:
+            return
+        # Post-debate findings cover the whole debate and have no position
+        offset_ms = self._offset_ms(utterance_ts) if scope == "realtime" else None
+        for field, item in iter_findings(result):
+            if (scope, round_number, analysis, field, item.model_dump_json()) not in self._streamed:
+                self.store.add_finding(
+                    self.session_id, scope, round_number, analysis, field, item.model_dump(), offset_ms
+                )
+
+    def _offset_ms(self, utterance_ts: float) -> int:
+        return max(0, int((utterance_ts - self.started_ts) * 1000))
+
+
+def iter_findings(result: BaseModel) -> Iterator[tuple[str, BaseModel]]:
+    """Yield the field name and value of every finding in an analysis, however nested."""
+    for field in type(result).model_fields:
+        value = getattr(result, field)
+        if isinstance(value, BaseModel):
+            yield from iter_findings(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, BaseModel):
+                    yield field, item
+
+
+# Store shared by all sessions, opened on first use
+shared_store: Optional[TranscriptStore] = None
+# Stores replaced after a path change, still written to by the sessions using them
+_retired_stores: list[TranscriptStore] = []
+_store_lock = threading.Lock()
+
+
+def get_store(config: StoreConfig, acquire: bool = False) -> TranscriptStore:
+    """Return the process-wide store, reopening it if the configured path changed.
+
+    Opening the store creates its schema, so this blocks and the event loop
+    calls it from a thread.
+
+    Args:
+        config: Store settings
+        acquire: Whether to hold a reference to the store for a recorder,
+            so it is not closed before the recorder releases it
+    """
+    global shared_store
+    with _store_lock:
+        if shared_store is not None and shared_store.path != Path(config.path):
+            shared_store.retire()
+            _retired_stores.append(shared_store)
+            shared_store = None
+        if shared_store is None:
+            store = TranscriptStore(config)
+            store.start()
+            shared_store = store
+        if acquire:
+            shared_store.acquire()
+        return shared_store
+
+
+def _forget_retired_store(store: TranscriptStore) -> None:
+    """Drop a retired store whose writer exited after its last recorder closed."""
+    with _store_lock:
+        if store in _retired_stores:
+            _retired_stores.remove(store)
+
+
+@atexit.register
+def close_store() -> None:
+    """Commit the writes still queued. Runs at exit."""
+    with _store_lock:
+        stores = [*_retired_stores, shared_store]
+    for store in stores:
+        if store is not None:
+            store.close()
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Literal, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.observability import metrics
+from app.transcription.common import StreamingTranscriptionResult
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ, AudioBuffer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+OverloadPolicy = Literal["block", "drop_oldest", "merge_oldest", "degrade"]
+
+
+class PipelineConfig(BaseModel):
+    frame_queue_size: int = 1000  # Audio messages waiting to be chunked, ~8s of 128-sample frames
+    chunk_queue_size: int = Field(default=3, ge=2)  # Chunks waiting for the transcriber, the policy applies beyond
+    result_queue_size: int = 16  # Transcripts waiting to be sent
+    # What to do with a new chunk when the transcriber is behind:
+    # block: wait, which stops reading from the websocket, as before
+    # drop_oldest: skip the audio that waited longest
+    # merge_oldest: join the two oldest chunks, so one longer call replaces two
+    # degrade: merge, and transcribe with degraded_model_checkpoint until caught up
+    overload_policy: OverloadPolicy = "merge_oldest"
+    max_merged_ms: int = 20000  # Chunks are never merged past this, Whisper decodes at most 30s at once
+    degraded_model_checkpoint: Optional[str] = None  # For degrade, a faster checkpoint of the same method
+    lag_report_interval_sec: float = 2.0  # How often the client is told how far behind live it is, 0 disables
+    drain_timeout_sec: float = 30.0  # A finished session gets this long to transcribe what it queued
+
+
+@dataclass
+class AudioChunk:
+    index: int  # Order of the chunk in the session
+    seq: int  # Last client message whose audio the chunk includes
+    samples: np.ndarray
+    start_sample: int  # Offset of the chunk's audio in the session
+    received_ts: float  # When its oldest complete audio arrived, lag is measured from here
+    is_final: bool = False
+
+
+class ChunkQueue:
+    """Bounded queue of chunks waiting for the transcriber, applying the overload policy when full."""
+
+    def __init__(self, maxsize: int, policy: OverloadPolicy, max_merged_samples: int):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_merged_samples = max_merged_samples
+        self.chunks: deque[AudioChunk] = deque()
+        self.shed: list[AudioChunk] = []  # Chunks dropped or merged away since the last call to take_shed
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    async def put(self, chunk: AudioChunk) -> None:
+        while len(self.chunks) >= self.maxsize:
+            if self.policy == "block":
+                await self._wait_for_change()
+            elif self.policy == "drop_oldest" or not self._merge_oldest():
+                dropped = self.chunks.popleft()
+                self.shed.append(dropped)
+                metrics.STREAM_CHUNKS_SHED.labels("dropped").inc()
+                metrics.STREAM_CHUNKS_DEPTH.dec()
+        self.chunks.append(chunk)
+        metrics.STREAM_CHUNKS_DEPTH.inc()
+        self._notify()
+
+    async def get(self) -> AudioChunk:
+        while not self.chunks:
+            await self._wait_for_change()
+        chunk = self.chunks.popleft()
+        metrics.STREAM_CHUNKS_DEPTH.dec()
+        self._notify()
+        return chunk
+
+    def take_shed(self) -> list[AudioChunk]:
+        shed, self.shed = self.shed, []
+        return shed
+
+    def clear(self) -> None:
+        metrics.STREAM_CHUNKS_DEPTH.dec(len(self.chunks))
+        self.chunks.clear()
+
+    def _merge_oldest(self) -> bool:
+        """Join the two oldest chunks, unless the result would be too long. Returns whether it did."""
+        first, second = self.chunks[0], self.chunks[1]
+        if second.is_final:
+            return False
+        # Chunks overlap, the second repeats the end of the first
+        overlap = max(0, first.start_sample + len(first.samples) - second.start_sample)
+        if len(first.samples) + len(second.samples) - overlap > self.max_merged_samples:
+            return False
+        self.chunks.popleft()
+        self.chunks[0] = AudioChunk(
+            index=first.index,
+            seq=second.seq,
+            samples=np.concatenate((first.samples, second.samples[overlap:])),
+            start_sample=first.start_sample,
+            received_ts=first.received_ts,
+        )
+        self.shed.append(second)
+        metrics.STREAM_CHUNKS_SHED.labels("merged").inc()
+        metrics.STREAM_CHUNKS_DEPTH.dec()
+        return True
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait_for_change(self) -> None:
+        await self._changed.wait()
+
+
+class StreamPipeline:
+    """Chunk, transcribe and send stages of a /stream session, connected by bounded queues.
+
+    The websocket loop only receives: it hands audio to `put_audio` and
+    returns to the socket, while each stage runs in its own task. When the
+    transcriber falls behind, chunks pile up in a small queue whose overload
+    policy bounds the lag. The pipeline outlives the session's connections,
+    so audio received before a reconnect is still transcribed.
+    """
+
+    def __init__(
+        self,
+        config: PipelineConfig,
+        audio_buffer: Optional[AudioBuffer],
+        transcribe: Callable[[AudioChunk, bool], Awaitable[StreamingTranscriptionResult]],
+        deliver: Callable[[AudioChunk, StreamingTranscriptionResult], Awaitable[None]],
+        report: Callable[[dict], Awaitable[None]],
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            config: Queue sizes, overload policy and lag reporting
+            audio_buffer: Buffer cutting the audio into overlapping chunks,
+                None to transcribe each message as it arrives
+            transcribe: Transcribes a chunk, with the degraded transcriber if
+                the second argument is True
+            deliver: Sends a transcript to the client, in chunk order
+            report: Sends a lag message to the client
+        """
+        self.config = config
+        self.audio_buffer = audio_buffer
+        self.transcribe = transcribe
+        self.deliver = deliver
+        self.report = report
+        self.frames: asyncio.Queue = asyncio.Queue(config.frame_queue_size)
+        self.chunks = ChunkQueue(
+            config.chunk_queue_size,
+            config.overload_policy,
+            config.max_merged_ms * WHISPER_SAMPLE_RATE_HZ // 1000,
+        )
+        self.results: asyncio.Queue = asyncio.Queue(config.result_queue_size)
+        self.degraded = False
+        self.shed_chunks = 0
+        self.audio_offset = 0  # Offset in the session of the next chunk's audio, in samples
+        self.finishing = False
+        self._next_index = 0
+        self._undelivered: dict[int, float] = {}  # Chunk index -> received_ts, oldest first
+        self._tasks: list[asyncio.Task] = []
+        self._done = asyncio.Event()
+
+    def start(self) -> None:
+        """Start the stages, as tasks of the current session's context."""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._chunk_stage(), name="pipeline-chunk"),
+            asyncio.create_task(self._transcribe_stage(), name="pipeline-transcribe"),
+            asyncio.create_task(self._send_stage(), name="pipeline-send"),
+        ]
+        if self.config.lag_report_interval_sec > 0:
+            self._tasks.append(asyncio.create_task(self._report_stage(), name="pipeline-lag"))
+
+    async def put_audio(self, seq: int, samples: np.ndarray, received_ts: float) -> None:
+        """Queue the audio of a message, waiting only if the chunk stage is blocked."""
+        await self.frames.put((seq, samples, received_ts))
+        metrics.STREAM_FRAMES_DEPTH.inc()
+
+    async def finish(self, seq: int) -> None:
+        """Queue the end of the stream, transcribed as a final chunk with message `seq`."""
+        self.finishing = True
+        await self.frames.put((seq, None, time.time()))
+        metrics.STREAM_FRAMES_DEPTH.inc()
+
+    def lag_sec(self) -> float:
+        """How long the oldest chunk not yet sent has waited."""
+        if not self._undelivered:
+            return 0.0
+        return max(0.0, time.time() - next(iter(self._undelivered.values())))
+
+    async def close(self) -> None:
+        """Stop the stages, first letting a finished stream send its final transcript."""
+        if self.finishing and not self._done.is_set():
+            try:
+                await asyncio.wait_for(self._done.wait(), self.config.drain_timeout_sec)
+            except asyncio.TimeoutError:
+                logger.warning("Closing the pipeline before its final transcript")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        metrics.STREAM_FRAMES_DEPTH.dec(self.frames.qsize())
+        metrics.STREAM_RESULTS_DEPTH.dec(self.results.qsize())
+        self.chunks.clear()
+        if self.audio_buffer is not None:
+            metrics.AUDIO_BUFFER_DEPTH.dec(len(self.audio_buffer.buffer))
+
+    async def _chunk_stage(self) -> None:
+        while True:
+            seq, samples, received_ts = await self.frames.get()
+            metrics.STREAM_FRAMES_DEPTH.dec()
+            if samples is None:
+                # End of the stream: the rest of the buffer is the final chunk
+                if self.audio_buffer is not None:
+                    samples = self.audio_buffer.get_remaining_samples()
+                    metrics.AUDIO_BUFFER_DEPTH.dec(len(samples))
+                else:
+                    samples = np.array([], dtype=np.float32)
+                await self._put_chunk(seq, samples, received_ts, is_final=True)
+                return
+
+            if self.audio_buffer is None:
+                await self._put_chunk(seq, samples, received_ts)
+                self.audio_offset += len(samples)
+                continue
+
+            stage_start = time.perf_counter()
+            buffered_before = len(self.audio_buffer.buffer)
+            complete_chunks = self.audio_buffer.add_samples(samples)
+            metrics.AUDIO_BUFFER_DEPTH.inc(len(self.audio_buffer.buffer) - buffered_before)
+            metrics.STAGE["buffer"].observe(time.perf_counter() - stage_start)
+            for chunk in complete_chunks:
+                await self._put_chunk(seq, chunk, received_ts)
+                # Chunks overlap, the next one starts before this one ends
+                self.audio_offset += len(chunk) - self.audio_buffer.overlap_samples
+
+    async def _put_chunk(self, seq: int, samples: np.ndarray, received_ts: float, is_final: bool = False) -> None:
+        chunk = AudioChunk(self._next_index, seq, samples, self.audio_offset, received_ts, is_final)
+        self._next_index += 1
+        self._undelivered[chunk.index] = received_ts
+        await self.chunks.put(chunk)
+        for shed in self.chunks.take_shed():
+            # A merged chunk keeps the index of the oldest one
+            self._undelivered.pop(shed.index, None)
+            self.shed_chunks += 1
+        if self.config.overload_policy == "degrade" and not self.degraded and len(self.chunks) >= self.chunks.maxsize:
+            logger.warning("Transcriber is falling behind, switching to the degraded model")
+            self.degraded = True
+
+    async def _transcribe_stage(self) -> None:
+        while True:
+            chunk = await self.chunks.get()
+            try:
+                result = await self.transcribe(chunk, self.degraded)
+            except Exception as e:
+                logger.error(f"Error transcribing chunk {chunk.seq}: {e}")
+                self._undelivered.pop(chunk.index, None)
+                if not chunk.is_final:
+                    continue
+                result = StreamingTranscriptionResult(text="", is_final=True)
+            if self.degraded and not self.chunks:
+                logger.info("Transcriber caught up, switching back to the configured model")
+                self.degraded = False
+            await self.results.put((chunk, result))
+            metrics.STREAM_RESULTS_DEPTH.inc()
+            if chunk.is_final:
+                return
+
+    async def _send_stage(self) -> None:
+        while True:
+            chunk, result = await self.results.get()
+            metrics.STREAM_RESULTS_DEPTH.dec()
+            try:
+                await self.deliver(chunk, result)
+            except Exception as e:
+                logger.error(f"Error delivering the transcript of chunk {chunk.seq}: {e}")
+            self._undelivered.pop(chunk.index, None)
+            metrics.STREAM_LAG_SECONDS.observe(time.time() - chunk.received_ts)
+            if chunk.is_final:
+                self._done.set()
+                return
+
+    async def _report_stage(self) -> None:
+        while not self._done.is_set():
+            await asyncio.sleep(self.config.lag_report_interval_sec)
+            await self.report({
+                "type": "lag",
+                "lag_ms": round(self.lag_sec() * 1000),
+                "queued_chunks": len(self.chunks),
+                "shed_chunks": self.shed_chunks,
+                "degraded": self.degraded,
+            })
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from app.analysis.claim_index import ClaimIndex
+from app.analysis.delivery import AnalysisPublisher, WebSocketSender
+from app.analysis.prefilter import RhetoricPrefilter
+from app.analysis.scheduler import AnalysisScheduler
+from app.observability.metrics import DETACHED_SESSIONS
+from app.observability.tracing import SessionTracer
+from app.storage.state import WORKER_ID, SessionDirectory
+from app.storage.store import SessionRecorder
+from app.streaming.pipeline import StreamPipeline
+from app.transcription.common import BaseTranscriber
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory entries outlive the grace period by this much, they are renewed with every ack
+CLAIM_TTL_MARGIN_SEC = 30.0
+
+# Audio frames start with their sequence number, as a little-endian uint32
+SEQ_HEADER_BYTES = 4
+
+# Settings of the TranscriptionConfig a client may choose for its session in
+# the handshake. The others (store, tracing, resume...) are the operator's.
+SESSION_CONFIG_FIELDS = frozenset({
+    "method",
+    "model_checkpoint",
+    "language",
+    "chunk_size_ms",
+    "overlap_ms",
+    "direct_streaming",
+    "save_transcript",
+    "analysis",
+    "map_reduce",
+    "prefilter",
+    "claim_index",
+    "context_budget",
+    "refinement",
+})
+
+# Checkpoints a client may choose for each method, besides the configured ones. Their names
+# label metrics, and local_whisper downloads and loads the model a session asks for.
+SESSION_MODEL_CHECKPOINTS = {
+    "local_whisper": frozenset({
+        "tiny.en",
+        "base.en",
+        "small.en",
+        "medium.en",
+        "large-v2",
+        "large-v3",
+        "large-v3-turbo",
+        "large-v3-turbo-q5_0",
+    }),
+    "openai_whisper": frozenset({"whisper-1"}),
+    "google_speech": frozenset({"default", "latest_long", "latest_short"}),
+}
+
+# Cost settings a session may only tighten: each is combined with the configured
+# value, e.g. a session gets at most the configured map-reduce concurrency
+SESSION_CONFIG_LIMITS = {
+    ("map_reduce", "max_concurrency"): min,
+    ("context_budget", "max_prompt_tokens"): min,
+    ("analysis", "min_interval_sec"): max,
+    ("prefilter", "enabled"): max,
+}
+
+ConfigT = TypeVar("ConfigT", bound=BaseModel)
+
+
+class ResumeConfig(BaseModel):
+    grace_period_sec: float = 60.0  # A disconnected session is kept this long for its client, 0 disables resuming
+    ack_every_messages: int = 250  # Acknowledge the messages received this often, ~2s of 128-sample frames
+    max_pending_messages: int = 1000  # Messages kept for a disconnected client, the oldest are dropped beyond this
+
+
+def resolve_session_config(base: ConfigT, overrides: dict[str, Any]) -> ConfigT:
+    """Apply the settings a client chose for its session to the shared config.
+
+    Nested settings are merged, so {"analysis": {"min_new_tokens": 20}} keeps
+    the other analysis settings. Checkpoints must be in `SESSION_MODEL_CHECKPOINTS`
+    or the configured ones, and `SESSION_CONFIG_LIMITS` are applied.
+
+    Args:
+        base: The config shared by all workers
+        overrides: Settings from the client's handshake
+
+    Returns:
+        The session's config
+
+    Raises:
+        ValueError: If a setting may not be chosen by clients or is invalid
+    """
+    not_allowed = sorted(set(overrides) - SESSION_CONFIG_FIELDS)
+    if not_allowed:
+        raise ValueError(f"Sessions cannot set {', '.join(not_allowed)}")
+    try:
+        config = type(base).model_validate(_merge(base.model_dump(), overrides))
+    except ValidationError as e:
+        # Without the input values, which include the operator's settings
+        errors = [f"{'.'.join(map(str, error['loc'])) or 'config'}: {error['msg']}" for error in e.errors()]
+        raise ValueError("; ".join(errors)) from None
+
+    method = config.method.value
+    allowed = SESSION_MODEL_CHECKPOINTS.get(method, frozenset())
+    if config.model_checkpoint not in allowed and (
+        config.method != base.method or config.model_checkpoint != base.model_checkpoint
+    ):
+        raise ValueError(f"Checkpoint {config.model_checkpoint!r} is not available for {method}")
+    draft = config.refinement.draft_model_checkpoint
+    if draft is not None and draft != base.refinement.draft_model_checkpoint and (
+        draft not in SESSION_MODEL_CHECKPOINTS["local_whisper"]
+    ):
+        raise ValueError(f"Draft checkpoint {draft!r} is not available")
+
+    for (section, name), tighter in SESSION_CONFIG_LIMITS.items():
+        settings = getattr(config, section)
+        setattr(settings, name, tighter(getattr(settings, name), getattr(getattr(base, section), name)))
+    return config
+
+
+def _merge(base: dict[str, Any], overrides: dict[str, Any]) -> dict[str, Any]:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+@dataclass
+class StreamSession:
+    """State of a /stream session, which outlives its websocket connections."""
+
+    id: str
+    config: Any  # The TranscriptionConfig the session started with
+    transcriber: BaseTranscriber
+    sender: WebSocketSender
+    publisher: AnalysisPublisher
+    tracer: SessionTracer
+    recorder: SessionRecorder
+    prefilter: RhetoricPrefilter
+    claim_index: ClaimIndex
+    use_direct_streaming: bool
+    degraded_transcriber: Optional[BaseTranscriber] = None  # Used while the pipeline is behind, if configured
+    active_transcriber: Optional[BaseTranscriber] = None  # The one holding the transcript so far
+    pipeline: Optional[StreamPipeline] = None
+    analysis_scheduler: Optional[AnalysisScheduler] = None
+    postdebate_task: Optional[asyncio.Task] = None
+    seq: int = 0  # Sequence number of the last message received, older ones are resent duplicates
+    finished: bool = False  # Whether the client sent its last chunk
+    connection: Optional[asyncio.Task] = None  # Task receiving from the attached websocket
+    expiry: Optional[asyncio.TimerHandle] = field(default=None, repr=False)
+
+
+class SessionRegistry:
+    """Keep disconnected sessions for a grace period so their clients can resume them.
+
+    A client resumes by reconnecting with its session id. If the server has
+    not noticed the previous connection drop yet, that connection is taken
+    over. Sessions not resumed in time are closed with `close_session`.
+
+    Sessions are recorded in the shared `directory`, so a worker can tell a
+    reconnection meant for another worker from one that came too late.
+    """
+
+    def __init__(
+        self,
+        close_session: Callable[[StreamSession], Awaitable[None]],
+        directory: Optional[SessionDirectory] = None,
+    ):
+        self.close_session = close_session
+        self.directory = directory
+        self.sessions: dict[str, StreamSession] = {}
+
+    async def add(self, session: StreamSession) -> None:
+        self.sessions[session.id] = session
+        await self.renew(session)
+
+    async def renew(self, session: StreamSession) -> None:
+        """Record, again, that this worker serves the session."""
+        if self.directory is None:
+            return
+        ttl_sec = session.config.resume.grace_period_sec + CLAIM_TTL_MARGIN_SEC
+        try:
+            await asyncio.to_thread(self.directory.claim, session.id, ttl_sec)
+        except Exception as e:
+            logger.error(f"Error recording session {session.id} in the directory: {e}")
+
+    async def served_elsewhere(self, session_id: str) -> Optional[str]:
+        """Return the other worker serving a session, if any."""
+        if self.directory is None or session_id in self.sessions:
+            return None
+        try:
+            owner = await asyncio.to_thread(self.directory.owner, session_id)
+        except Exception as e:
+            logger.error(f"Error looking up session {session_id} in the directory: {e}")
+            return None
+        return owner if owner != WORKER_ID else None
+
+    async def resume(self, session_id: str) -> Optional[StreamSession]:
+        """Detach a session from its previous connection and return it, or None if it is gone."""
+        session = self.sessions.get(session_id)
+        if session is None or session.finished:
+            return None
+
+        previous = session.connection
+        if previous is not None and not previous.done():
+            logger.info(f"Session {session_id} reconnected, taking over its previous connection")
+            # Cleared first, so the previous connection knows it was taken over
+            session.connection = None
+            previous.cancel()
+            await asyncio.wait([previous])
+
+        if session.expiry is not None:
+            session.expiry.cancel()
+            session.expiry = None
+            DETACHED_SESSIONS.dec()
+        return session
+
+    async def detach(self, session: StreamSession, grace_period_sec: float) -> None:
+        """Keep a session whose client disconnected, closing it after the grace period."""
+        session.sender.detach()
+        session.expiry = asyncio.get_running_loop().call_later(
+            grace_period_sec, lambda: asyncio.create_task(self._expire(session))
+        )
+        DETACHED_SESSIONS.inc()
+        logger.info(f"Session {session.id} detached, keeping it for {grace_period_sec:.0f}s")
+        await self.renew(session)
+
+    async def close(self, session: StreamSession) -> None:
+        if self.sessions.pop(session.id, None) is None:
+            return
+        if self.directory is not None:
+            try:
+                await asyncio.to_thread(self.directory.release, session.id)
+            except Exception as e:
+                logger.error(f"Error removing session {session.id} from the directory: {e}")
+        await self.close_session(session)
+
+    async def _expire(self, session: StreamSession) -> None:
+        session.expiry = None
+        DETACHED_SESSIONS.dec()
+        logger.info(f"Session {session.id} was not resumed in time, closing it")
+        await self.close(session)
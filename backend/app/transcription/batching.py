@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Hashable, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from app.observability import metrics
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class BatchingConfig(BaseModel):
+    enabled: bool = True  # Decode the chunks of concurrent local whisper sessions together
+    window_ms: int = 40  # How long a chunk reaching an idle model waits for others to join it
+    max_batch_size: int = Field(default=8, ge=1)  # Chunks decoded in one call
+    max_batch_audio_ms: int = 28000  # Packed audio, gaps included, must fit Whisper's 30s window
+    gap_ms: int = 600  # Silence between packed chunks, so no segment spans two of them
+
+
+@dataclass
+class ChunkRequest:
+    samples: np.ndarray
+    prompt: str  # Text of the session's previous chunk, only used when decoded alone
+    group: Hashable  # Only requests of the same group, e.g. language, are decoded together
+    future: Future = field(default_factory=Future)
+
+
+DecodeOne = Callable[[ChunkRequest], str]
+DecodePacked = Callable[[list[ChunkRequest], int], list[str]]
+
+
+class ChunkBatcher:
+    """Decode the chunks of concurrent sessions sharing a model in one call.
+
+    Whisper encodes a fixed 30s window however short the audio, so a 2s
+    chunk leaves most of the encoder's work unused. Chunks that arrive
+    while the model is busy, or within `window_ms` of each other, are packed
+    into one window separated by silence and decoded together, and each
+    gets back the segments falling in its span. A chunk alone is decoded as
+    before, with its session's prompt.
+
+    Sessions call `transcribe` from their own threads, a dispatcher thread
+    makes the model calls.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        decode_one: DecodeOne,
+        decode_packed: DecodePacked,
+        config: BatchingConfig,
+    ):
+        """Initialize the batcher.
+
+        Args:
+            name: Name of the model, for logs and metrics
+            decode_one: Decodes a single request
+            decode_packed: Decodes requests packed with the given gap in
+                samples between them, returning the text of each
+            config: Batching window and limits, may be replaced at any time
+        """
+        self.name = name
+        self.decode_one = decode_one
+        self.decode_packed = decode_packed
+        self.config = config
+        self._pending: list[ChunkRequest] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._decoding = 0  # Batches and unbatched chunks being decoded
+        self.idle = threading.Event()  # Set while no chunk is queued or being decoded
+        self.idle.set()
+
+    def transcribe(self, request: ChunkRequest) -> str:
+        """Queue a chunk for the next batch and wait for its text."""
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+            self.idle.clear()
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future.result()
+
+    def decode_now(self, request: ChunkRequest) -> str:
+        """Decode a chunk in the calling thread, without batching it, and return its text."""
+        with self._condition:
+            self._decoding += 1
+            self.idle.clear()
+        try:
+            return self.decode_one(request)
+        finally:
+            self._finish_decoding()
+
+    def _finish_decoding(self) -> None:
+        with self._condition:
+            self._decoding -= 1
+            if not self._decoding and not self._pending:
+                self.idle.set()
+
+    def _run(self) -> None:
+        while True:
+            requests = self._next_requests()
+            try:
+                for batch in self._pack(requests):
+                    self._decode(batch)
+            finally:
+                self._finish_decoding()
+
+    def _next_requests(self) -> list[ChunkRequest]:
+        """Wait for chunks, giving the first one `window_ms` to be joined by others."""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = time.monotonic() + self.config.window_ms / 1000
+            while len(self._pending) < self.config.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            requests = self._pending
+            self._pending = []
+            self._decoding += 1
+        return requests
+
+    def _pack(self, requests: list[ChunkRequest]) -> list[list[ChunkRequest]]:
+        """Split requests into batches of one group that fit in a window, oldest first."""
+        gap_samples = self.config.gap_ms * WHISPER_SAMPLE_RATE_HZ // 1000
+        max_samples = self.config.max_batch_audio_ms * WHISPER_SAMPLE_RATE_HZ // 1000
+        batches: list[list[ChunkRequest]] = []
+        open_batches: dict[Hashable, tuple[list[ChunkRequest], int]] = {}  # group -> (batch, samples)
+        for request in requests:
+            batch, samples = open_batches.get(request.group, (None, 0))
+            needed = samples + gap_samples + len(request.samples)
+            if batch is None or len(batch) >= self.config.max_batch_size or needed > max_samples:
+                batch, needed = [], len(request.samples)
+                batches.append(batch)
+            batch.append(request)
+            open_batches[request.group] = (batch, needed)
+        return batches
+
+    def _decode(self, batch: list[ChunkRequest]) -> None:
+        metrics.LOCAL_WHISPER_BATCH_SIZE.observe(len(batch))
+        try:
+            if len(batch) == 1:
+                texts = [self.decode_one(batch[0])]
+            else:
+                gap_samples = self.config.gap_ms * WHISPER_SAMPLE_RATE_HZ // 1000
+                texts = self.decode_packed(batch, gap_samples)
+        except Exception as e:
+            logger.error(f"Error decoding a batch of {len(batch)} chunks with {self.name}: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, text in zip(batch, texts):
+            request.future.set_result(text)
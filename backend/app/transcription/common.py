@@ -5,10 +5,10 @@ from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
+from typing import Callable, Optional
 
 import numpy as np
 from pydantic import BaseModel
-from pydub import AudioSegment
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -38,15 +38,23 @@ class StreamingTranscriptionResult:
 class BaseTranscriber(abc.ABC):
     """Abstract base class defining the interface for all transcribers."""
 
-    def __init__(self, model_checkpoint: str):
+    def __init__(self, model_checkpoint: str, language: Optional[str] = None):
         """Initialize the transcriber.
 
+        Transcribers hold the state of one stream. Models and API clients are
+        shared by all transcribers, so creating one per session is cheap.
+
         Args:
             model_checkpoint: Name/identifier of the model to use
+            language: Language of the audio as an ISO 639-1 or BCP-47 code, e.g.
+                "en" or "en-US", None for the transcriber's default
         """
         self.model_checkpoint = model_checkpoint
+        self.language = language
         self.current_text = ""
         self.last_chunk_text = ""
+        # Called, from any thread, when text already returned was revised in current_text
+        self.on_revision: Optional[Callable[[], None]] = None
 
     @property
     @abc.abstractmethod
@@ -91,8 +99,14 @@ class BaseTranscriber(abc.ABC):
         self.current_text = ""
         self.last_chunk_text = ""
 
+    def resume_stream(self) -> None:
+        """Continue a stream after the client reconnected, keeping the text so far."""
+        pass
+
     def _get_audio_info(self, audio_path: str) -> dict:
         """Get audio file information"""
+        from pydub import AudioSegment
+
         audio = AudioSegment.from_file(audio_path)
 
         info = {
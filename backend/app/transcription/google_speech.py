@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 import queue
@@ -5,6 +6,7 @@ import threading
 import time
 import wave
 from datetime import datetime
+from typing import Optional
 
 import numpy as np
 from app.transcription.common import (
@@ -22,14 +24,15 @@ logger = logging.getLogger(__name__)
 class GoogleSpeechTranscriber(BaseTranscriber):
     """Transcriber using Google Cloud Speech-to-Text API."""
 
-    def __init__(self, model_checkpoint: str):
+    def __init__(self, model_checkpoint: str, language: Optional[str] = None):
         """Initialize the Google Speech transcriber.
 
         Args:
             model_checkpoint: Name/identifier of the model to use
+            language: BCP-47 code of the audio's language, en-US by default
         """
-        super().__init__(model_checkpoint)
-        self.language_code = "en-US"
+        super().__init__(model_checkpoint, language)
+        self.language_code = language or "en-US"
         self.client = self._get_speech_client()
         self.streaming_config = None
         self.is_streaming = False
@@ -50,8 +53,10 @@ class GoogleSpeechTranscriber(BaseTranscriber):
         """Return the transcription method used by this transcriber."""
         return TranscriptionMethod.GOOGLE_SPEECH
 
-    def _get_speech_client(self):
-        """Get or initialize Google Speech client."""
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_speech_client():
+        """Get or initialize the Google Speech client, shared by all sessions."""
         # Check if GOOGLE_APPLICATION_CREDENTIALS environment variable is set
         if not os.environ.get("GOOGLE_APPLICATION_CREDENTIALS"):
             logger.warning(
@@ -120,8 +125,8 @@ class GoogleSpeechTranscriber(BaseTranscriber):
             text = ""
 
         time_spent = time.time() - start_time
-        logger.info(f"Transcribed text: {text}")
-        logger.info(f"Transcription took {time_spent:.2f} seconds")
+        logger.debug(f"Transcribed text: {text}")
+        logger.info(f"Transcribed {len(text)} chars in {time_spent:.2f} seconds")
 
         return TranscriptionResult(
             text=text,
@@ -285,6 +290,17 @@ class GoogleSpeechTranscriber(BaseTranscriber):
                 is_final=True,  # Mark as final since we encountered an error
             )
 
+    def resume_stream(self) -> None:
+        """Restart recognition if it ended while the client was away, keeping the final text.
+
+        Google ends a recognition stream that receives no audio for a while.
+        """
+        if self.is_streaming:
+            return
+        final_result = self.final_result
+        self.start_stream()
+        self.final_result = final_result
+
     def start_stream(self) -> None:
         """Start streaming recognition session."""
         try:
@@ -1,34 +1,235 @@
+import functools
 import logging
+import queue
+import threading
 import time
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 
 import numpy as np
+from app.observability import metrics
+from app.transcription.batching import BatchingConfig, ChunkBatcher, ChunkRequest
 from app.transcription.common import (
     BaseTranscriber,
     StreamingTranscriptionResult,
     TranscriptionMethod,
     TranscriptionResult,
 )
-from pywhispercpp.model import Model as WhisperCppModel
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from pywhispercpp.model import Model as WhisperCppModel
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 WHISPER_CPP_MODEL_PATH = Path("./models/").resolve()
 
+# Segment timestamps are in centiseconds
+SAMPLES_PER_CENTISECOND = WHISPER_SAMPLE_RATE_HZ // 100
+
+# Loaded models are shared by the transcribers of all sessions. A whisper.cpp
+# context is not reentrant, so each model is used by one thread at a time, and
+# its batcher decodes the chunks of concurrent sessions together.
+_models: dict[str, tuple["WhisperCppModel", threading.Lock, ChunkBatcher]] = {}
+_models_lock = threading.Lock()
+
+
+class RefinementConfig(BaseModel):
+    # A fast checkpoint, e.g. "base.en", giving interim text that the configured
+    # model_checkpoint refines in the background. None transcribes with model_checkpoint only.
+    draft_model_checkpoint: Optional[str] = None
+    max_pending_chunks: int = 30  # Chunks waiting for refinement per session, later ones stay drafts
+    final_timeout_sec: float = 30.0  # How long the final transcript waits for the remaining refinements
+
+
+@dataclass
+class DraftSegment:
+    text: str
+    samples: Optional[np.ndarray]  # Audio of the chunk while it waits for refinement
+
+
+class Refiner:
+    """Background thread refining drafts one at a time, whenever no live chunk is being decoded.
+
+    Refinements yield to the chunks of every session, on any model, so they
+    use the CPU left idle by live transcription.
+    """
+
+    def __init__(self):
+        self._jobs: queue.SimpleQueue[Callable[[], None]] = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, job: Callable[[], None]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="refiner", daemon=True)
+                self._thread.start()
+        self._jobs.put(job)
+
+    def _run(self) -> None:
+        while True:
+            job = self._jobs.get()
+            for _, _, batcher in list(_models.values()):
+                batcher.idle.wait()
+            try:
+                job()
+            except Exception as e:
+                logger.error(f"Error refining a draft: {e}")
+
+
+_refiner = Refiner()
+
+
+def _language_params(language: Optional[str]) -> dict:
+    # Always given, as the model keeps the last call's params for the next session
+    return {"language": language or "auto"}
+
+
+def _decode(batcher: ChunkBatcher, request: ChunkRequest) -> str:
+    """Decode a chunk with the batcher's model, batched with other sessions' if enabled."""
+    if batcher.config.enabled:
+        return batcher.transcribe(request)
+    return batcher.decode_now(request)
+
+
+def _decode_chunk(model: "WhisperCppModel", model_lock: threading.Lock, request: ChunkRequest) -> str:
+    """Decode one chunk, prompted with the text of its session's previous chunk."""
+    with model_lock:
+        segments = model.transcribe(
+            request.samples,
+            n_processors=1,
+            initial_prompt=request.prompt,
+            single_segment=True,
+            print_realtime=False,
+            print_progress=False,
+            print_timestamps=False,
+            **_language_params(request.group),
+        )
+    return " ".join([segment.text for segment in segments])
+
+
+def _decode_packed(
+    model: "WhisperCppModel", model_lock: threading.Lock, requests: list[ChunkRequest], gap_samples: int
+) -> list[str]:
+    """Decode chunks joined by silence in one call, giving each chunk the segments that overlap it most."""
+    gap = np.zeros(gap_samples, dtype=np.float32)
+    parts: list[np.ndarray] = []
+    spans: list[tuple[int, int]] = []
+    offset = 0
+    for request in requests:
+        if parts:
+            parts.append(gap)
+            offset += gap_samples
+        parts.append(request.samples.astype(np.float32, copy=False))
+        spans.append((offset, offset + len(request.samples)))
+        offset += len(request.samples)
+
+    with model_lock:
+        # Prompts belong to single sessions, so packed chunks go without
+        segments = model.transcribe(
+            np.concatenate(parts),
+            n_processors=1,
+            initial_prompt="",
+            single_segment=False,
+            print_realtime=False,
+            print_progress=False,
+            print_timestamps=False,
+            **_language_params(requests[0].group),
+        )
+
+    texts: list[list[str]] = [[] for _ in requests]
+    for segment in segments:
+        start, end = segment.t0 * SAMPLES_PER_CENTISECOND, segment.t1 * SAMPLES_PER_CENTISECOND
+        overlaps = [min(end, span_end) - max(start, span_start) for span_start, span_end in spans]
+        best = int(np.argmax(overlaps))
+        # A segment within a gap was made up from the silence
+        if overlaps[best] > 0:
+            texts[best].append(segment.text)
+    return [" ".join(text) for text in texts]
+
 
 class LocalWhisperTranscriber(BaseTranscriber):
     """Transcriber using local Whisper model via whisper.cpp."""
 
-    def __init__(self, model_checkpoint: str):
-        super().__init__(model_checkpoint)
-        self.local_model = self._get_whisper_cpp_model(model_checkpoint)
+    def __init__(
+        self,
+        model_checkpoint: str,
+        language: Optional[str] = None,
+        batching: Optional[BatchingConfig] = None,
+        refinement: Optional[RefinementConfig] = None,
+    ):
+        """Initialize the transcriber, loading its models on first use.
+
+        Args:
+            model_checkpoint: Name of the GGML model, e.g. 'medium.en'
+            language: Language of the audio, None to let Whisper detect it
+            batching: How chunks of concurrent sessions are decoded together,
+                applied to every session sharing the model
+            refinement: Draft model transcribing chunks first, None or
+                without a draft checkpoint to use model_checkpoint only
+        """
+        super().__init__(model_checkpoint, language)
+        self.local_model, self.model_lock, self.batcher = self._load_model(model_checkpoint, batching)
+        self.refinement = refinement or RefinementConfig()
+        self.draft_batcher: Optional[ChunkBatcher] = None
+        if self.refinement.draft_model_checkpoint:
+            _, _, self.draft_batcher = self._load_model(self.refinement.draft_model_checkpoint, batching)
+        # whisper.cpp takes ISO 639-1 codes
+        self.whisper_language = language.split("-")[0].lower() if language else None
+        self.language_params = _language_params(self.whisper_language)
+
+        # Two-tier state: the text of each chunk, draft until refined
+        self.segments: list[DraftSegment] = []
+        self._text = ""  # current_text as last joined from the segments
+        self._refining = 0  # Segments of this stream queued for refinement
+        self._generation = 0  # Incremented by each new stream, so refinements of a previous one are skipped
+        self._lock = threading.Lock()
+        self._refined = threading.Condition(self._lock)
 
     @property
     def method(self) -> TranscriptionMethod:
         return TranscriptionMethod.LOCAL_WHISPER
 
+    def _load_model(
+        self, model_checkpoint: str, batching: Optional[BatchingConfig]
+    ) -> tuple["WhisperCppModel", threading.Lock, ChunkBatcher]:
+        """Return the shared model of a checkpoint with its lock and batcher, loading it on first use."""
+        with _models_lock:
+            if model_checkpoint not in _models:
+                model, model_lock = self._get_whisper_cpp_model(model_checkpoint), threading.Lock()
+                batcher = ChunkBatcher(
+                    model_checkpoint,
+                    functools.partial(_decode_chunk, model, model_lock),
+                    functools.partial(_decode_packed, model, model_lock),
+                    batching or BatchingConfig(),
+                )
+                _models[model_checkpoint] = (model, model_lock, batcher)
+            loaded = _models[model_checkpoint]
+        if batching is not None:
+            loaded[2].config = batching
+        return loaded
+
+    def start_stream(self) -> None:
+        super().start_stream()
+        self._reset_segments()
+
+    def stop_stream(self) -> None:
+        super().stop_stream()
+        self._reset_segments()
+
+    def _reset_segments(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.segments = []
+            self._text = ""
+            self._refining = 0
+            self._refined.notify_all()
+
     def _download_whisper_cpp_model(self, model_checkpoint: str):
         """Download Whisper model in the GGML format.
 
@@ -48,7 +249,7 @@ class LocalWhisperTranscriber(BaseTranscriber):
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"Failed to download model: {e}")
 
-    def _get_whisper_cpp_model(self, model_checkpoint: str) -> WhisperCppModel:
+    def _get_whisper_cpp_model(self, model_checkpoint: str) -> "WhisperCppModel":
         """Get or initialize local Whisper model.
 
         Downloads the model if it doesn't exist locally.
@@ -62,6 +263,9 @@ class LocalWhisperTranscriber(BaseTranscriber):
             # Download and convert the model
             self._download_whisper_cpp_model(model_checkpoint)
 
+        # Imported with the first model, so that starting the server does not wait for it
+        from pywhispercpp.model import Model as WhisperCppModel
+
         logger.info(f"Loading local Whisper model from {model_path}")
         return WhisperCppModel(str(model_path))
 
@@ -69,12 +273,13 @@ class LocalWhisperTranscriber(BaseTranscriber):
         """Transcribe audio file using local Whisper model."""
         start_time = time.time()
 
-        segments = self.local_model.transcribe(audio_path, n_processors=1)
+        with self.model_lock:
+            segments = self.local_model.transcribe(audio_path, n_processors=1, **self.language_params)
         text = " ".join([segment.text for segment in segments])
 
         time_spent = time.time() - start_time
-        logger.info(f"Transcribed text: {text}")
-        logger.info(f"Transcription took {time_spent:.2f} seconds")
+        logger.debug(f"Transcribed text: {text}")
+        logger.info(f"Transcribed {len(text)} chars in {time_spent:.2f} seconds")
 
         return TranscriptionResult(
             text=text,
@@ -88,17 +293,12 @@ class LocalWhisperTranscriber(BaseTranscriber):
     ) -> StreamingTranscriptionResult:
         """Process a chunk of audio data using local Whisper model."""
         try:
+            if self.draft_batcher is not None:
+                return self._transcribe_two_tier(chunk, is_final)
+
             # Use last chunk's text as initial prompt if available
-            segments = self.local_model.transcribe(
-                chunk,
-                n_processors=1,
-                initial_prompt=self.last_chunk_text,
-                single_segment=True,
-                print_realtime=False,
-                print_progress=False,
-                print_timestamps=False,
-            )
-            text = " ".join([segment.text for segment in segments])
+            request = ChunkRequest(chunk, self.last_chunk_text, self.whisper_language)
+            text = _decode(self.batcher, request)
 
             # Store this chunk's text for next iteration
             self.last_chunk_text = text.strip()
@@ -120,3 +320,66 @@ class LocalWhisperTranscriber(BaseTranscriber):
                 text=self.current_text,
                 is_final=True,  # Mark as final since we encountered an error
             )
+
+    def _transcribe_two_tier(self, chunk: np.ndarray, is_final: bool) -> StreamingTranscriptionResult:
+        """Transcribe a chunk with the draft model and queue it for refinement by the configured one."""
+        request = ChunkRequest(chunk, self.last_chunk_text, self.whisper_language)
+        text = _decode(self.draft_batcher, request).strip()
+        self.last_chunk_text = text
+
+        with self._lock:
+            if self.current_text != self._text:
+                # Another transcriber continued the stream meanwhile, its text is kept as it is
+                self.segments = [DraftSegment(self.current_text, None)] if self.current_text else []
+            segment = DraftSegment(text, None)
+            self.segments.append(segment)
+            self._join_segments()
+
+            if len(chunk) and self._refining < self.refinement.max_pending_chunks:
+                segment.samples = chunk
+                self._refining += 1
+                _refiner.submit(functools.partial(self._refine, segment, self._generation))
+            elif len(chunk):
+                metrics.LOCAL_WHISPER_REFINEMENTS.labels("skipped").inc()
+
+            if is_final and not self._refined.wait_for(
+                lambda: self._refining == 0, self.refinement.final_timeout_sec
+            ):
+                logger.warning(f"Sending the final transcript with {self._refining} chunks not refined")
+            return StreamingTranscriptionResult(text=self.current_text, is_final=is_final)
+
+    def _refine(self, segment: DraftSegment, generation: int) -> None:
+        """Decode a drafted chunk again with the configured model, replacing its text."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            index = next((i for i, s in enumerate(self.segments) if s is segment), None)
+            prompt = self.segments[index - 1].text if index else ""
+
+        text = None
+        if index is not None:
+            try:
+                text = _decode(self.batcher, ChunkRequest(segment.samples, prompt, self.whisper_language)).strip()
+            except Exception as e:
+                logger.error(f"Error refining a chunk with local Whisper: {e}")
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._refining -= 1
+            segment.samples = None
+            changed = False
+            if text is not None and text != segment.text:
+                segment.text = text
+                changed = self._join_segments()
+            metrics.LOCAL_WHISPER_REFINEMENTS.labels("changed" if changed else "unchanged").inc()
+            self._refined.notify_all()
+        if changed and self.on_revision is not None:
+            self.on_revision()
+
+    def _join_segments(self) -> bool:
+        """Rebuild current_text from the segments. Returns whether it changed."""
+        text = " ".join(segment.text for segment in self.segments if segment.text)
+        changed = text != self._text
+        self.current_text = self._text = text
+        return changed
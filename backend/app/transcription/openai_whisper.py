@@ -1,6 +1,8 @@
+import functools
 import logging
 import time
 from datetime import datetime
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
 from app.transcription.common import (
@@ -10,7 +12,9 @@ from app.transcription.common import (
     TranscriptionResult,
 )
 from app.transcription.utils import prepare_openai_audio
-from openai import OpenAI
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -19,16 +23,23 @@ logger = logging.getLogger(__name__)
 class OpenAIWhisperTranscriber(BaseTranscriber):
     """Transcriber using OpenAI's Whisper API."""
 
-    def __init__(self, model_checkpoint: str):
-        super().__init__(model_checkpoint)
+    def __init__(self, model_checkpoint: str, language: Optional[str] = None):
+        super().__init__(model_checkpoint, language)
         self.openai_client = self._get_openai_client()
+        # The API takes ISO 639-1 codes
+        self.language_params = {"language": language.split("-")[0].lower()} if language else {}
 
     @property
     def method(self) -> TranscriptionMethod:
         return TranscriptionMethod.OPENAI_WHISPER
 
-    def _get_openai_client(self) -> OpenAI:
-        """Get or initialize OpenAI client."""
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_openai_client() -> "OpenAI":
+        """Get or initialize the OpenAI client, shared by all sessions."""
+        # Imported on first use, the openai package is slow to import
+        from openai import OpenAI
+
         return OpenAI()
 
     def transcribe_file(self, audio_path: str) -> TranscriptionResult:
@@ -37,13 +48,13 @@ class OpenAIWhisperTranscriber(BaseTranscriber):
 
         with open(audio_path, "rb") as audio_file:
             response = self.openai_client.audio.transcriptions.create(
-                model="whisper-1", file=audio_file
+                model="whisper-1", file=audio_file, **self.language_params
             )
             text = response.text
 
         time_spent = time.time() - start_time
-        logger.info(f"Transcribed text: {text}")
-        logger.info(f"Transcription took {time_spent:.2f} seconds")
+        logger.debug(f"Transcribed text: {text}")
+        logger.info(f"Transcribed {len(text)} chars in {time_spent:.2f} seconds")
 
         return TranscriptionResult(
             text=text,
@@ -67,7 +78,7 @@ class OpenAIWhisperTranscriber(BaseTranscriber):
             try:
                 # Use OpenAI API
                 with open(temp_path, "rb") as audio_file:
-                    kwargs = {"model": "whisper-1", "file": audio_file}
+                    kwargs = {"model": "whisper-1", "file": audio_file, **self.language_params}
                     response = self.openai_client.audio.transcriptions.create(**kwargs)
                     text = response.text
             finally:
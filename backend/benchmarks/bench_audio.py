@@ -0,0 +1,360 @@
+"""Microbenchmarks of the per-message audio hot path, with regression tracking.
+
+Every case replays a representative workload (frame size x session length)
+and records throughput, as seconds of audio processed per wall second, and
+the peak memory allocated while doing so. Peak bytes are tracked rather than
+a count of allocations, which tracemalloc does not keep: it only sees the
+blocks alive at a time, and buffer growth shows in the peak.
+
+Each repeat times the case next to a fixed calibration workload, and the
+median of their ratios is compared against the stored baseline, with a
+tolerance widened by the spread measured across the repeats. Throughput is
+only compared against baselines recorded on the same machine, as calibration
+does not carry them to another one; allocations are compared everywhere:
+
+    python -m benchmarks.bench_audio                    # compare against baselines.json
+    python -m benchmarks.bench_audio --update-baseline  # record new baselines
+    python -m benchmarks.bench_audio -k add_samples     # run matching cases only
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import queue
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from app.main import adapt_audio_format
+from app.observability import metrics
+from app.transcription.common import TranscriptionMethod
+from app.transcription.google_speech import GoogleSpeechTranscriber
+from app.transcription.utils import WHISPER_SAMPLE_RATE_HZ, AudioBuffer, prepare_openai_audio
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+FRAME_SIZES = (128, 4096)  # AudioWorklet render quantum, and a large client-side buffer
+SESSION_SECONDS = (10, 120)
+CHUNK_SIZE_MS = 2000
+OVERLAP_MS = 200
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    audio_sec: float  # Seconds of audio processed by one call of `run`
+    setup: Callable[[], Callable[[], None]]  # Returns a fresh workload
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    audio_x_realtime: float  # Audio seconds processed per wall second, median of the repeats
+    peak_alloc_kb: float  # Peak memory allocated during one run
+    relative_throughput: float  # Throughput in units of the calibration workload, median of the repeats
+    relative_noise: float  # Median absolute deviation of the repeats, as a fraction of the median
+
+
+def frames(frame_samples: int, session_sec: float) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, int(session_sec * WHISPER_SAMPLE_RATE_HZ)).astype(np.float32)
+    return [audio[i : i + frame_samples] for i in range(0, len(audio), frame_samples)]
+
+
+def add_samples_case(frame_samples: int, session_sec: float) -> BenchmarkCase:
+    session = frames(frame_samples, session_sec)
+
+    def setup():
+        buffer = AudioBuffer(CHUNK_SIZE_MS, OVERLAP_MS, WHISPER_SAMPLE_RATE_HZ)
+
+        def run():
+            for frame in session:
+                buffer.add_samples(frame)
+            buffer.get_remaining_samples()
+
+        return run
+
+    return BenchmarkCase(f"add_samples[frame={frame_samples},session={session_sec}s]", session_sec, setup)
+
+
+def frombuffer_case(frame_samples: int, session_sec: float) -> BenchmarkCase:
+    payloads = [frame.tobytes() for frame in frames(frame_samples, session_sec)]
+
+    def setup():
+        def run():
+            for payload in payloads:
+                np.frombuffer(payload, dtype=np.float32)
+
+        return run
+
+    return BenchmarkCase(f"frombuffer[frame={frame_samples},session={session_sec}s]", session_sec, setup)
+
+
+def adapt_audio_format_case(method: TranscriptionMethod, frame_samples: int, session_sec: float) -> BenchmarkCase:
+    session = frames(frame_samples, session_sec)
+
+    def setup():
+        def run():
+            for frame in session:
+                adapt_audio_format(frame, method)
+
+        return run
+
+    return BenchmarkCase(
+        f"adapt_audio_format[{method.value},frame={frame_samples},session={session_sec}s]", session_sec, setup
+    )
+
+
+def prepare_openai_audio_case() -> BenchmarkCase:
+    chunk = frames(CHUNK_SIZE_MS * WHISPER_SAMPLE_RATE_HZ // 1000, CHUNK_SIZE_MS / 1000)[0]
+
+    def setup():
+        def run():
+            path = prepare_openai_audio(chunk)
+            path.unlink(missing_ok=True)
+
+        return run
+
+    return BenchmarkCase(f"prepare_openai_audio[chunk={CHUNK_SIZE_MS}ms]", CHUNK_SIZE_MS / 1000, setup)
+
+
+def audio_generator_case(dtype: type, frame_samples: int, session_sec: float) -> BenchmarkCase:
+    session = frames(frame_samples, session_sec)
+    if dtype == np.int16:
+        session = [(frame * 32768.0).astype(np.int16) for frame in session]
+
+    def setup():
+        # Only the queue and the streaming flag are used by the generator
+        transcriber = GoogleSpeechTranscriber.__new__(GoogleSpeechTranscriber)
+        transcriber.is_streaming = True
+        transcriber.audio_queue = queue.Queue()
+        for frame in session:
+            transcriber.audio_queue.put(frame)
+        transcriber.audio_queue.put(None)
+
+        def run():
+            for _ in transcriber._audio_generator():
+                pass
+
+        return run
+
+    return BenchmarkCase(
+        f"google_audio_generator[{np.dtype(dtype).name},frame={frame_samples},session={session_sec}s]",
+        session_sec,
+        setup,
+    )
+
+
+def metrics_overhead_case(frame_samples: int, session_sec: float) -> BenchmarkCase:
+    """Metric updates made per binary websocket message on the buffered path."""
+    n_frames = len(frames(frame_samples, session_sec))
+
+    def setup():
+        def run():
+            for _ in range(n_frames):
+                start = time.perf_counter()
+                metrics.BYTES_IN.inc(frame_samples * 4)
+                metrics.MESSAGES_IN.inc()
+                metrics.STAGE["receive"].observe(time.perf_counter() - start)
+                metrics.AUDIO_BUFFER_DEPTH.inc(frame_samples)
+                metrics.STAGE["buffer"].observe(time.perf_counter() - start)
+
+        return run
+
+    return BenchmarkCase(f"metrics_overhead[frame={frame_samples},session={session_sec}s]", session_sec, setup)
+
+
+def all_cases() -> list[BenchmarkCase]:
+    cases = []
+    for frame_samples in FRAME_SIZES:
+        for session_sec in SESSION_SECONDS:
+            cases.append(add_samples_case(frame_samples, session_sec))
+        cases.append(frombuffer_case(frame_samples, SESSION_SECONDS[0]))
+        for method in (TranscriptionMethod.OPENAI_WHISPER, TranscriptionMethod.GOOGLE_SPEECH):
+            cases.append(adapt_audio_format_case(method, frame_samples, SESSION_SECONDS[0]))
+        for dtype in (np.int16, np.float32):
+            cases.append(audio_generator_case(dtype, frame_samples, SESSION_SECONDS[0]))
+    cases.append(metrics_overhead_case(FRAME_SIZES[0], SESSION_SECONDS[0]))
+    cases.append(prepare_openai_audio_case())
+    return cases
+
+
+def calibration_case() -> BenchmarkCase:
+    """Fixed mix of interpreter and small-array work, similar to the hot path."""
+    payloads = [frame.tobytes() for frame in frames(128, 1)]
+
+    def setup():
+        def run():
+            buffer: list[float] = []
+            for payload in payloads:
+                samples = np.frombuffer(payload, dtype=np.float32)
+                buffer.extend((samples * 0.5).tolist())
+            np.array(buffer, dtype=np.float32)
+
+        return run
+
+    return BenchmarkCase("calibration", 1, setup)
+
+
+def mean_time_sec(case: BenchmarkCase, min_time_sec: float) -> float:
+    loops, elapsed = 0, 0.0
+    while elapsed < min_time_sec or loops == 0:
+        run = case.setup()
+        gc.disable()
+        start = time.perf_counter()
+        run()
+        elapsed += time.perf_counter() - start
+        gc.enable()
+        loops += 1
+    return elapsed / loops
+
+
+def measure(case: BenchmarkCase, repeats: int, min_time_sec: float) -> BenchmarkResult:
+    """Time a case next to the calibration workload, and trace the case's peak allocation."""
+    calibration = calibration_case()
+    case_secs, ratios = [], []
+    for _ in range(repeats):
+        # Timed back to back, so both see the same load on the machine
+        case_sec = mean_time_sec(case, min_time_sec)
+        calibration_sec = mean_time_sec(calibration, min_time_sec / 2)
+        case_secs.append(case_sec)
+        ratios.append(calibration_sec / case_sec)
+    relative_throughput = statistics.median(ratios)
+    deviation = statistics.median(abs(ratio - relative_throughput) for ratio in ratios)
+
+    run = case.setup()
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=case.name,
+        audio_x_realtime=case.audio_sec / statistics.median(case_secs),
+        peak_alloc_kb=(peak - before) / 1024,
+        relative_throughput=relative_throughput,
+        relative_noise=deviation / relative_throughput,
+    )
+
+
+def compare(
+    result: BenchmarkResult,
+    baseline: dict,
+    throughput_threshold: float,
+    noise_factor: float,
+    alloc_threshold: float,
+    alloc_slack_kb: float,
+    same_machine: bool,
+) -> list[str]:
+    """Describe how a result regresses against its baseline, if it does."""
+    regressions = []
+    noise = max(result.relative_noise, baseline.get("relative_noise", 0.0))
+    min_throughput = baseline["relative_throughput"] * max(0.0, 1 - throughput_threshold - noise_factor * noise)
+    if same_machine and result.relative_throughput < min_throughput:
+        regressions.append(
+            f"relative throughput {result.relative_throughput:.3g} < {min_throughput:.3g} "
+            f"(baseline {baseline['relative_throughput']:.3g})"
+        )
+    max_alloc = baseline["peak_alloc_kb"] * (1 + alloc_threshold) + alloc_slack_kb
+    if result.peak_alloc_kb > max_alloc:
+        regressions.append(
+            f"peak allocation {result.peak_alloc_kb:.0f}KB > {max_alloc:.0f}KB "
+            f"(baseline {baseline['peak_alloc_kb']:.0f}KB)"
+        )
+    return regressions
+
+
+def cpu_model() -> str:
+    """Name of the CPU, which platform.processor() leaves empty on Linux."""
+    cpuinfo = Path("/proc/cpuinfo")
+    if cpuinfo.exists():
+        for line in cpuinfo.read_text().splitlines():
+            if line.startswith("model name"):
+                return line.split(":", 1)[1].strip()
+    return platform.processor()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="Only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time-sec", type=float, default=0.2, help="Minimum timed duration per repeat")
+    parser.add_argument("--throughput-threshold", type=float, default=0.2, help="Tolerated relative throughput drop")
+    parser.add_argument(
+        "--noise-factor", type=float, default=3.0, help="Tolerance added per unit of measured relative noise"
+    )
+    parser.add_argument("--alloc-threshold", type=float, default=0.25, help="Tolerated peak allocation growth")
+    parser.add_argument("--alloc-slack-kb", type=float, default=16.0, help="Absolute allocation noise allowance")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"cases": {}}
+    machine = f"{platform.machine()} {cpu_model()} Python {platform.python_version()}"
+    same_machine = baselines.get("machine") == machine
+    if baselines["cases"] and not same_machine and not args.update_baseline:
+        print(
+            f"Baselines were recorded on {baselines.get('machine')}, not {machine}: only allocations are "
+            "compared, record baselines here with --update-baseline to compare throughput"
+        )
+
+    results, failures = [], 0
+    for case in all_cases():
+        if args.filter not in case.name:
+            continue
+        result = measure(case, args.repeats, args.min_time_sec)
+        results.append(result)
+
+        baseline = baselines["cases"].get(case.name)
+        regressions = [] if baseline is None or args.update_baseline else compare(
+            result,
+            baseline,
+            args.throughput_threshold,
+            args.noise_factor,
+            args.alloc_threshold,
+            args.alloc_slack_kb,
+            same_machine,
+        )
+        status = "NEW" if baseline is None else ("FAIL" if regressions else "ok")
+        failures += bool(regressions)
+        print(
+            f"{status:4} {case.name:<70} {result.audio_x_realtime:>10.0f}x realtime "
+            f"{result.relative_throughput:>8.3g} rel ~{result.relative_noise:>5.1%} {result.peak_alloc_kb:>9.1f}KB"
+        )
+        for regression in regressions:
+            print(f"     {regression}")
+
+    if args.update_baseline:
+        baselines["machine"] = machine
+        baselines["numpy"] = np.__version__
+        baselines["cases"].update({result.name: asdict(result) for result in results})
+        for result in baselines["cases"].values():
+            result.pop("name", None)
+        args.baseline.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Baselines written to {args.baseline}")
+        return 0
+
+    if failures:
+        print(f"{failures} benchmark(s) regressed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
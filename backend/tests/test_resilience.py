@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from app import rhetoric_fact_analyzer
+from app.analysis.resilience import (
+    CircuitBreaker,
+    CircuitState,
+    ResilienceMetrics,
+    RetryPolicy,
+    call_with_retries,
+)
+
+
+def open_breaker() -> CircuitBreaker:
+    """A breaker that opened after one failure and is due for a probe."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_sec=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    return breaker
+
+
+def test_cancelled_half_open_probe_lets_next_call_probe():
+    breaker = open_breaker()
+
+    async def run():
+        started = asyncio.Event()
+
+        async def hanging_attempt(attempt_number):
+            started.set()
+            await asyncio.Event().wait()
+
+        assert breaker.allow_request()
+        assert breaker.state == CircuitState.HALF_OPEN
+        probe = asyncio.create_task(
+            call_with_retries("probe", hanging_attempt, RetryPolicy(), breaker, ResilienceMetrics())
+        )
+        await started.wait()
+        # Rejected while the probe is in flight
+        assert not breaker.allow_request()
+
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(run())
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_outcome_closes_or_reopens():
+    breaker = open_breaker()
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+
+    breaker = open_breaker()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_llm_calls_without_a_call_keeps_the_probe_free(monkeypatch):
+    breaker = open_breaker()
+    monkeypatch.setattr(rhetoric_fact_analyzer, "circuit_breaker", breaker)
+
+    def failing_client():
+        raise RuntimeError("no API key")
+
+    # Nothing to analyze: returns before any call
+    asyncio.run(rhetoric_fact_analyzer.llm_calls("  ", sheddable=True))
+    assert breaker.allow_request()
+    breaker.release_probe()
+
+    # The client cannot be created: raises before any call
+    monkeypatch.setattr(rhetoric_fact_analyzer, "get_client", failing_client)
+    with pytest.raises(RuntimeError):
+        asyncio.run(rhetoric_fact_analyzer.llm_calls("Some claim.", sheddable=True))
+    assert breaker.allow_request()
@@ -0,0 +1,288 @@
+"""Local stand-in for the OpenAI API used in offline performance testing.
+
+Serves the chat-completions endpoint (structured outputs, streamed or not)
+and the audio-transcriptions endpoint with configurable latency, error and
+refusal rates. Point the backend at it through the environment variables the
+OpenAI SDK already reads:
+
+    python -m tools.fake_openai_server --port 8001 --latency-ms 800
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+import uvicorn
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRANSCRIPTS = [
+    "Gang violence is not only a big threat to life and security.",
+    "Last year, Europol identified 821 high-risk criminal networks active in the EU.",
+    "Nearly 90 % of them have infiltrated the legal economy.",
+    "We need to follow the money to get to those who are behind the crimes.",
+    "Where is the crisis commission that we have asked for?",
+]
+SENTENCE_PATTERN = re.compile(r"[^.!?]+[.!?]")
+FILLER_WORDS = ["Pathos", "Ethos", "Logos", "hyperbole", "repetition", "strawman", "ad hominem"]
+
+
+@dataclass
+class FakeServerConfig:
+    latency_dist: Literal["fixed", "uniform", "normal", "lognormal"] = "lognormal"
+    latency_ms: float = 800.0  # Mean time until the full response (or first token)
+    latency_jitter_ms: float = 300.0  # Spread of the latency distribution
+    token_delay_ms: float = 15.0  # Delay between streamed chunks
+    error_rate: float = 0.0  # Share of requests answered with a 500 or 429
+    refusal_rate: float = 0.0  # Share of chat completions answered with a refusal
+    mode: Literal["canned", "echo"] = "echo"  # Quote the prompt or use canned text
+    items_per_array: tuple[int, int] = (1, 3)
+    transcripts: list[str] = field(default_factory=lambda: list(DEFAULT_TRANSCRIPTS))
+    seed: Optional[int] = None
+
+
+def sample_latency_sec(config: FakeServerConfig, rng: random.Random) -> float:
+    mean, jitter = config.latency_ms, config.latency_jitter_ms
+    if config.latency_dist == "fixed":
+        latency = mean
+    elif config.latency_dist == "uniform":
+        latency = rng.uniform(mean - jitter, mean + jitter)
+    elif config.latency_dist == "normal":
+        latency = rng.gauss(mean, jitter)
+    else:
+        # Lognormal with the requested mean and standard deviation
+        if mean <= 0:
+            return 0.0
+        sigma2 = math.log(1 + (jitter / mean) ** 2)
+        latency = rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+    return max(0.0, latency) / 1000
+
+
+class FakeContent:
+    """Generate JSON that satisfies a structured-output schema."""
+
+    def __init__(self, config: FakeServerConfig, rng: random.Random, transcript: str):
+        self.config = config
+        self.rng = rng
+        sentences = [s.strip() for s in SENTENCE_PATTERN.findall(transcript) if s.strip()]
+        self.quotes = sentences if config.mode == "echo" and sentences else config.transcripts
+
+    def generate(self, schema: dict, defs: dict, name: str = "") -> Any:
+        if "$ref" in schema:
+            return self.generate(defs[schema["$ref"].split("/")[-1]], defs, name)
+
+        schema_type = schema.get("type")
+        if schema_type == "object":
+            return {
+                key: self.generate(value, defs, key)
+                for key, value in schema.get("properties", {}).items()
+            }
+        if schema_type == "array":
+            low, high = self.config.items_per_array
+            return [self.generate(schema["items"], defs, name) for _ in range(self.rng.randint(low, high))]
+        if schema_type in ("number", "integer"):
+            return self.rng.randint(0, 100)
+        if schema_type == "boolean":
+            return self.rng.random() < 0.5
+        return self._string(name)
+
+    def _string(self, name: str) -> str:
+        if name == "quote":
+            return self.rng.choice(self.quotes)
+        if name == "url":
+            return f"https://example.org/source/{self.rng.randint(1, 10_000)}"
+        if name == "source":
+            return self.rng.choice(["Europol", "Eurostat", "Reuters", "Nature"])
+        if name == "argument_map":
+            return "graph TD\n  C[Conclusion] --> P1[Premise]\n  O[Objection] -.-> C"
+        return self.rng.choice(FILLER_WORDS)
+
+
+def count_words(text: str) -> int:
+    return max(1, len(text.split()))
+
+
+def create_app(config: FakeServerConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI server")
+    rng = random.Random(config.seed)
+    stats = {"chat_completions": 0, "transcriptions": 0, "errors": 0, "refusals": 0}
+
+    def maybe_error() -> Optional[JSONResponse]:
+        if rng.random() >= config.error_rate:
+            return None
+        stats["errors"] += 1
+        status = rng.choice([500, 429])
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": "Injected fake error", "type": "server_error", "code": status}},
+        )
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["chat_completions"] += 1
+        model = body.get("model", "gpt-4o-mini")
+        messages = body.get("messages", [])
+        prompt_tokens = count_words(" ".join(str(message.get("content", "")) for message in messages))
+        # Echoed quotes come from the transcript, i.e. the last user message
+        transcript = next(
+            (str(message.get("content", "")) for message in reversed(messages) if message.get("role") == "user"),
+            "",
+        )
+
+        await asyncio.sleep(sample_latency_sec(config, rng))
+        error = maybe_error()
+        if error is not None:
+            return error
+
+        refusal, content = None, None
+        if rng.random() < config.refusal_rate:
+            stats["refusals"] += 1
+            refusal = "I'm sorry, I can't help with that request."
+        else:
+            response_format = body.get("response_format") or {}
+            schema = response_format.get("json_schema", {}).get("schema")
+            if schema:
+                generated = FakeContent(config, rng, transcript).generate(schema, schema.get("$defs", {}))
+                content = json.dumps(generated)
+            else:
+                content = rng.choice(config.transcripts)
+
+        completion_tokens = count_words(refusal or content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "refusal": refusal},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            }
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def stream_chunks():
+            def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [] if usage else [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}
+                    ],
+                }
+                if usage:
+                    payload["usage"] = usage
+                return f"data: {json.dumps(payload)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            text = refusal or content
+            key = "refusal" if refusal else "content"
+            # Split into word-sized pieces, roughly one token each
+            for piece in re.findall(r"\S+\s*|\s+", text):
+                await asyncio.sleep(config.token_delay_ms / 1000)
+                yield chunk({key: piece})
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield chunk({}, usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream_chunks(), media_type="text/event-stream")
+
+    @app.post("/v1/audio/transcriptions")
+    async def audio_transcriptions(
+        file: UploadFile = File(...),
+        model: str = Form("whisper-1"),
+        response_format: str = Form("json"),
+    ):
+        audio = await file.read()
+        stats["transcriptions"] += 1
+
+        await asyncio.sleep(sample_latency_sec(config, rng))
+        error = maybe_error()
+        if error is not None:
+            return error
+
+        if config.mode == "echo":
+            text = f"Received {len(audio)} bytes of audio."
+        else:
+            text = config.transcripts[(stats["transcriptions"] - 1) % len(config.transcripts)]
+
+        if response_format == "text":
+            return JSONResponse(content=text)
+        return {"text": text}
+
+    return app
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "normal", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=300.0)
+    parser.add_argument("--token-delay-ms", type=float, default=15.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--refusal-rate", type=float, default=0.0)
+    parser.add_argument("--mode", choices=["canned", "echo"], default="echo")
+    parser.add_argument("--items", type=int, nargs=2, default=(1, 3), metavar=("MIN", "MAX"))
+    parser.add_argument("--transcripts", type=Path, help="Text file with one canned transcript per line")
+    parser.add_argument("--seed", type=int)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = FakeServerConfig(
+        latency_dist=args.latency_dist,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        token_delay_ms=args.token_delay_ms,
+        error_rate=args.error_rate,
+        refusal_rate=args.refusal_rate,
+        mode=args.mode,
+        items_per_array=tuple(args.items),
+        seed=args.seed,
+    )
+    if args.transcripts:
+        config.transcripts = [line.strip() for line in args.transcripts.read_text().splitlines() if line.strip()]
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Starting fake OpenAI server with {config}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Measure how long importing the backend takes, and what it spends it on.
+
+Imports the module in fresh interpreters with `python -X importtime`, reports
+the median total and the slowest imports, and lists the SDKs that should
+only be imported on first use but were imported anyway:
+
+    python -m tools.import_time --repeat 5 --top 15
+
+Run it from the backend directory, so `app` is importable.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Imported by the transcribers and analyzers on first use, not at start-up
+LAZY_MODULES = ("openai", "google.cloud.speech", "pywhispercpp", "pydub")
+
+
+@dataclass
+class ImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 0 for modules imported by the measured one
+
+
+def measure(module: str) -> tuple[list[ImportTime], list[str]]:
+    """Import `module` in a new interpreter.
+
+    Returns:
+        The import time of every module, in import order, and which of
+        LAZY_MODULES were imported
+    """
+    check = f"import sys; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}; {check}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.getcwd()},
+        check=True,
+    )
+    times = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append(ImportTime(name.strip(), int(self_us), int(cumulative_us), depth))
+    output = completed.stdout.strip().splitlines()
+    lazy = [name for name in output[-1].split(",") if name] if output else []
+    return times, lazy
+
+
+def total_ms(times: list[ImportTime], module: str) -> float:
+    return next(t.cumulative_us for t in times if t.module == module) / 1000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--repeat", type=int, default=5, help="Interpreters to start, the median is reported")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    totals_ms = [total_ms(times, args.module) for times, _ in runs]
+    median_ms = statistics.median(totals_ms)
+    print(
+        f"import {args.module}: median {median_ms:.0f} ms, "
+        f"min {min(totals_ms):.0f} ms, max {max(totals_ms):.0f} ms over {args.repeat} runs"
+    )
+
+    # The run closest to the median is broken down
+    times, lazy = min(runs, key=lambda run: abs(total_ms(run[0], args.module) - median_ms))
+    print("\nSlowest imports (cumulative ms, self ms):")
+    for t in sorted(times, key=lambda t: t.cumulative_us, reverse=True)[1 : args.top + 1]:
+        print(f"  {t.cumulative_us / 1000:8.1f} {t.self_us / 1000:8.1f}  {'  ' * t.depth}{t.module}")
+
+    if lazy:
+        print(f"\nImported at start-up but meant to be lazy: {', '.join(lazy)}")
+        sys.exit(1)
+    print(f"\nNone of {', '.join(LAZY_MODULES)} was imported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""End-to-end load generator for the /stream websocket endpoint.
+
+Opens N concurrent sessions that replay audio with the same framing as the
+frontend (binary frames of float32 PCM at 16 kHz after a uint32 message number,
+then a numbered {"isLastChunk": true} text message) and reports per-message latency percentiles, throughput,
+dropped messages and server CPU/RSS for each N of a sweep:
+
+    python -m tools.load_generator --sessions 1 5 10 20 --speed 4 --server-pid $(pgrep -f uvicorn)
+
+Without --wav, audio is synthesized from the llm_eda/debates.py corpus with
+espeak-ng when it is installed, or as word-paced voiced bursts otherwise.
+Pair it with tools/fake_openai_server.py to load the backend without API costs.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import runpy
+import shutil
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import websockets
+from scipy.io import wavfile
+from scipy.signal import resample_poly
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE_HZ = 16000
+FRAME_SAMPLES = 128  # AudioWorklet render quantum used by the frontend
+SEQ_HEADER_BYTES = 4  # Message number before the samples of an audio frame
+CORPUS_PATH = Path(__file__).resolve().parents[2] / "llm_eda" / "debates.py"
+
+
+@dataclass
+class SessionStats:
+    frames_sent: int = 0
+    audio_sec: float = 0.0
+    send_failures: int = 0
+    transcripts: int = 0
+    analyses: int = 0
+    other_messages: int = 0
+    final_received: bool = False
+    max_send_lag_sec: float = 0.0  # How far the sender fell behind its schedule
+    latencies_sec: list[float] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class SweepResult:
+    sessions: int
+    wall_sec: float
+    audio_sec: float
+    realtime_factor: float  # Audio seconds streamed per wall second, all sessions
+    messages_per_sec: float
+    latency_ms: dict[str, float]
+    transcripts: int
+    analyses: int
+    dropped: dict[str, int]
+    max_send_lag_ms: float
+    server: dict[str, float]
+
+
+def load_wav(path: Path) -> np.ndarray:
+    """Read a WAV file as mono float32 at 16 kHz."""
+    rate, data = wavfile.read(path)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if np.issubdtype(data.dtype, np.integer):
+        data = data / float(np.iinfo(data.dtype).max)
+    data = data.astype(np.float32)
+    if rate != SAMPLE_RATE_HZ:
+        divisor = math.gcd(rate, SAMPLE_RATE_HZ)
+        data = resample_poly(data, SAMPLE_RATE_HZ // divisor, rate // divisor).astype(np.float32)
+    return data
+
+
+def load_corpus(max_words: int) -> str:
+    """Concatenate the debates of the llm_eda corpus, up to `max_words` words."""
+    corpus = runpy.run_path(str(CORPUS_PATH))
+    texts = [value for name, value in corpus.items() if name.endswith("_debate") and isinstance(value, str)]
+    return " ".join(" ".join(texts).split()[:max_words])
+
+
+def synthesize(text: str, seed: int = 0) -> np.ndarray:
+    """Turn text into 16 kHz float32 audio.
+
+    espeak-ng gives intelligible speech that local or remote Whisper can
+    transcribe. Without it, each word becomes a voiced harmonic burst with
+    speech-like pacing, which exercises buffering, chunking and the network
+    path but not recognition quality.
+    """
+    espeak = shutil.which("espeak-ng") or shutil.which("espeak")
+    if espeak:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "speech.wav"
+            subprocess.run([espeak, "-s", "160", "-w", str(path), text], check=True, capture_output=True)
+            return load_wav(path)
+
+    logger.warning("espeak-ng not found, synthesizing word-paced tone bursts instead of speech")
+    rng = np.random.default_rng(seed)
+    pieces = []
+    for word in text.split():
+        duration = 0.08 + 0.06 * len(word)
+        t = np.arange(int(duration * SAMPLE_RATE_HZ)) / SAMPLE_RATE_HZ
+        pitch = rng.uniform(100, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        envelope = np.sin(np.pi * t / duration)
+        pieces.append(0.2 * voiced * envelope)
+        pieces.append(np.zeros(int(rng.uniform(0.05, 0.2) * SAMPLE_RATE_HZ)))
+    audio = np.concatenate(pieces) + rng.normal(0, 0.003, sum(len(p) for p in pieces))
+    return audio.astype(np.float32)
+
+
+async def run_session(
+    url: str,
+    audio: np.ndarray,
+    frame_samples: int,
+    speed: float,
+    final_timeout_sec: float,
+) -> SessionStats:
+    """Stream one recording over a websocket session and time the responses.
+
+    Every frame is stamped with the moment it would have been captured at
+    the requested pace. A transcript's latency is measured from the oldest
+    frame not yet covered by an earlier transcript, i.e. how long captured
+    audio waited before text came back for it.
+    """
+    stats = SessionStats()
+    frame_sec = frame_samples / SAMPLE_RATE_HZ
+    pending_capture_ts: list[float] = []
+    final_event = asyncio.Event()
+
+    async def receive(ws):
+        async for raw in ws:
+            received_ts = time.time()
+            try:
+                message = json.loads(raw)
+            except (TypeError, ValueError):
+                stats.other_messages += 1
+                continue
+            message_type = message.get("type", "transcript")
+            if message_type == "transcript":
+                stats.transcripts += 1
+                if pending_capture_ts:
+                    stats.latencies_sec.append(received_ts - pending_capture_ts[0])
+                    pending_capture_ts.clear()
+                if message.get("is_final"):
+                    stats.final_received = True
+                    final_event.set()
+            elif message_type in ("analysis", "analysis_item"):
+                stats.analyses += 1
+            else:
+                stats.other_messages += 1
+
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            receiver = asyncio.create_task(receive(ws))
+            start = time.time()
+            for index, offset in enumerate(range(0, len(audio), frame_samples)):
+                capture_ts = start + index * frame_sec / speed if speed > 0 else time.time()
+                delay = capture_ts - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    stats.max_send_lag_sec = max(stats.max_send_lag_sec, -delay)
+
+                frame = audio[offset : offset + frame_samples]
+                try:
+                    await ws.send((index + 1).to_bytes(SEQ_HEADER_BYTES, "little") + frame.tobytes())
+                except websockets.ConnectionClosed:
+                    stats.send_failures += 1
+                    break
+                pending_capture_ts.append(capture_ts)
+                stats.frames_sent += 1
+                stats.audio_sec += len(frame) / SAMPLE_RATE_HZ
+
+            await ws.send(json.dumps({"isLastChunk": True, "seq": stats.frames_sent + 1}))
+            try:
+                await asyncio.wait_for(final_event.wait(), final_timeout_sec)
+            except asyncio.TimeoutError:
+                pass
+            receiver.cancel()
+    except (OSError, websockets.WebSocketException) as e:
+        stats.error = str(e)
+    return stats
+
+
+class ServerSampler:
+    """Sample the CPU and RSS of the server process while a sweep step runs."""
+
+    def __init__(self, pid: Optional[int], interval_sec: float = 0.5):
+        self.interval_sec = interval_sec
+        self.process = None
+        if pid is None:
+            return
+        try:
+            import psutil
+        except ImportError:
+            logger.warning("psutil is not installed, server CPU/RSS will not be reported")
+            return
+        self.process = psutil.Process(pid)
+        self.cpu_percent: list[float] = []
+        self.rss_bytes: list[int] = []
+
+    async def run(self):
+        if self.process is None:
+            return
+        self.process.cpu_percent(None)
+        while True:
+            await asyncio.sleep(self.interval_sec)
+            self.cpu_percent.append(self.process.cpu_percent(None))
+            self.rss_bytes.append(self.process.memory_info().rss)
+
+    def summary(self) -> dict[str, float]:
+        if self.process is None or not self.cpu_percent:
+            return {}
+        return {
+            "cpu_percent_mean": float(np.mean(self.cpu_percent)),
+            "cpu_percent_max": float(np.max(self.cpu_percent)),
+            "rss_mb_max": max(self.rss_bytes) / 2**20,
+        }
+
+
+def percentiles_ms(latencies_sec: list[float]) -> dict[str, float]:
+    if not latencies_sec:
+        return {}
+    values = np.array(latencies_sec) * 1000
+    return {f"p{q}": float(np.percentile(values, q)) for q in (50, 90, 95, 99)} | {"max": float(values.max())}
+
+
+async def run_sweep_step(args: argparse.Namespace, sessions: int, recordings: list[np.ndarray]) -> SweepResult:
+    sampler = ServerSampler(args.server_pid)
+    sampler_task = asyncio.create_task(sampler.run())
+    start = time.time()
+
+    async def staggered(index: int) -> SessionStats:
+        # Spread session starts so connection setup does not dominate the first chunks
+        await asyncio.sleep(index * args.ramp_sec / max(1, sessions))
+        return await run_session(
+            args.url, recordings[index % len(recordings)], args.frame_samples, args.speed, args.final_timeout_sec
+        )
+
+    results = await asyncio.gather(*(staggered(i) for i in range(sessions)))
+    wall_sec = time.time() - start
+    sampler_task.cancel()
+
+    audio_sec = sum(r.audio_sec for r in results)
+    messages = sum(r.transcripts + r.analyses + r.other_messages for r in results)
+    return SweepResult(
+        sessions=sessions,
+        wall_sec=wall_sec,
+        audio_sec=audio_sec,
+        realtime_factor=audio_sec / wall_sec,
+        messages_per_sec=messages / wall_sec,
+        latency_ms=percentiles_ms([latency for r in results for latency in r.latencies_sec]),
+        transcripts=sum(r.transcripts for r in results),
+        analyses=sum(r.analyses for r in results),
+        dropped={
+            "failed_sessions": sum(r.error is not None for r in results),
+            "send_failures": sum(r.send_failures for r in results),
+            "missing_final": sum(not r.final_received for r in results),
+        },
+        max_send_lag_ms=max(r.max_send_lag_sec for r in results) * 1000,
+        server=sampler.summary(),
+    )
+
+
+def print_result(result: SweepResult) -> None:
+    latency = result.latency_ms
+    latency_text = " ".join(f"{key}={value:.0f}ms" for key, value in latency.items()) or "no transcripts"
+    server_text = " ".join(f"{key}={value:.1f}" for key, value in result.server.items())
+    print(
+        f"N={result.sessions:<4} wall={result.wall_sec:.1f}s audio={result.audio_sec:.1f}s "
+        f"x{result.realtime_factor:.1f} realtime, {result.messages_per_sec:.1f} msg/s | {latency_text} | "
+        f"dropped={result.dropped} lag={result.max_send_lag_ms:.0f}ms | {server_text}"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/stream")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10], help="Concurrent sessions to sweep")
+    parser.add_argument("--wav", type=Path, nargs="*", default=[], help="WAV files to replay, round robin")
+    parser.add_argument("--words", type=int, default=300, help="Corpus words to synthesize without --wav")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed, 0 sends as fast as possible")
+    parser.add_argument("--frame-samples", type=int, default=FRAME_SAMPLES)
+    parser.add_argument("--ramp-sec", type=float, default=1.0, help="Time over which sessions are started")
+    parser.add_argument("--final-timeout-sec", type=float, default=30.0)
+    parser.add_argument("--server-pid", type=int, default=os.environ.get("SERVER_PID") and int(os.environ["SERVER_PID"]))
+    parser.add_argument("--output", type=Path, help="Write the sweep results as JSON")
+    return parser.parse_args()
+
+
+async def main_async(args: argparse.Namespace) -> list[SweepResult]:
+    if args.wav:
+        recordings = [load_wav(path) for path in args.wav]
+    else:
+        recordings = [synthesize(load_corpus(args.words))]
+    logger.info(f"Replaying {len(recordings)} recordings, {sum(len(r) for r in recordings) / SAMPLE_RATE_HZ:.1f}s of audio")
+
+    results = []
+    for sessions in args.sessions:
+        result = await run_sweep_step(args, sessions, recordings)
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    results = asyncio.run(main_async(args))
+    if args.output:
+        args.output.write_text(json.dumps([asdict(result) for result in results], indent=2))
+
+
+if __name__ == "__main__":
+    main()
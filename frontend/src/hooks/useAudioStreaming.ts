@@ -1,5 +1,15 @@
 import { useCallback, useRef, useState } from 'react';
-import { StreamingResult } from '../types/transcription';
+import { AnalysisItemMessage, AnalysisMessage, LagMessage, SessionConfig, StreamingResult } from '../types/transcription';
+
+const STREAM_URL = 'ws://localhost:8000/stream';
+// Reconnection after an unexpected close, within the server's resume grace period
+const MAX_RECONNECT_ATTEMPTS = 6;
+const RECONNECT_BASE_DELAY_MS = 250;
+const RECONNECT_MAX_DELAY_MS = 5000;
+// Messages kept until the server acknowledges them, ~60s of 128-sample frames
+const MAX_UNACKED_MESSAGES = 7500;
+// Bytes before the samples of an audio frame, holding its sequence number
+const SEQ_HEADER_BYTES = 4;
 
 // AudioWorklet processor code
 const processorCode = `
@@ -65,9 +75,14 @@ registerProcessor('audio-processor', AudioProcessor);
 
 interface UseAudioStreamingProps {
     onTranscriptionUpdate?: (result: StreamingResult) => void;
+    onAnalysis?: (message: AnalysisMessage | AnalysisItemMessage) => void;
+    // How far behind live the transcripts are, reported every few seconds
+    onLag?: (message: LagMessage) => void;
+    // Settings of this session that differ from the server's config, e.g. its method or language
+    sessionConfig?: SessionConfig;
 }
 
-export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingProps = {}) => {
+export const useAudioStreaming = ({ onTranscriptionUpdate, onAnalysis, onLag, sessionConfig }: UseAudioStreamingProps = {}) => {
     const [isStreaming, setIsStreaming] = useState(false);
     const [error, setError] = useState<string | null>(null);
     const [isEndOfFile, setIsEndOfFile] = useState(false);
@@ -78,6 +93,45 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
     const workletNodeRef = useRef<AudioWorkletNode | null>(null);
     const isStreamingRef = useRef(false);
     const pendingStopRef = useRef(false);
+    // Resumable session state: every message sent is numbered from 1 and kept until acknowledged
+    const sessionIdRef = useRef<string | null>(null);
+    const sentSeqRef = useRef(0);
+    const unackedRef = useRef<{ seq: number; data: ArrayBuffer | string }[]>([]);
+    // Whether the server greeted this connection and the unacknowledged messages were resent,
+    // until then new messages only wait in unackedRef so they are not sent twice or out of order
+    const readyRef = useRef(false);
+    const reconnectAttemptsRef = useRef(0);
+    const reconnectTimerRef = useRef<number | null>(null);
+
+    const trimUnacked = useCallback((seq: number) => {
+        const unacked = unackedRef.current;
+        let count = 0;
+        while (count < unacked.length && unacked[count].seq <= seq) count++;
+        if (count > 0) unacked.splice(0, count);
+    }, []);
+
+    const sendMessage = useCallback((message: ArrayBuffer | Record<string, unknown>) => {
+        sentSeqRef.current += 1;
+        const seq = sentSeqRef.current;
+        let data: ArrayBuffer | string;
+        if (message instanceof ArrayBuffer) {
+            // Audio frames start with their number, a little-endian uint32
+            const frame = new Uint8Array(SEQ_HEADER_BYTES + message.byteLength);
+            new DataView(frame.buffer).setUint32(0, seq, true);
+            frame.set(new Uint8Array(message), SEQ_HEADER_BYTES);
+            data = frame.buffer;
+        } else {
+            data = JSON.stringify({ ...message, seq });
+        }
+        unackedRef.current.push({ seq, data });
+        if (unackedRef.current.length > MAX_UNACKED_MESSAGES) {
+            // The server cannot have kept the session this long, the oldest audio is lost anyway
+            unackedRef.current.shift();
+        }
+        if (readyRef.current && websocketRef.current?.readyState === WebSocket.OPEN) {
+            websocketRef.current.send(data);
+        }
+    }, []);
 
     const cleanupResources = useCallback(() => {
         if (sourceNodeRef.current) {
@@ -103,10 +157,25 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
             audioContextRef.current = null;
         }
 
-        if (websocketRef.current?.readyState === WebSocket.OPEN) {
-            websocketRef.current.close();
+        if (reconnectTimerRef.current !== null) {
+            window.clearTimeout(reconnectTimerRef.current);
+            reconnectTimerRef.current = null;
+        }
+
+        if (websocketRef.current) {
+            // Closed on purpose, not to be reconnected
+            websocketRef.current.onclose = null;
+            websocketRef.current.onerror = null;
+            if (websocketRef.current.readyState === WebSocket.OPEN) {
+                websocketRef.current.close();
+            }
         }
         websocketRef.current = null;
+        readyRef.current = false;
+        sessionIdRef.current = null;
+        sentSeqRef.current = 0;
+        unackedRef.current = [];
+        reconnectAttemptsRef.current = 0;
 
         setIsStreaming(false);
         isStreamingRef.current = false;
@@ -168,7 +237,7 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
                 });
 
                 // Send the last chunk message
-                websocketRef.current.send(JSON.stringify({ isLastChunk: true }));
+                sendMessage({ isLastChunk: true });
 
                 try {
                     await finalResponsePromise;
@@ -185,7 +254,7 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
             // Clean up resources regardless of whether we got the final response
             cleanupResources();
         }
-    }, [cleanupResources]);
+    }, [cleanupResources, sendMessage]);
 
     const startStreaming = useCallback(async (audioFile?: File) => {
         try {
@@ -194,15 +263,117 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
             isStreamingRef.current = true;
             pendingStopRef.current = false;
 
-            // Initialize WebSocket
-            websocketRef.current = new WebSocket('ws://localhost:8000/stream');
-            const ws = websocketRef.current;
+            const handleMessage = (event: MessageEvent) => {
+                try {
+                    const data = JSON.parse(event.data);
+                    if (data.type === 'error') {
+                        setError(data.error);
+                        return;
+                    }
+                    if (data.error) throw new Error(data.error);
+                    if (data.type === 'session') {
+                        // Resend what the server did not receive before the connection dropped
+                        sessionIdRef.current = data.session_id;
+                        reconnectAttemptsRef.current = 0;
+                        trimUnacked(data.last_seq);
+                        for (const message of unackedRef.current) {
+                            websocketRef.current?.send(message.data);
+                        }
+                        readyRef.current = true;
+                        return;
+                    }
+                    if (data.type === 'ack') {
+                        trimUnacked(data.seq);
+                        return;
+                    }
+                    if (data.type === 'analysis' || data.type === 'analysis_item') {
+                        onAnalysis?.(data);
+                        return;
+                    }
+                    if (data.type === 'lag') {
+                        onLag?.(data);
+                        return;
+                    }
+                    if (typeof data.seq === 'number') trimUnacked(data.seq);
+                    onTranscriptionUpdate?.(data);
 
-            await new Promise<void>((resolve, reject) => {
-                if (!ws) return reject(new Error('WebSocket not initialized'));
-                ws.onopen = () => resolve();
-                ws.onerror = (error) => reject(error);
-            });
+                    // If we got final result and we were stopping, clean up
+                    if (data.is_final && pendingStopRef.current) {
+                        console.log('Received final confirmation from backend, cleaning up');
+                        cleanupResources();
+                    }
+                } catch (e) {
+                    console.error('Failed to parse transcription data:', e);
+                }
+            };
+
+            const connect = async (): Promise<void> => {
+                const resuming = sessionIdRef.current !== null;
+                const url = resuming
+                    ? `${STREAM_URL}?session_id=${encodeURIComponent(sessionIdRef.current!)}`
+                    : STREAM_URL;
+                const ws = new WebSocket(url);
+                websocketRef.current = ws;
+                readyRef.current = false;
+
+                await new Promise<void>((resolve, reject) => {
+                    ws.onopen = () => resolve();
+                    ws.onerror = (error) => reject(error);
+                });
+
+                // A new session is configured by its first message, which is not numbered
+                if (!resuming && sessionConfig) {
+                    ws.send(JSON.stringify({ type: 'config', config: sessionConfig }));
+                }
+
+                ws.onmessage = handleMessage;
+
+                // Add more detailed WebSocket error handling
+                ws.onerror = (error) => {
+                    console.error('WebSocket error:', error);
+                };
+
+                ws.onclose = (event) => {
+                    console.log('WebSocket closed:', {
+                        code: event.code,
+                        reason: event.reason,
+                        wasClean: event.wasClean
+                    });
+                    const active = isStreamingRef.current || pendingStopRef.current;
+                    if (!active || !sessionIdRef.current || reconnectAttemptsRef.current >= MAX_RECONNECT_ATTEMPTS) {
+                        if (active) setError('WebSocket connection lost');
+                        cleanupResources();
+                        return;
+                    }
+                    scheduleReconnect();
+                };
+            };
+
+            const scheduleReconnect = () => {
+                const delay = Math.min(
+                    RECONNECT_BASE_DELAY_MS * 2 ** reconnectAttemptsRef.current,
+                    RECONNECT_MAX_DELAY_MS,
+                );
+                reconnectAttemptsRef.current += 1;
+                console.log(`Reconnecting session ${sessionIdRef.current} in ${delay}ms`);
+                reconnectTimerRef.current = window.setTimeout(async () => {
+                    reconnectTimerRef.current = null;
+                    try {
+                        await connect();
+                    } catch (e) {
+                        console.warn('Reconnection failed:', e);
+                        if (reconnectAttemptsRef.current >= MAX_RECONNECT_ATTEMPTS) {
+                            setError('WebSocket connection lost');
+                            cleanupResources();
+                        } else {
+                            scheduleReconnect();
+                        }
+                    }
+                }, delay);
+            };
+
+            // Initialize WebSocket
+            await connect();
 
             // Initialize AudioContext and AudioWorklet
             audioContextRef.current = new AudioContext({ sampleRate: 16000 });
@@ -226,20 +397,21 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
 
             // Add message handling
             workletNodeRef.current.port.onmessage = (e) => {
-                if (ws.readyState === WebSocket.OPEN && isStreamingRef.current) {
+                // Messages are kept while reconnecting, and sent once resumed
+                if (isStreamingRef.current) {
                     try {
                         // Send audio data as binary
                         const audioData = e.data.audioData;
 
                         if (audioData.length > 0) {
                             // Send the raw buffer as binary data
-                            ws.send(audioData.buffer);
+                            sendMessage(audioData.buffer);
                         }
 
                         // If this is the last chunk, send a control message
                         if (e.data.isLastChunk) {
                             console.log('Sending last chunk message');
-                            ws.send(JSON.stringify({ isLastChunk: true }));
+                            sendMessage({ isLastChunk: true });
                         }
                     } catch (error) {
                         console.error('Error sending audio data:', error);
@@ -304,47 +476,14 @@ export const useAudioStreaming = ({ onTranscriptionUpdate }: UseAudioStreamingPr
                 }
             }
 
-            // Handle transcription results
-            ws.onmessage = (event) => {
-                try {
-                    const data = JSON.parse(event.data);
-                    if (data.error) throw new Error(data.error);
-                    onTranscriptionUpdate?.(data);
-
-                    // If we got final result and we were stopping, clean up
-                    if (data.is_final && pendingStopRef.current) {
-                        console.log('Received final confirmation from backend, cleaning up');
-                        cleanupResources();
-                    }
-                } catch (e) {
-                    console.error('Failed to parse transcription data:', e);
-                }
-            };
-
             setIsStreaming(true);
 
-            // Add more detailed WebSocket error handling
-            ws.onerror = (error) => {
-                console.error('WebSocket error:', error);
-                setError('WebSocket error occurred');
-                cleanupResources();
-            };
-
-            ws.onclose = (event) => {
-                console.log('WebSocket closed:', {
-                    code: event.code,
-                    reason: event.reason,
-                    wasClean: event.wasClean
-                });
-                cleanupResources();
-            };
-
         } catch (err) {
             console.error('Streaming error:', err);
             setError(err instanceof Error ? err.message : 'An error occurred');
             cleanupResources();
         }
-    }, [onTranscriptionUpdate, stopStreaming, cleanupResources]);
+    }, [onTranscriptionUpdate, onAnalysis, onLag, sessionConfig, stopStreaming, cleanupResources, sendMessage, trimUnacked]);
 
     return { isStreaming, isEndOfFile, error, startStreaming, stopStreaming };
 };
\ No newline at end of file
@@ -6,18 +6,82 @@ export interface TranscriptionResult {
 }
 
 export interface StreamingResult {
+    type?: 'transcript';
     text: string;
     is_final: boolean;
+    seq?: number;  // Last client message the transcript includes
+    revision?: boolean;  // Earlier text was revised, e.g. drafts refined by a larger model
+}
+
+// First message of a /stream connection; a resumed session lists the last message it received
+export interface SessionMessage {
+    type: 'session';
+    session_id: string;
+    resumed: boolean;
+    last_seq: number;
+}
+
+export interface AckMessage {
+    type: 'ack';
+    seq: number;
+}
+
+// Sent every few seconds while the server transcribes; shed chunks were dropped or merged to keep up
+export interface LagMessage {
+    type: 'lag';
+    lag_ms: number;
+    queued_chunks: number;
+    shed_chunks: number;
+    degraded: boolean;
+}
+
+export interface AnalysisMessage {
+    type: 'analysis';
+    scope: 'realtime' | 'postdebate';
+    analysis: string;
+    round: number;
+    data: Record<string, unknown>;
+    utterance_ts: number;
+    round_started_ts: number;
+    sent_ts: number;
+    latency_from_utterance_ms: number;
+    analysis_ms: number;
+}
+
+export interface AnalysisItemMessage {
+    type: 'analysis_item';
+    scope: 'realtime' | 'postdebate';
+    analysis: string;
+    field: string;
+    round: number;
+    item: Record<string, unknown>;
+    utterance_ts: number;
+    round_started_ts: number;
+    sent_ts: number;
+    latency_from_utterance_ms: number;
+    analysis_ms: number;
 }
 
 export interface TranscriptionConfig {
     model_checkpoint: string;
     method: string;
+    language?: string | null;
     save_transcript: boolean;
     chunk_size_ms: number;
     overlap_ms: number;
 }
 
+// Settings a /stream session may choose for itself in its handshake
+export type SessionConfig = Partial<Pick<TranscriptionConfig,
+    'method' | 'model_checkpoint' | 'language' | 'save_transcript' | 'chunk_size_ms' | 'overlap_ms'>> & {
+    direct_streaming?: boolean;
+    analysis?: Record<string, unknown>;
+    map_reduce?: Record<string, unknown>;
+    prefilter?: Record<string, unknown>;
+    claim_index?: Record<string, unknown>;
+    context_budget?: Record<string, unknown>;
+};
+
 export const LOCAL_MODEL_CHECKPOINTS = ['medium.en', 'large-v3', 'large-v2', 'large-v3-turbo', 'large-v3-turbo-q5_0'] as const;
 export const OPENAI_MODEL_CHECKPOINTS = ['whisper-1'] as const;
 export const TRANSCRIPTION_METHODS = ['local_whisper', 'openai_whisper', 'google_speech'] as const;
\ No newline at end of file